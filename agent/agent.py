@@ -1,5 +1,6 @@
 """最终的Agent类"""
-from typing import Optional, Dict, Any
+import re
+from typing import Optional, Dict, Any, List
 from .toolcall import ToolCallAgent
 # 处理相对导入问题
 try:
@@ -8,7 +9,7 @@ try:
     from ..tools.tool_manager import ToolManager
     from ..memory.memory_manager import MemoryManager
     from ..memory.manager import ContextManager
-    from ..models.llm import LLM
+    from ..models.llm import get_llm
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -22,7 +23,20 @@ except (ImportError, ValueError):
     from tools.tool_manager import ToolManager
     from memory.memory_manager import MemoryManager
     from memory.manager import ContextManager
-    from models.llm import LLM
+    from models.llm import get_llm
+
+
+# 最终回复prompt末尾固定的答案来源要求
+_ANSWER_SOURCE_REQUIREMENTS = (
+    "\n**请根据以上信息回答，并明确说明：**",
+    "1. 答案来源（基于文档/网络搜索/知识库/一般知识/无法回答）",
+    "2. 如果基于文档，请引用具体来源",
+    "3. 如果无法回答，请明确说明",
+)
+
+# 从工具结果中提取来源URL
+_URL_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+_MAX_SOURCES = 5  # 回复末尾最多显示的来源数量
 
 
 class Agent(ToolCallAgent):
@@ -58,7 +72,7 @@ class Agent(ToolCallAgent):
         
         self.memory_manager = MemoryManager(config)
         self.context_manager = ContextManager(config)
-        self.llm = LLM(config)
+        self.llm = get_llm(config)
         
         # 初始化工具管理器
         tool_manager = ToolManager(config)
@@ -98,7 +112,7 @@ class Agent(ToolCallAgent):
         )
         
         # 4. 管理上下文
-        conversation_history = [msg.to_dict() for msg in self.memory.messages]
+        conversation_history = self.memory.to_openai_messages()
         
         context = self.context_manager.get_context(
             conversation_history,
@@ -143,63 +157,55 @@ class Agent(ToolCallAgent):
         
         # 8. Agent的think过程已经包含了反思机制（通过react循环）
         
-        # 9. 保存对话到记忆
-        self.memory_manager.save_conversation(
-            session_id,
-            user_message,
-            response,
-            "query"  # 默认意图类型
-        )
-        
-        # 9. 保存精炼后的上下文到长期记忆（如果有）
-        if context.get("refined_context"):
-            refined_ctx = context["refined_context"]
-            if isinstance(refined_ctx, dict) and refined_ctx.get("summary"):
-                self.memory_manager.save_refined_context(
-                    summary=refined_ctx.get("summary", ""),
-                    key_points=refined_ctx.get("key_points", []),
-                    important_info=refined_ctx.get("important_info", {})
-                )
+        # 9. 保存对话到记忆，并保存精炼后的上下文到长期记忆（如果有）
+        # 两者一次性批量编码写入，且在线程池中执行，不阻塞事件循环
+        # 长期记忆写入失败不影响本轮回复
+        refined_ctx = context.get("refined_context")
+        try:
+            await self.memory_manager.asave_turn(
+                session_id,
+                user_message,
+                response,
+                "query",  # 默认意图类型
+                refined_context=refined_ctx if isinstance(refined_ctx, dict) else None
+            )
+        except Exception as e:
+            print(f"Warning: Failed to save conversation to long-term memory: {e}")
         
         # 10. 添加来源信息到回复中（供前端显示）
-        sources_info = []
-        
         # 从工具执行结果中提取URL（如果工具返回了URL）
-        if tool_results and isinstance(tool_results, str):
-            # 尝试从工具结果中提取URL
-            import re
-            url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-            urls = re.findall(url_pattern, tool_results)
-            for url in urls:
-                # 检查是否已经在sources_info中
-                if not any(s.get("url") == url for s in sources_info):
-                    sources_info.append({
-                        "url": url,
-                        "title": url[:50] + "..." if len(url) > 50 else url,
-                        "snippet": ""
-                    })
+        sources_info = self._extract_sources(tool_results) if isinstance(tool_results, str) else []
         
         # 如果有来源信息，添加到回复末尾（使用markdown格式，前端可以提取）
         if sources_info:
-            sources_text = "\n\n---\n**🔗 信息来源（点击查看原文）：**\n"
-            for i, source in enumerate(sources_info[:5], 1):  # 最多显示5个来源
-                url = source.get("url", "")
-                title = source.get("title", url)
-                snippet = source.get("snippet", "")
-                
-                if url:
-                    if snippet:
-                        sources_text += f"{i}. [{title}]({url})\n   *{snippet}...*\n\n"
-                    else:
-                        sources_text += f"{i}. [{title}]({url})\n\n"
-            
-            response = response + sources_text
+            response = response + "\n\n---\n**🔗 信息来源（点击查看原文）：**\n" + "".join(
+                f"{i}. [{source['title']}]({source['url']})\n\n"
+                for i, source in enumerate(sources_info, 1)
+            )
         
         # 11. 添加回复到记忆
         self.update_memory("assistant", response)
         
         return response
     
+    @staticmethod
+    def _extract_sources(tool_results: str) -> List[Dict[str, str]]:
+        """
+        从工具执行结果中提取来源URL（按出现顺序去重，最多_MAX_SOURCES个）
+        
+        Args:
+            tool_results: 工具执行结果文本
+            
+        Returns:
+            来源列表，每项包含url和title
+        """
+        # dict.fromkeys保持首次出现的顺序并去重，避免逐个与已有来源比较
+        urls = list(dict.fromkeys(_URL_PATTERN.findall(tool_results)))[:_MAX_SOURCES]
+        return [
+            {"url": url, "title": url[:50] + "..." if len(url) > 50 else url}
+            for url in urls
+        ]
+    
     def _generate_response(
         self,
         user_message: str,
@@ -240,11 +246,11 @@ class Agent(ToolCallAgent):
         # 添加上下文信息
         if context.get("recent_messages"):
             user_prompt_parts.append("\n最近对话历史：")
-            for msg in context["recent_messages"][-5:]:  # 只取最近5条
-                role = msg.get("role", "")
-                content = msg.get("content", "")
-                if content:
-                    user_prompt_parts.append(f"{role}: {content[:200]}")
+            user_prompt_parts.extend(
+                f"{msg.get('role', '')}: {msg['content'][:200]}"
+                for msg in context["recent_messages"][-5:]  # 只取最近5条
+                if msg.get("content")
+            )
         
         # 添加精炼后的上下文
         if context.get("refined_context"):
@@ -258,20 +264,18 @@ class Agent(ToolCallAgent):
             long_term = context["long_term_memory"]
             if long_term:
                 user_prompt_parts.append("\n相关历史记忆：")
-                for memory in long_term[:3]:  # 只取前3条
-                    content = memory.get("content", "")
-                    if content:
-                        user_prompt_parts.append(f"- {content[:200]}")
+                user_prompt_parts.extend(
+                    f"- {memory['content'][:200]}"
+                    for memory in long_term[:3]  # 只取前3条
+                    if memory.get("content")
+                )
         
         # 添加工具执行结果
         if tool_results and tool_results != "No steps executed":
             user_prompt_parts.append(f"\n工具执行结果：{tool_results}")
         
-        # 添加答案来源要求
-        user_prompt_parts.append("\n**请根据以上信息回答，并明确说明：**")
-        user_prompt_parts.append("1. 答案来源（基于文档/网络搜索/知识库/一般知识/无法回答）")
-        user_prompt_parts.append("2. 如果基于文档，请引用具体来源")
-        user_prompt_parts.append("3. 如果无法回答，请明确说明")
+        # 添加答案来源要求（固定内容，一次extend）
+        user_prompt_parts.extend(_ANSWER_SOURCE_REQUIREMENTS)
         
         user_prompt = "\n".join(user_prompt_parts)
         
@@ -279,7 +283,7 @@ class Agent(ToolCallAgent):
         messages = []
         
         # 添加历史对话（从memory中获取）
-        for msg in self.memory.messages[-10:]:  # 只取最近10条
+        for msg in self.memory.get_recent_messages(10):  # 只取最近10条
             messages.append(msg.to_dict())
         
         # 添加当前用户消息
@@ -1,12 +1,14 @@
 """BaseAgent基类"""
 from abc import ABC, abstractmethod
+from collections import deque
 from contextlib import asynccontextmanager
+from itertools import islice
 from typing import Optional, List
 # 处理相对导入问题
 try:
     from ..schema import AgentState, Memory, Message, ROLE_TYPE, StatusCallback
     from ..config.config import Config
-    from ..models.llm import LLM
+    from ..models.llm import LLM, get_llm
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -17,7 +19,7 @@ except (ImportError, ValueError):
         sys.path.insert(0, str(project_root))
     from schema import AgentState, Memory, Message, ROLE_TYPE, StatusCallback
     from config.config import Config
-    from models.llm import LLM
+    from models.llm import LLM, get_llm
 
 
 class BaseAgent(ABC):
@@ -71,7 +73,7 @@ class BaseAgent(ABC):
         
         # 初始化LLM（如果未提供）
         if llm is None or not isinstance(llm, LLM):
-            self.llm = LLM(self.config)
+            self.llm = get_llm(self.config)
         else:
             self.llm = llm
 
@@ -166,7 +168,7 @@ class BaseAgent(ABC):
     @messages.setter
     def messages(self, value: List[Message]):
         """设置Agent记忆中的消息列表"""
-        self.memory.messages = value
+        self.memory.messages = deque(value, maxlen=self.memory.max_size)
     
     def get_messages(self) -> List[Message]:
         """获取所有消息（向后兼容方法）"""
@@ -194,7 +196,7 @@ class BaseAgent(ABC):
         # 统计相同内容的出现次数
         duplicate_count = sum(
             1
-            for msg in reversed(self.memory.messages[:-1])
+            for msg in islice(reversed(self.memory.messages), 1, None)
             if msg.role == "assistant" and msg.content == last_message.content
         )
         
@@ -282,7 +284,7 @@ class BaseAgent(ABC):
                     
                     # 不提供tools，强制LLM只生成文本回答
                     if hasattr(self, 'llm'):
-                        response = self.llm.chat(
+                        response = await self.llm.achat(
                             messages=messages_dict,
                             temperature=0.7,
                             max_tokens=self.config.llm_max_tokens
@@ -1,11 +1,11 @@
 """核心Agent，负责领域分类和路由"""
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from .agent import Agent
 # 处理相对导入问题
 try:
-    from ..schema import LegalDomain, LegalIntent, AgentState, Memory, StatusCallback
+    from ..schema import LegalDomain, LegalIntent, AgentState, Memory, StatusCallback, enum_str
     from ..config.config import Config
-    from ..models.llm import LLM
+    from ..models.llm import get_llm
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -14,11 +14,66 @@ except (ImportError, ValueError):
     project_root = current_file.parent.parent
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
-    from schema import LegalDomain, LegalIntent, AgentState, Memory, StatusCallback
+    from schema import LegalDomain, LegalIntent, AgentState, Memory, StatusCallback, enum_str
     from config.config import Config
-    from models.llm import LLM
+    from models.llm import get_llm
 import json
+import os
 import re
+import traceback
+
+
+# 设置环境变量LAW_AGENT_VERBOSE=1时输出调试信息和异常堆栈
+_VERBOSE = os.getenv("LAW_AGENT_VERBOSE") == "1"
+
+
+def _debug(message: str):
+    """输出调试信息（仅在LAW_AGENT_VERBOSE=1时）"""
+    if _VERBOSE:
+        print(message)
+
+
+def _print_traceback():
+    """输出当前异常的堆栈（仅在LAW_AGENT_VERBOSE=1时）"""
+    if _VERBOSE:
+        traceback.print_exc()
+
+
+# 基于关键词的领域检测：按优先级排列（多个领域的关键词同时出现时取排在前面的领域）
+_DOMAIN_KEYWORDS = (
+    (LegalDomain.CRIMINAL_LAW, ["抢", "偷", "盗", "骗", "杀", "伤害", "处罚", "判刑", "量刑", "罪", "嫌疑人", "被告人"]),
+    (LegalDomain.FAMILY_LAW, ["婚姻", "离婚", "结婚", "抚养", "赡养", "继承", "财产分割", "夫妻"]),
+    (LegalDomain.LABOR_LAW, ["工资", "加班", "裁员", "解雇", "劳动合同", "试用期", "五险一金", "工伤"]),
+    (LegalDomain.CONTRACT_LAW, ["合同", "协议", "违约", "履行", "解除", "签订"]),
+    (LegalDomain.CORPORATE_LAW, ["公司", "企业", "股东", "股权", "董事会", "法人"]),
+    (LegalDomain.PROCEDURAL_QUERY, ["法院", "起诉", "诉讼", "仲裁", "上诉", "执行", "管辖"]),
+)
+_KEYWORD_PRIORITY = {}
+for _priority, (_domain, _keywords) in enumerate(_DOMAIN_KEYWORDS):
+    for _keyword in _keywords:
+        _KEYWORD_PRIORITY.setdefault(_keyword, _priority)
+# 所有关键词编译为一个正则，一次扫描完成匹配；放在前瞻中使匹配可以重叠，
+# 分支按优先级排列，保证每个位置命中的是该位置优先级最高的关键词
+_DOMAIN_KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in _KEYWORD_PRIORITY) + "))"
+)
+# 基于关键词的意图检测（只用于关键词直达路由：命中的意图关键词必须全部属于同一意图）
+_INTENT_KEYWORDS = (
+    (LegalIntent.DOC_DRAFTING, ["起草", "拟写", "写一份", "拟一份", "帮我写", "起诉状", "律师函", "模板"]),
+    (LegalIntent.REVIEW_CONTRACT, ["审查", "审核", "审阅", "有什么风险", "有没有风险", "有哪些风险"]),
+    (LegalIntent.CALCULATION, ["计算", "算一下", "算算", "多少钱", "赔多少", "能拿多少", "怎么算"]),
+    (LegalIntent.QA_RETRIEVAL, ["法条", "哪条", "第几条", "法律规定", "有什么规定", "怎么规定", "司法解释"]),
+)
+_INTENT_BY_KEYWORD = {
+    keyword: intent
+    for intent, keywords in _INTENT_KEYWORDS
+    for keyword in keywords
+}
+_INTENT_KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in _INTENT_BY_KEYWORD) + "))"
+)
+# 明显的法律问题关键词
+_LEGAL_HINT_PATTERN = re.compile("法|法律|婚姻|离婚|合同|劳动|公司|刑事|犯罪|法院|诉讼")
 
 
 class CoreAgent(Agent):
@@ -77,7 +132,7 @@ class CoreAgent(Agent):
         self.sub_agents: Dict[str, Agent] = {}
         
         # 领域分类器（使用LLM）
-        self.domain_classifier = LLM(config or Config())
+        self.domain_classifier = get_llm(config or Config())
         
         # State Memory：当前案件已知事实（结构化状态）
         # 使用MemoryManager的全局信息记忆
@@ -109,6 +164,12 @@ class CoreAgent(Agent):
         Returns:
             (法律领域, 法律意图) 元组
         """
+        # 关键词已经明确指向单一领域和单一意图时，省去一次LLM识别调用
+        shortcut = self._keyword_shortcut(user_message)
+        if shortcut is not None:
+            _debug(f"[DEBUG] 关键词直接确定领域和意图: {shortcut}，跳过LLM识别")
+            return shortcut
+        
         # 构建识别prompt
         try:
             from ..prompt.core_agent_prompts import DOMAIN_INTENT_ENTITIES_PROMPT
@@ -141,7 +202,7 @@ class CoreAgent(Agent):
 
         try:
             # 使用LLM进行识别
-            response = self.domain_classifier.chat(
+            response = await self.domain_classifier.achat(
                 messages=[{"role": "user", "content": user_prompt}],
                 system_prompt=system_prompt,
                 temperature=0.1,  # 使用低温度以获得更稳定的结果
@@ -171,7 +232,7 @@ class CoreAgent(Agent):
             # entities 忽略
             
             # 调试日志
-            print(f"[DEBUG] LLM识别结果 - domain: {domain_str}, intent: {intent_str}")
+            _debug(f"[DEBUG] LLM识别结果 - domain: {domain_str}, intent: {intent_str}")
             
             # 转换为枚举
             try:
@@ -183,30 +244,30 @@ class CoreAgent(Agent):
                     domain = LegalDomain[domain_str_upper]
             except KeyError:
                 # 如果无法识别，尝试模糊匹配
-                print(f"[DEBUG] 无法直接匹配domain: {domain_str}, 尝试模糊匹配")
+                _debug(f"[DEBUG] 无法直接匹配domain: {domain_str}, 尝试模糊匹配")
                 domain = self._fuzzy_match_domain(domain_str)
                 if domain == LegalDomain.NON_LEGAL:
                     # 如果模糊匹配也失败，尝试基于用户消息的关键词检测
                     domain = self._keyword_based_domain_detection(user_message)
-                    print(f"[DEBUG] 关键词检测结果: {domain}")
+                    _debug(f"[DEBUG] 关键词检测结果: {domain}")
             
             # 如果LLM返回Non_Legal，但用户消息包含法律关键词，进行二次检查
             if domain == LegalDomain.NON_LEGAL:
                 keyword_domain = self._keyword_based_domain_detection(user_message)
                 if keyword_domain != LegalDomain.NON_LEGAL:
-                    print(f"[DEBUG] LLM返回Non_Legal，但关键词检测发现法律问题: {keyword_domain}，使用关键词检测结果")
+                    _debug(f"[DEBUG] LLM返回Non_Legal，但关键词检测发现法律问题: {keyword_domain}，使用关键词检测结果")
                     domain = keyword_domain
             
             # 最终验证：如果domain仍然是NON_LEGAL，但用户消息明显是法律问题，强制修正
             if domain == LegalDomain.NON_LEGAL:
                 # 检查是否包含明显的法律关键词
-                if any(keyword in user_message for keyword in ["法", "法律", "婚姻", "离婚", "合同", "劳动", "公司", "刑事", "犯罪", "法院", "诉讼"]):
-                    print(f"[DEBUG] 检测到法律关键词，但domain仍为NON_LEGAL，强制使用关键词检测")
+                if _LEGAL_HINT_PATTERN.search(user_message):
+                    _debug(f"[DEBUG] 检测到法律关键词，但domain仍为NON_LEGAL，强制使用关键词检测")
                     domain = self._keyword_based_domain_detection(user_message)
                     if domain == LegalDomain.NON_LEGAL:
                         # 如果还是NON_LEGAL，默认使用FAMILY_LAW（最常见）
                         domain = LegalDomain.FAMILY_LAW
-                        print(f"[DEBUG] 强制设置为FAMILY_LAW作为默认值")
+                        _debug(f"[DEBUG] 强制设置为FAMILY_LAW作为默认值")
             
             try:
                 intent = LegalIntent[intent_str.upper()]
@@ -214,7 +275,7 @@ class CoreAgent(Agent):
                 # 如果无法识别，默认使用QA_Retrieval
                 intent = LegalIntent.QA_RETRIEVAL
             
-            print(f"[DEBUG] 最终识别结果 - domain: {domain}, intent: {intent}")
+            _debug(f"[DEBUG] 最终识别结果 - domain: {domain}, intent: {intent}")
             return domain, intent
             
         except Exception as e:
@@ -255,25 +316,44 @@ class CoreAgent(Agent):
         else:
             return LegalDomain.NON_LEGAL
     
+    def _keyword_shortcut(self, user_message: str) -> Optional[Tuple[LegalDomain, LegalIntent]]:
+        """
+        高置信度的关键词领域和意图判断（用于跳过LLM识别）
+        
+        Args:
+            user_message: 用户消息
+            
+        Returns:
+            命中的不同领域关键词数达到routing_keyword_shortcut_hits且全部属于同一领域、
+            并且命中的意图关键词全部属于同一意图时返回(领域, 意图)，否则返回None（交给LLM识别）
+        """
+        threshold = self.config.routing_keyword_shortcut_hits
+        if threshold <= 0:
+            return None
+        message_lower = user_message.lower()
+        keywords = {match.group(1) for match in _DOMAIN_KEYWORD_PATTERN.finditer(message_lower)}
+        priorities = {_KEYWORD_PRIORITY[keyword] for keyword in keywords}
+        if len(priorities) != 1 or len(keywords) < threshold:
+            return None
+        intents = {_INTENT_BY_KEYWORD[match.group(1)] for match in _INTENT_KEYWORD_PATTERN.finditer(message_lower)}
+        if len(intents) != 1:
+            return None
+        return _DOMAIN_KEYWORDS[priorities.pop()][0], intents.pop()
+    
     def _keyword_based_domain_detection(self, user_message: str) -> LegalDomain:
         """基于关键词的领域检测（更宽松的匹配）"""
         message_lower = user_message.lower()
         
-        # 法律相关关键词
-        legal_keywords = {
-            LegalDomain.CRIMINAL_LAW: ["抢", "偷", "盗", "骗", "杀", "伤害", "处罚", "判刑", "量刑", "罪", "嫌疑人", "被告人"],
-            LegalDomain.FAMILY_LAW: ["婚姻", "离婚", "结婚", "抚养", "赡养", "继承", "财产分割", "夫妻"],
-            LegalDomain.LABOR_LAW: ["工资", "加班", "裁员", "解雇", "劳动合同", "试用期", "五险一金", "工伤"],
-            LegalDomain.CONTRACT_LAW: ["合同", "协议", "违约", "履行", "解除", "签订"],
-            LegalDomain.CORPORATE_LAW: ["公司", "企业", "股东", "股权", "董事会", "法人"],
-            LegalDomain.PROCEDURAL_QUERY: ["法院", "起诉", "诉讼", "仲裁", "上诉", "执行", "管辖"]
-        }
-        
-        # 检查是否包含法律关键词
-        for domain, keywords in legal_keywords.items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    return domain
+        # 检查是否包含法律关键词（一次扫描，取命中关键词中优先级最高的领域）
+        best = None
+        for match in _DOMAIN_KEYWORD_PATTERN.finditer(message_lower):
+            priority = _KEYWORD_PRIORITY[match.group(1)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        if best is not None:
+            return _DOMAIN_KEYWORDS[best][0]
         
         # 如果包含"法"字，很可能是法律问题，默认返回QA_Retrieval对应的领域
         if "法" in user_message:
@@ -338,7 +418,7 @@ class CoreAgent(Agent):
         """
         # 使用LLM简单回答非法律问题
         try:
-            simple_answer = self.domain_classifier.chat(
+            simple_answer = await self.domain_classifier.achat(
                 messages=[{"role": "user", "content": user_message}],
                 system_prompt="你是一个友好的助手。请简洁地回答用户的问题。",
                 temperature=0.7,
@@ -393,8 +473,7 @@ class CoreAgent(Agent):
                 )
             except Exception as e:
                 print(f"[ERROR] 识别领域和意图失败: {e}")
-                import traceback
-                traceback.print_exc()
+                _print_traceback()
                 # 默认使用Family_Law和QA_Retrieval
                 domain = LegalDomain.FAMILY_LAW
                 intent = LegalIntent.QA_RETRIEVAL
@@ -403,9 +482,9 @@ class CoreAgent(Agent):
             self.update_state_memory(domain=domain, intent=intent)
             
             # 4. 如果是非法律问题，先简单回答，然后引导用户
-            print(f"[DEBUG] process_message - domain: {domain}, domain.value: {domain.value if hasattr(domain, 'value') else domain}")
+            _debug(f"[DEBUG] process_message - domain: {domain}, domain.value: {domain.value if hasattr(domain, 'value') else domain}")
             if domain == LegalDomain.NON_LEGAL:
-                print(f"[DEBUG] 触发non_legal处理逻辑")
+                _debug(f"[DEBUG] 触发non_legal处理逻辑")
                 self.update_status("💡 Phase 1.5: 非法律指引", "识别为非法律问题，生成引导信息...", "complete")
                 try:
                     return await self.handle_non_legal_query(user_message)
@@ -413,7 +492,7 @@ class CoreAgent(Agent):
                     print(f"[ERROR] 处理非法律问题失败: {e}")
                     return "抱歉，在处理您的问题时遇到了技术问题。请稍后重试或咨询专业律师。"
             else:
-                print(f"[DEBUG] 继续处理法律问题，domain: {domain}")
+                _debug(f"[DEBUG] 继续处理法律问题，domain: {domain}")
             
             # 6. 路由到对应的子Agent
             self.update_status("⚙️ Phase 2: 智能路由", f"已识别领域: {domain.value}，意图: {intent.value}，正在唤醒专业Agent...", "running")
@@ -421,8 +500,7 @@ class CoreAgent(Agent):
                 sub_agent = self.get_or_create_sub_agent(domain, intent)
             except Exception as e:
                 print(f"[ERROR] 创建子Agent失败: {e}")
-                import traceback
-                traceback.print_exc()
+                _print_traceback()
                 return f"抱歉，系统在处理您的问题时遇到了技术问题（无法创建专业Agent）。请稍后重试或咨询专业律师。"
             
             # 执行任务（关键词提取现在由子Agent处理）
@@ -432,8 +510,7 @@ class CoreAgent(Agent):
                 result = await sub_agent.execute_task(user_message, domain, intent, status_callback)
             except Exception as e:
                 print(f"[ERROR] 子Agent执行任务失败: {e}")
-                import traceback
-                traceback.print_exc()
+                _print_traceback()
                 result = None
             
             # 确保有结果返回（即使max_steps到了也要返回）
@@ -456,8 +533,7 @@ class CoreAgent(Agent):
             
         except Exception as e:
             print(f"[ERROR] process_message发生未捕获的异常: {e}")
-            import traceback
-            traceback.print_exc()
+            _print_traceback()
             self.update_status("❌ Phase 4: 错误", "处理过程中发生错误", "error")
             return f"抱歉，系统在处理您的问题时遇到了技术问题：{str(e)}。请稍后重试或咨询专业律师。"
     
@@ -474,14 +550,14 @@ class CoreAgent(Agent):
         """
         try:
             # 使用domain+intent作为key，以便为不同意图创建定制化的子Agent
-            domain_str = domain.value if hasattr(domain, 'value') else str(domain)
-            intent_str = intent.value if intent and hasattr(intent, 'value') else (str(intent) if intent else 'default')
+            domain_str = str(enum_str(domain))
+            intent_str = str(enum_str(intent)) if intent else 'default'
             key = f"{domain_str}_{intent_str}"
             
-            print(f"[DEBUG] get_or_create_sub_agent: key={key}, domain={domain}, intent={intent}")
+            _debug(f"[DEBUG] get_or_create_sub_agent: key={key}, domain={domain}, intent={intent}")
             
             if key not in self.sub_agents:
-                print(f"[DEBUG] 创建新的子Agent: {key}")
+                _debug(f"[DEBUG] 创建新的子Agent: {key}")
                 from .specialized_agent import SpecializedAgent
                 try:
                     self.sub_agents[key] = SpecializedAgent(
@@ -490,22 +566,20 @@ class CoreAgent(Agent):
                         config=self.config,
                         memory=self.memory
                     )
-                    print(f"[DEBUG] 子Agent创建成功: {key}")
+                    _debug(f"[DEBUG] 子Agent创建成功: {key}")
                 except Exception as e:
                     print(f"[ERROR] 创建子Agent时发生异常: {e}")
                     print(f"[ERROR] domain类型: {type(domain)}, domain值: {domain}")
                     print(f"[ERROR] intent类型: {type(intent)}, intent值: {intent}")
-                    import traceback
-                    traceback.print_exc()
+                    _print_traceback()
                     raise
             else:
-                print(f"[DEBUG] 使用已存在的子Agent: {key}")
+                _debug(f"[DEBUG] 使用已存在的子Agent: {key}")
             
             return self.sub_agents[key]
         except Exception as e:
             print(f"[ERROR] get_or_create_sub_agent发生异常: {e}")
-            import traceback
-            traceback.print_exc()
+            _print_traceback()
             raise
     
     def update_state_memory(
@@ -522,8 +596,8 @@ class CoreAgent(Agent):
             intent: 法律意图（可选）
             entities: 关键实体字典（可选）
         """
-        domain_str = domain.value if domain else None
-        intent_str = intent.value if intent else None
+        domain_str = enum_str(domain) if domain else None
+        intent_str = enum_str(intent) if intent else None
         self.state_memory.update(domain=domain_str, intent=intent_str, entities=entities)
     
     def check_missing_required_info(
@@ -623,7 +697,7 @@ class CoreAgent(Agent):
 
         try:
             # 使用LLM进行评估（使用低温度以确保严格性）
-            response = self.domain_classifier.chat(
+            response = await self.domain_classifier.achat(
                 messages=[{"role": "user", "content": user_prompt}],
                 system_prompt=system_prompt,
                 temperature=0.0,  # 使用0温度，确保严格评估
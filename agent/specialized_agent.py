@@ -1,11 +1,14 @@
 """专业领域Agent，负责具体法律领域的任务执行"""
+import re
+import json
 from typing import Optional, Dict, Any, Tuple
 from .agent import Agent
 # 处理相对导入问题
 try:
     from ..schema import LegalDomain, LegalIntent, AgentState, Memory, StatusCallback, Message
     from ..config.config import Config
-    from ..models.llm import LLM
+    from ..models.llm import get_llm
+    from ..tools.web_search import WebSearchTool
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -16,7 +19,42 @@ except (ImportError, ValueError):
         sys.path.insert(0, str(project_root))
     from schema import LegalDomain, LegalIntent, AgentState, Memory, StatusCallback, Message
     from config.config import Config
-    from models.llm import LLM
+    from models.llm import get_llm
+    from tools.web_search import WebSearchTool
+
+
+# Critic评估结果的JSON提取（每轮评估都会用到，预编译一次）
+_FENCED_JSON_PATTERN = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+_BARE_JSON_PATTERN = re.compile(r'\{.*?\}', re.DOTALL)
+
+# 默认系统提示词中的领域和意图描述（所有实例共享）
+_DOMAIN_DESCRIPTIONS = {
+    LegalDomain.LABOR_LAW: "劳动法专家，擅长处理裁员、工资、劳动合同等劳动法相关问题",
+    LegalDomain.FAMILY_LAW: "婚姻家事法专家，擅长处理离婚、抚养权、财产分割等婚姻家事相关问题",
+    LegalDomain.CONTRACT_LAW: "合同法专家，擅长处理合同纠纷、合同审查等合同法相关问题",
+    LegalDomain.CORPORATE_LAW: "公司法专家，擅长处理公司治理、股权纠纷等公司法相关问题",
+    LegalDomain.CRIMINAL_LAW: "刑法专家，擅长处理刑事案件、量刑等刑法相关问题",
+    LegalDomain.PROCEDURAL_QUERY: "程序法专家，擅长处理诉讼程序、法院管辖、诉讼费等程序性问题",
+}
+
+_INTENT_DESCRIPTIONS = {
+    LegalIntent.QA_RETRIEVAL: "法律法规、法条、类似案例查询",
+    LegalIntent.CASE_ANALYSIS: "案情分析（用户描述了一个故事）",
+    LegalIntent.DOC_DRAFTING: "起草文书（合同、起诉状、律师函）",
+    LegalIntent.CALCULATION: "计算赔偿金、刑期、诉讼费",
+    LegalIntent.REVIEW_CONTRACT: "审查合同风险",
+    LegalIntent.CLARIFICATION: "信息不足，需要反问",
+}
+
+# 各意图对应的计划生成方法名（按名称查找，子类覆盖方法时同样生效）
+_PLAN_BUILDERS = {
+    LegalIntent.QA_RETRIEVAL: "_create_qa_retrieval_plan",
+    LegalIntent.CASE_ANALYSIS: "_create_case_analysis_plan",
+    LegalIntent.DOC_DRAFTING: "_create_doc_drafting_plan",
+    LegalIntent.CALCULATION: "_create_calculation_plan",
+    LegalIntent.REVIEW_CONTRACT: "_create_review_contract_plan",
+    LegalIntent.CLARIFICATION: "_create_clarification_plan",
+}
 
 
 class SpecializedAgent(Agent):
@@ -56,26 +94,8 @@ class SpecializedAgent(Agent):
         self.intent = intent
         
         # 根据领域和意图生成默认系统提示词
-        domain_descriptions = {
-            LegalDomain.LABOR_LAW: "劳动法专家，擅长处理裁员、工资、劳动合同等劳动法相关问题",
-            LegalDomain.FAMILY_LAW: "婚姻家事法专家，擅长处理离婚、抚养权、财产分割等婚姻家事相关问题",
-            LegalDomain.CONTRACT_LAW: "合同法专家，擅长处理合同纠纷、合同审查等合同法相关问题",
-            LegalDomain.CORPORATE_LAW: "公司法专家，擅长处理公司治理、股权纠纷等公司法相关问题",
-            LegalDomain.CRIMINAL_LAW: "刑法专家，擅长处理刑事案件、量刑等刑法相关问题",
-            LegalDomain.PROCEDURAL_QUERY: "程序法专家，擅长处理诉讼程序、法院管辖、诉讼费等程序性问题",
-        }
-        
-        intent_descriptions = {
-            LegalIntent.QA_RETRIEVAL: "法律法规、法条、类似案例查询",
-            LegalIntent.CASE_ANALYSIS: "案情分析（用户描述了一个故事）",
-            LegalIntent.DOC_DRAFTING: "起草文书（合同、起诉状、律师函）",
-            LegalIntent.CALCULATION: "计算赔偿金、刑期、诉讼费",
-            LegalIntent.REVIEW_CONTRACT: "审查合同风险",
-            LegalIntent.CLARIFICATION: "信息不足，需要反问",
-        }
-        
-        domain_desc = domain_descriptions.get(domain, "法律")
-        intent_desc = intent_descriptions.get(intent, "处理") if intent else "处理"
+        domain_desc = _DOMAIN_DESCRIPTIONS.get(domain, "法律")
+        intent_desc = _INTENT_DESCRIPTIONS.get(intent, "处理") if intent else "处理"
         
         # 使用prompt模板
         try:
@@ -107,7 +127,7 @@ class SpecializedAgent(Agent):
         # 在初始化后设置status_callback（BaseAgent有这个属性）
         self.status_callback = status_callback
         
-        self.llm = LLM(config or Config())
+        self.llm = get_llm(config or Config())
         
         # 根据意图设置next_step_prompt，引导工具选择
         try:
@@ -131,14 +151,12 @@ class SpecializedAgent(Agent):
                 REVIEW_CONTRACT_NEXT_STEP_PROMPT,
                 DEFAULT_NEXT_STEP_PROMPT
             )
-        if intent == LegalIntent.QA_RETRIEVAL:
-            self.next_step_prompt = QA_RETRIEVAL_NEXT_STEP_PROMPT
-        elif intent == LegalIntent.CALCULATION:
-            self.next_step_prompt = CALCULATION_NEXT_STEP_PROMPT
-        elif intent == LegalIntent.REVIEW_CONTRACT:
-            self.next_step_prompt = REVIEW_CONTRACT_NEXT_STEP_PROMPT
-        else:
-            self.next_step_prompt = DEFAULT_NEXT_STEP_PROMPT
+        next_step_prompts = {
+            LegalIntent.QA_RETRIEVAL: QA_RETRIEVAL_NEXT_STEP_PROMPT,
+            LegalIntent.CALCULATION: CALCULATION_NEXT_STEP_PROMPT,
+            LegalIntent.REVIEW_CONTRACT: REVIEW_CONTRACT_NEXT_STEP_PROMPT,
+        }
+        self.next_step_prompt = next_step_prompts.get(intent, DEFAULT_NEXT_STEP_PROMPT)
     
     async def execute_task(
         self,
@@ -244,12 +262,12 @@ class SpecializedAgent(Agent):
                         f"【Critic反馈 - 第{critic_round}轮】\n{feedback}\n\n需要重新搜索，新的搜索关键词：{new_search_query}"
                     )
                     
-                    # 调用web_search工具（同步方法，不需要await）
-                    from ..tools.web_search import WebSearchTool
-                    web_search_tool = WebSearchTool(self.config)
-                    search_result = web_search_tool.execute(
+                    # 调用web_search工具（aexecute在线程池执行，不阻塞事件循环）；
+                    # 复用工具管理器中已创建的实例，不在请求中途导入模块和创建工具
+                    web_search_tool = self.tool_manager.get_tool("web_search") or WebSearchTool(self.config)
+                    search_result = await web_search_tool.aexecute(
                         user_input=new_search_query,
-                        context={"messages": [msg.to_dict() for msg in self.memory.get_recent_messages(10)]}
+                        context={"messages": self.memory.to_openai_messages(10)}
                     )
                     
                     # 将搜索结果添加到memory
@@ -290,7 +308,7 @@ Critic反馈：{feedback}
                     messages_dict.append({"role": "user", "content": improved_prompt})
                     
                     try:
-                        response = self.llm.chat(
+                        response = await self.llm.achat(
                             messages=messages_dict,
                             system_prompt=self.system_prompt,
                             temperature=0.7,
@@ -343,20 +361,10 @@ Critic反馈：{feedback}
             执行计划文本
         """
         # 根据意图类型生成不同的计划
-        if intent == LegalIntent.QA_RETRIEVAL:
-            return await self._create_qa_retrieval_plan(user_message, domain)
-        elif intent == LegalIntent.CASE_ANALYSIS:
-            return await self._create_case_analysis_plan(user_message, domain)
-        elif intent == LegalIntent.DOC_DRAFTING:
-            return await self._create_doc_drafting_plan(user_message, domain)
-        elif intent == LegalIntent.CALCULATION:
-            return await self._create_calculation_plan(user_message, domain)
-        elif intent == LegalIntent.REVIEW_CONTRACT:
-            return await self._create_review_contract_plan(user_message, domain)
-        elif intent == LegalIntent.CLARIFICATION:
-            return await self._create_clarification_plan(user_message, domain)
-        else:
+        builder = _PLAN_BUILDERS.get(intent)
+        if builder is None:
             return "执行任务"
+        return await getattr(self, builder)(user_message, domain)
     
     async def _create_qa_retrieval_plan(self, user_message: str, domain: LegalDomain) -> str:
         """创建QA检索计划 - 升级版：先理解再检索"""
@@ -451,7 +459,7 @@ Critic反馈：{feedback}
         
         try:
             # 使用LLM进行评估（使用低温度以确保严格性）
-            response = self.llm.chat(
+            response = await self.llm.achat(
                 messages=[{"role": "user", "content": user_prompt}],
                 system_prompt=system_prompt,
                 temperature=0.0,  # 使用0温度，确保严格评估
@@ -459,17 +467,15 @@ Critic反馈：{feedback}
             )
             
             # 解析JSON响应
-            import re
-            import json
             response = response.strip()
             
             # 提取JSON
             if "```" in response:
-                json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
+                json_match = _FENCED_JSON_PATTERN.search(response)
                 if json_match:
                     response = json_match.group(1)
             else:
-                json_match = re.search(r'\{.*?\}', response, re.DOTALL)
+                json_match = _BARE_JSON_PATTERN.search(response)
                 if json_match:
                     response = json_match.group(0)
             
@@ -524,7 +530,7 @@ Critic反馈（需要改进的地方）：
 请只返回搜索关键词，不要返回其他内容："""
         
         try:
-            response = self.llm.chat(
+            response = await self.llm.achat(
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
                 max_tokens=200
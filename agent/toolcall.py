@@ -1,6 +1,7 @@
 """ToolCallAgent类"""
 import asyncio
 import json
+import traceback
 from typing import List, Dict, Any, Optional, Union
 from .react import ReActAgent
 # 处理相对导入问题
@@ -9,7 +10,7 @@ try:
     from ..tools.base import BaseTool
     from ..schema import AgentState, Memory, Message
     from ..config.config import Config
-    from ..models.llm import LLM
+    from ..models.llm import get_llm
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -22,7 +23,7 @@ except (ImportError, ValueError):
     from tools.base import BaseTool
     from schema import AgentState, Memory, Message
     from config.config import Config
-    from models.llm import LLM
+    from models.llm import get_llm
 
 
 class ToolCallAgent(ReActAgent):
@@ -81,7 +82,7 @@ class ToolCallAgent(ReActAgent):
         self.max_observe = max_observe
         
         # 初始化LLM（用于Native Function Calling）
-        self.llm = LLM(self.config)
+        self.llm = get_llm(self.config)
         
         # 获取工具映射字典（工具名称 -> 执行函数）
         self.available_functions = self.tool_manager.get_available_functions()
@@ -133,7 +134,9 @@ class ToolCallAgent(ReActAgent):
         
         # 调用LLM的chat_with_tools方法（Native Function Calling）
         try:
-            response = self.llm.chat_with_tools(
+            # 同步调用放到线程池执行，不阻塞事件循环
+            response = await asyncio.to_thread(
+                self.llm.chat_with_tools,
                 messages=messages_dict,
                 tools=tools_schema,
                 tool_choice="auto",  # 让模型自己决定是否使用工具
@@ -256,18 +259,30 @@ class ToolCallAgent(ReActAgent):
         if not self.current_tool_calls:
             return "No tools to execute"
         
+        tool_count = len(self.current_tool_calls)
+        tool_names = [tool_call.get("function", {}).get("name", "") for tool_call in self.current_tool_calls]
+        # 更新状态：同时执行本轮的全部工具
+        self.update_status(
+            f"⚡ Step {self.current_step}: 执行工具 (共{tool_count}个)",
+            f"正在并发执行工具: {', '.join(tool_names)}...",
+            "running"
+        )
+        
+        # 同一轮的多个工具调用互不依赖，并发执行（execute_tool内部捕获异常）；
+        # 结果按调用顺序写入记忆
+        outcomes = await asyncio.gather(
+            *(self.execute_tool(tool_call) for tool_call in self.current_tool_calls)
+        )
+        
         results = []
-        for idx, tool_call in enumerate(self.current_tool_calls):
-            tool_name = tool_call.get("function", {}).get("name", "")
-            # 更新状态：执行工具
+        for idx, (tool_call, tool_name, result) in enumerate(zip(self.current_tool_calls, tool_names, outcomes)):
+            # 更新状态：逐个报告工具完成
             self.update_status(
-                f"⚡ Step {self.current_step}: 执行工具 ({idx+1}/{len(self.current_tool_calls)})",
-                f"正在执行工具: {tool_name}...",
-                "running"
+                f"⚡ Step {self.current_step}: 工具完成 ({idx+1}/{tool_count})",
+                f"工具执行完成: {tool_name}",
+                "complete"
             )
             
-            result = await self.execute_tool(tool_call)
-            
             # 限制观察结果长度
             if self.max_observe and isinstance(self.max_observe, int):
                 result = result[:self.max_observe]
@@ -318,7 +333,7 @@ class ToolCallAgent(ReActAgent):
             
             # 构建上下文
             context = {
-                "messages": [msg.to_dict() for msg in self.memory.get_recent_messages(10)],
+                "messages": self.memory.to_openai_messages(10),
                 "max_results": args_dict.get("max_results", 5)
             }
             
@@ -337,11 +352,11 @@ class ToolCallAgent(ReActAgent):
             )
             
             # 执行工具（使用映射字典中的函数）
-            # 支持同步和异步工具
+            # 支持同步和异步工具（同步工具放到线程池执行，不阻塞事件循环）
             if asyncio.iscoroutinefunction(tool_function):
                 result = await tool_function(user_input=tool_input, context=context)
             else:
-                result = tool_function(user_input=tool_input, context=context)
+                result = await asyncio.to_thread(tool_function, user_input=tool_input, context=context)
             
             # 格式化结果
             observation = (
@@ -370,7 +385,6 @@ class ToolCallAgent(ReActAgent):
         except Exception as e:
             error_msg = f"⚠️ Tool '{name}' encountered a problem: {str(e)}"
             print(f"🚨 {error_msg}")
-            import traceback
             traceback.print_exc()
             return f"Error: {error_msg}"
     
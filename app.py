@@ -196,7 +196,7 @@ def extract_execution_details_from_agent(core_agent: CoreAgent) -> List[Dict[str
                 print(f"[DEBUG] 从子Agent提取日志: {agent_key}")
                 
                 if hasattr(sub_agent, 'memory') and sub_agent.memory and hasattr(sub_agent.memory, 'messages'):
-                    messages = sub_agent.memory.messages
+                    messages = list(sub_agent.memory.messages)
                     print(f"[DEBUG] 子Agent memory消息数: {len(messages)}")
                     current_step = 0
                     
@@ -1,7 +1,7 @@
 """系统配置文件"""
 import os
-from typing import Optional
-from dataclasses import dataclass
+from typing import Optional, Tuple
+from dataclasses import dataclass, fields
 
 
 def _find_api_key_from_env(key_name: str = None) -> Optional[str]:
@@ -43,6 +43,16 @@ class Config:
     llm_max_tokens: int = 2000
     llm_timeout: float = 120.0  # LLM API调用超时时间（秒）- 增加到120秒
     llm_max_retries: int = 3  # LLM API调用最大重试次数
+    llm_context_window: int = 32768  # 模型上下文窗口（token），输入加输出超出时裁剪最长用户消息的中间部分（0表示不检查）
+    llm_concurrency: int = 8  # 批量异步调用LLM时的最大并发请求数
+    llm_max_connections: int = 100  # LLM HTTP连接池的最大连接数
+    llm_max_keepalive_connections: int = 20  # LLM HTTP连接池保持的空闲长连接数
+    llm_cache_enabled: bool = False  # 是否缓存LLM回复（只缓存temperature<=0.3的请求）
+    llm_cache_ttl: float = 3600.0  # LLM回复缓存有效期（秒）
+    llm_cache_threshold: float = 0.95  # 语义缓存命中的最低余弦相似度
+    llm_cache_size: int = 1024  # LLM回复缓存最大条目数
+    llm_disk_cache_enabled: bool = False  # 是否把低温度请求的LLM回复缓存到磁盘（跨进程复用，适合开发调试和重复评测）
+    llm_disk_cache_dir: str = "~/.cache/law_agent/llm"  # LLM回复磁盘缓存目录
     
     # Embedding配置（使用DashScope接口）
     embedding_model: str = "text-embedding-v4"  # DashScope embedding model
@@ -50,10 +60,21 @@ class Config:
     embedding_api_key: Optional[str] = None  # API key（必须从环境变量或参数传入）
     embedding_timeout: float = 300.0  # Embedding API调用超时时间（秒）- 增加到300秒
     embedding_max_retries: int = 3  # Embedding API调用最大重试次数
+    embedding_concurrency: int = 4  # 文本超过单次请求上限分批时的最大并发请求数
     
     # 向量数据库配置
     vector_db_path: str = "./data/vector_db"
     vector_db_collection: str = "long_term_memory"
+    vector_db_batch_size: int = 100  # ChromaDB写入缓冲大小（攒够后一次性写入）
+    vector_db_query_cache_size: int = 1024  # ChromaDB检索结果LRU缓存条目数（0表示不缓存）
+    vector_backend: str = "chroma"  # 向量存储后端：chroma / faiss_pq（大规模记忆使用IVF-PQ压缩索引）
+    faiss_pq_m: int = 64  # PQ子空间数量（每条向量压缩后的字节数）
+    faiss_pq_nbits: int = 8  # 每个PQ子空间的编码位数
+    faiss_train_threshold: int = 20000  # 记忆数量达到该值后训练IVF-PQ索引
+    vector_store_precision: str = "fp32"  # 内存向量存储的精度：fp32 / fp16（存储减半）/ int8（每条向量一个缩放因子）/ turbo（TurboQuant量化）
+    vector_store_quant_bits: int = 4  # turbo精度下每个坐标的编码位数（3-5位时约为fp32的1/8-1/10）
+    vector_store_use_hnsw: bool = False  # 内存向量存储是否使用HNSW近似最近邻索引（需要hnswlib）
+    vector_store_mmap: bool = False  # 内存向量存储是否以mmap文件持久化到vector_db_path（重启免重建）
     
     # 上下文配置
     context_window_size: int = 10  # 保留最近N轮对话
@@ -62,12 +83,19 @@ class Config:
     # 记忆配置
     session_memory_size: int = 50  # session记忆大小
     long_term_memory_top_k: int = 5  # 检索长期记忆的top-k
+    long_term_memory_cache_size: int = 256  # 长期记忆检索结果缓存条目数（0表示不缓存）
+    long_term_memory_cache_ttl: float = 300.0  # 长期记忆检索结果缓存有效期（秒）
+    query_embedding_cache_size: int = 1024  # 查询文本embedding的LRU缓存条目数
     
     # 工具配置
     web_search_max_results: int = 8  # 博查搜索默认返回8条结果
+    web_search_max_chars: int = 0  # 搜索结果格式化后的最大字符数（超出时丢弃排序靠后的结果，0表示不限制）
     bocha_api_key: Optional[str] = None  # 博查API Key（必须从环境变量或参数传入）
     python_executor_timeout: int = 30
     
+    # 路由配置
+    routing_keyword_shortcut_hits: int = 2  # 领域关键词命中数达到该值、只涉及一个领域且意图关键词只指向一个意图时跳过LLM识别（0表示关闭）
+    
     # Self-reflection配置
     reflection_enabled: bool = True
     reflection_roles: list = None  # 不同角色的prompt
@@ -107,4 +135,20 @@ class Config:
                 _find_api_key_from_env("BOCHA_API_KEY") or
                 _find_api_key_from_env()
             )
+    
+    def subset_key(self, *prefixes: str) -> Tuple:
+        """
+        取出指定前缀的配置项，组成可哈希的键（用于按配置复用模型客户端等共享实例）
+        
+        Args:
+            prefixes: 配置项名称前缀（如"llm_"、"embedding_"）
+            
+        Returns:
+            (配置项名称, 值)组成的元组
+        """
+        return tuple(
+            (f.name, getattr(self, f.name))
+            for f in fields(self)
+            if f.name.startswith(prefixes)
+        )
 
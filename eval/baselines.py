@@ -1,12 +1,12 @@
 """Baseline实现"""
-import asyncio
 import sys
+import asyncio
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 
 # 处理导入：优先使用相对导入，失败时使用绝对导入
 try:
-    from ..models.llm import LLM
+    from ..models.llm import get_llm
     from ..config.config import Config
     from ..tools.web_search import WebSearchTool
 except (ImportError, ValueError):
@@ -17,18 +17,28 @@ except (ImportError, ValueError):
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
     try:
-        from models.llm import LLM
+        from models.llm import get_llm
         from config.config import Config
         from tools.web_search import WebSearchTool
     except ImportError:
         # 如果还是失败，尝试从项目根目录导入
         import os
         os.chdir(project_root)
-        from models.llm import LLM
+        from models.llm import get_llm
         from config.config import Config
         from tools.web_search import WebSearchTool
 
 
+# Baseline B的提示词：系统提示词固定不变并始终作为第一条消息发送，便于服务端复用相同前缀的缓存
+_BASELINE_B_SYSTEM_PROMPT = "你是一个法律助手，请根据搜索结果回答用户的问题。"
+_BASELINE_B_USER_TEMPLATE = """用户问题：{query}
+
+搜索结果：
+{search_results}
+
+请根据搜索结果回答用户的问题。如果搜索结果中没有相关信息，请说明无法回答。"""
+
+
 class BaselineA:
     """
     Baseline A: Raw Model (裸模型)
@@ -39,7 +49,7 @@ class BaselineA:
     
     def __init__(self, config: Optional[Config] = None):
         self.config = config or Config()
-        self.llm = LLM(self.config)
+        self.llm = get_llm(self.config)
     
     async def run(self, query: str) -> str:
         """
@@ -52,20 +62,36 @@ class BaselineA:
             LLM生成的回答
         """
         try:
-            # LLM.chat是同步方法，在异步函数中使用run_in_executor
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.llm.chat(
-                    messages=[{"role": "user", "content": query}],
-                    system_prompt=None,  # 无System Prompt
-                    temperature=0.7,
-                    max_tokens=self.config.llm_max_tokens
-                )
+            response = await self.llm.achat(
+                messages=[{"role": "user", "content": query}],
+                system_prompt=None,  # 无System Prompt
+                temperature=0.7,
+                max_tokens=self.config.llm_max_tokens
             )
             return response
         except Exception as e:
             return f"Error: {str(e)}"
+    
+    def run_batch(self, queries: List[str]) -> List[str]:
+        """
+        通过Batch API离线运行Baseline A（大规模评测时费用减半，但需要等待批任务完成）
+        
+        Args:
+            queries: 用户问题列表
+            
+        Returns:
+            与问题顺序一致的回答列表
+        """
+        try:
+            batch_id = self.llm.submit_batch(
+                [[{"role": "user", "content": query}] for query in queries],
+                system_prompt=None,
+                temperature=0.7,
+                max_tokens=self.config.llm_max_tokens
+            )
+            return self.llm.wait_batch(batch_id)
+        except Exception as e:
+            return [f"Error: {str(e)}"] * len(queries)
 
 
 class BaselineB:
@@ -78,7 +104,7 @@ class BaselineB:
     
     def __init__(self, config: Optional[Config] = None):
         self.config = config or Config()
-        self.llm = LLM(self.config)
+        self.llm = get_llm(self.config)
         self.web_search = WebSearchTool(self.config)
     
     async def run(self, query: str) -> str:
@@ -92,29 +118,47 @@ class BaselineB:
             基于搜索结果生成的回答
         """
         try:
-            # 1. 搜索
-            search_results = self.web_search.execute(query, {"max_results": 5})
+            prompt = await self._build_prompt(query)
             
             # 2. 生成回答
-            prompt = f"""用户问题：{query}
-
-搜索结果：
-{search_results}
-
-请根据搜索结果回答用户的问题。如果搜索结果中没有相关信息，请说明无法回答。"""
-            
-            # LLM.chat是同步方法，在异步函数中使用run_in_executor
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.llm.chat(
-                    messages=[{"role": "user", "content": prompt}],
-                    system_prompt="你是一个法律助手，请根据搜索结果回答用户的问题。",
-                    temperature=0.7,
-                    max_tokens=self.config.llm_max_tokens
-                )
+            response = await self.llm.achat(
+                messages=[{"role": "user", "content": prompt}],
+                system_prompt=_BASELINE_B_SYSTEM_PROMPT,
+                temperature=0.7,
+                max_tokens=self.config.llm_max_tokens
             )
             
             return response
         except Exception as e:
             return f"Error: {str(e)}"
+    
+    async def run_stream(self, query: str) -> AsyncIterator[str]:
+        """
+        流式运行Baseline B：搜索完成后边生成边返回回答片段
+        
+        Args:
+            query: 用户问题
+            
+        Yields:
+            回答片段（"".join后与run的回答一致）
+        """
+        try:
+            prompt = await self._build_prompt(query)
+            async for delta in self.llm.achat_stream(
+                messages=[{"role": "user", "content": prompt}],
+                system_prompt=_BASELINE_B_SYSTEM_PROMPT,
+                temperature=0.7,
+                max_tokens=self.config.llm_max_tokens
+            ):
+                yield delta
+        except Exception as e:
+            yield f"Error: {str(e)}"
+    
+    async def _build_prompt(self, query: str) -> str:
+        """搜索并构建生成回答的prompt"""
+        # 1. 搜索（同步请求放到线程中执行，同时预先建立LLM连接）
+        search_results, _ = await asyncio.gather(
+            asyncio.to_thread(self.web_search.execute, query, {"max_results": 5}),
+            self.llm.awarmup()
+        )
+        return _BASELINE_B_USER_TEMPLATE.format(query=query, search_results=search_results)
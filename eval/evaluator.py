@@ -25,6 +25,41 @@ except (ImportError, ValueError):
     from config.config import Config
 
 
+# 各系统出错时不抛异常，而是返回以这些固定前缀开头的回答
+_ERROR_ANSWER_PREFIXES = ("Error:", "抱歉，生成回复时遇到错误", "生成回复时出错")
+
+
+def _unwrap_answer(outcome: Any) -> str:
+    """
+    取出asyncio.gather返回的回答，异常重新抛出
+    
+    Args:
+        outcome: 系统运行结果（回答字符串或异常）
+        
+    Returns:
+        回答字符串
+    """
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
+
+
+def _is_error_answer(answer: Optional[str]) -> bool:
+    """
+    判断回答是否为空或系统返回的错误回答
+    
+    错误回答仍按正常回答计入法条命中率等指标（命中率为0），保证各系统的统计口径一致；
+    只用于跳过LLM Judge。只检查固定前缀（startswith一次比较），正文中引用"Error"等字样的正常回答不受影响。
+    
+    Args:
+        answer: 回答
+        
+    Returns:
+        是否为错误回答
+    """
+    return not answer or answer.startswith(_ERROR_ANSWER_PREFIXES)
+
+
 class Evaluator:
     """评估器类，实现完整的评估流程"""
     
@@ -127,12 +162,22 @@ class Evaluator:
         step_num = 1
         total_steps = 3 if not self.target_only else 1
         
-        # 1. 运行 Baseline A（如果启用）
+        # 各系统互不依赖，并发运行（各系统的LLM调用都不阻塞事件循环，网络等待可以相互重叠），
+        # 再按顺序处理各自的结果；单个系统的异常作为结果返回，不影响其他系统
+        print(f"  并发运行{'Baseline A、Baseline B 和 ' if not self.target_only else ''}Target System...")
+        self.core_agent.state = self.core_agent.state.__class__.IDLE  # 重置Agent状态
+        self.core_agent.current_step = 0
+        runs = [self.target_system.execute(query)]
         if not self.target_only:
-            print(f"  [{step_num}/{total_steps}] 运行 Baseline A (Raw Model)...")
+            runs = [self.baseline_a.run(query), self.baseline_b.run(query)] + runs
+        outcomes = await asyncio.gather(*runs, return_exceptions=True)
+        
+        # 1. Baseline A 结果（如果启用）
+        if not self.target_only:
+            print(f"  [{step_num}/{total_steps}] Baseline A (Raw Model)...")
             step_num += 1
             try:
-                res_a = await self.baseline_a.run(query)
+                res_a = _unwrap_answer(outcomes[0])
                 laws_a = extract_laws(res_a)
                 recall_a = calculate_recall(laws_a, ground_truth_laws)
                 false_rate_a = check_false_citation(laws_a)
@@ -153,11 +198,11 @@ class Evaluator:
                 print(f"    Error: {e}")
                 case_result["baseline_a"] = {"error": str(e)}
             
-            # 2. 运行 Baseline B
-            print(f"  [{step_num}/{total_steps}] 运行 Baseline B (Naive Agent)...")
+            # 2. Baseline B 结果
+            print(f"  [{step_num}/{total_steps}] Baseline B (Naive Agent)...")
             step_num += 1
             try:
-                res_b = await self.baseline_b.run(query)
+                res_b = _unwrap_answer(outcomes[1])
                 case_result["baseline_b"] = {
                     "answer": res_b
                 }
@@ -166,14 +211,10 @@ class Evaluator:
                 print(f"    Error: {e}")
                 case_result["baseline_b"] = {"error": str(e)}
         
-        # 3. 运行 Target System
-        print(f"  [{step_num}/{total_steps}] 运行 Target System (Multi-Agent)...")
+        # 3. Target System 结果
+        print(f"  [{step_num}/{total_steps}] Target System (Multi-Agent)...")
         try:
-            # 重置Agent状态
-            self.core_agent.state = self.core_agent.state.__class__.IDLE
-            self.core_agent.current_step = 0
-            
-            res_target = await self.target_system.execute(query)
+            res_target = _unwrap_answer(outcomes[-1])
             laws_target = extract_laws(res_target)
             recall_target = calculate_recall(laws_target, ground_truth_laws)
             false_rate_target = check_false_citation(laws_target)
@@ -211,7 +252,11 @@ class Evaluator:
             case_result["target_system"] = {"error": str(e)}
         
         # 4. LLM Judge 比较 Baseline B 和 Target System（如果启用）
-        if not self.target_only and case_result["baseline_b"].get("answer") and case_result["target_system"].get("answer"):
+        if (
+            not self.target_only
+            and not _is_error_answer(case_result["baseline_b"].get("answer"))
+            and not _is_error_answer(case_result["target_system"].get("answer"))
+        ):
             print(f"  [{step_num + 1}/{step_num + 1}] LLM Judge 评估...")
             try:
                 comparison = await llm_judge(
@@ -132,7 +132,7 @@ async def llm_judge(
     # 延迟导入：在函数内部导入，避免循环导入
     # 优先尝试相对导入，失败则使用绝对导入
     try:
-        from ..models.llm import LLM
+        from ..models.llm import get_llm
         from ..config.config import Config
     except (ImportError, ValueError):
         # 如果相对导入失败，使用绝对导入
@@ -140,13 +140,13 @@ async def llm_judge(
         project_root = current_file.parent.parent
         if str(project_root) not in sys.path:
             sys.path.insert(0, str(project_root))
-        from models.llm import LLM
+        from models.llm import get_llm
         from config.config import Config
     
     if config is None:
         config = Config()
     
-    llm = LLM(config)
+    llm = get_llm(config)
     
     # 构建评估Prompt
     judge_prompt = f"""你是一个专业的法律问答评估专家。请比较以下两个回答的质量。
@@ -1,4 +1,5 @@
 """Agent系统使用示例"""
+import asyncio
 import sys
 import os
 
@@ -9,28 +10,34 @@ from config.config import Config
 from agent.agent import Agent
 
 
-def example_basic_usage():
+_config = None
+
+
+def _get_config() -> Config:
+    """获取全部示例共用的配置（首次调用时创建）"""
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
+
+
+async def example_basic_usage(agent: Agent = None):
     """基本使用示例"""
-    # 初始化配置
-    config = Config()
-    
-    # 创建Agent实例
-    agent = Agent(config)
+    # 创建Agent实例（传入时复用已有的Agent）
+    agent = agent or Agent(_get_config())
     
     # 处理用户消息
-    import asyncio
     user_message = "你好，请帮我搜索一下Python的最新版本信息"
-    response = asyncio.run(agent.process_message(user_message))
+    response = await agent.process_message(user_message)
+    print("\n1. 基本使用示例:")
     print(f"用户: {user_message}")
     print(f"Agent: {response}")
     print("-" * 50)
 
 
-def example_multi_turn_conversation():
+async def example_multi_turn_conversation(agent: Agent = None):
     """多轮对话示例"""
-    import asyncio
-    config = Config()
-    agent = Agent(config)
+    agent = agent or Agent(_get_config())
     
     # 第一轮对话
     messages = [
@@ -40,21 +47,19 @@ def example_multi_turn_conversation():
     ]
     
     for msg in messages:
-        response = asyncio.run(agent.process_message(msg))
-        print(f"用户: {msg}")
-        print(f"Agent: {response}")
+        response = await agent.process_message(msg)
+        print(f"[多轮对话] 用户: {msg}")
+        print(f"[多轮对话] Agent: {response}")
         print("-" * 50)
     
     # 重置会话
     agent.reset()
-    print("会话已重置")
+    print("[多轮对话] 会话已重置")
 
 
-def example_with_tools():
+async def example_with_tools(agent: Agent = None):
     """使用工具的示例"""
-    import asyncio
-    config = Config()
-    agent = Agent(config)
+    agent = agent or Agent(_get_config())
     
     # 需要Web搜索的消息
     messages = [
@@ -64,22 +69,28 @@ def example_with_tools():
     ]
     
     for msg in messages:
-        response = asyncio.run(agent.process_message(msg))
-        print(f"用户: {msg}")
-        print(f"Agent: {response}")
+        response = await agent.process_message(msg)
+        print(f"[使用工具] 用户: {msg}")
+        print(f"[使用工具] Agent: {response}")
         print("-" * 50)
 
 
-if __name__ == "__main__":
-    print("=" * 50)
-    print("Agent系统使用示例")
-    print("=" * 50)
-    print("\n1. 基本使用示例:")
-    example_basic_usage()
+async def run_all():
+    """在同一个事件循环中依次运行全部示例（共用一个Agent，示例之间重置会话状态）"""
+    agent = Agent(_get_config())
+    
+    await example_basic_usage(agent)
+    agent.reset()
     
     print("\n2. 多轮对话示例:")
-    example_multi_turn_conversation()
+    await example_multi_turn_conversation(agent)  # 结束时已重置会话
     
     print("\n3. 使用工具的示例:")
-    example_with_tools()
+    await example_with_tools(agent)
+
 
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Agent系统使用示例")
+    print("=" * 50)
+    asyncio.run(run_all())
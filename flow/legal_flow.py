@@ -7,7 +7,7 @@ try:
     from ..agent.core_agent import CoreAgent
     from ..schema import LegalDomain, LegalIntent, StatusCallback
     from ..config.config import Config
-    from ..models.llm import LLM
+    from ..models.llm import LLM, get_llm
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -20,7 +20,7 @@ except (ImportError, ValueError):
     from agent.core_agent import CoreAgent
     from schema import LegalDomain, LegalIntent, StatusCallback
     from config.config import Config
-    from models.llm import LLM
+    from models.llm import LLM, get_llm
 
 
 class LegalFlow(BaseFlow):
@@ -55,7 +55,7 @@ class LegalFlow(BaseFlow):
         # 使用object.__setattr__来绕过Pydantic的限制
         object.__setattr__(self, 'core_agent', core_agent)
         object.__setattr__(self, 'config', config)
-        object.__setattr__(self, 'llm', LLM(config))
+        object.__setattr__(self, 'llm', get_llm(config))
     
     async def execute(self, input_text: str, status_callback: Optional[StatusCallback] = None) -> str:
         """
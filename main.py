@@ -1,4 +1,5 @@
 """Agent系统主入口"""
+import asyncio
 import sys
 import os
 
@@ -9,7 +10,7 @@ from config.config import Config
 from agent.agent import Agent
 
 
-def main():
+async def main():
     """主函数"""
     # 初始化配置
     config = Config()
@@ -22,19 +23,18 @@ def main():
     print("-" * 50)
     
     while True:
-        user_input = input("\n用户: ")
+        # 在线程中读取输入，整个会话共用一个事件循环（异步客户端绑定在该循环上）
+        user_input = await asyncio.to_thread(input, "\n用户: ")
         
         if user_input.lower() in ['exit', 'quit', '退出']:
             print("再见！")
             break
         
         # 处理用户消息
-        import asyncio
-        response = asyncio.run(agent.process_message(user_input))
+        response = await agent.process_message(user_input)
         
         print(f"\nAgent: {response}")
 
 
 if __name__ == "__main__":
-    main()
-
+    asyncio.run(main())
@@ -1,5 +1,6 @@
 """上下文管理器"""
 from typing import List, Dict, Any, Optional
+import numpy as np
 from .refiner import ContextRefiner
 # 处理相对导入问题
 try:
@@ -190,30 +191,20 @@ class ContextManager:
             return key_points
         
         try:
-            # 使用embedding计算相似度
-            embeddings = self.refiner.embedding_model.encode(key_points)
+            # 使用embedding计算相似度：归一化后一次矩阵乘法得到全部两两余弦相似度
+            embeddings = np.asarray(self.refiner.embedding_model.encode(key_points), dtype=np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            normalized = np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+            similar = (normalized @ normalized.T) >= similarity_threshold
             
+            # 按顺序保留关键点，并把排在其后、与之相似的点标记为已使用
             unique_points = []
-            used_indices = set()
-            
+            used = np.zeros(len(key_points), dtype=bool)
             for i, point in enumerate(key_points):
-                if i in used_indices:
+                if used[i]:
                     continue
-                
                 unique_points.append(point)
-                
-                # 找到相似的点并标记为已使用
-                for j in range(i + 1, len(key_points)):
-                    if j in used_indices:
-                        continue
-                    
-                    similarity = self.refiner._cosine_similarity(
-                        embeddings[i],
-                        embeddings[j]
-                    )
-                    
-                    if similarity >= similarity_threshold:
-                        used_indices.add(j)
+                used[i + 1:] |= similar[i, i + 1:]
             
             return unique_points
         
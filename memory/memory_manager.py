@@ -1,5 +1,8 @@
 """记忆管理器：统一管理短期记忆、全局信息和长期记忆"""
-from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 from .session import SessionMemory
 from .vector_db import VectorDatabase
 from .global_memory import GlobalMemory
@@ -54,9 +57,10 @@ class MemoryManager:
         Returns:
             Session记忆实例
         """
-        if session_id not in self.sessions:
-            self.sessions[session_id] = SessionMemory(self.config, session_id)
-        return self.sessions[session_id]
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = SessionMemory(self.config, session_id)
+        return session
     
     def save_conversation(
         self, 
@@ -78,26 +82,88 @@ class MemoryManager:
             存储的ID
         """
         # 保存到短期记忆
-        session = self.get_session(session_id)
-        session.add_message("user", user_message, {"intent": intent})
-        session.add_message("assistant", assistant_message)
+        self.get_session(session_id).add_messages([
+            ("user", user_message, {"intent": intent}),
+            ("assistant", assistant_message, None)
+        ])
         
         # 保存到长期记忆（向量数据库）
+        conversation_text, metadata = self._build_conversation_memory(
+            session_id, user_message, assistant_message, intent
+        )
+        memory_id = self.vector_db.add_memory(conversation_text, metadata)
+        
+        return memory_id
+    
+    @staticmethod
+    def _build_conversation_memory(
+        session_id: str,
+        user_message: str,
+        assistant_message: str,
+        intent: Optional[str]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """构建一轮对话在长期记忆中的内容和元数据"""
         conversation_text = f"User: {user_message}\nAssistant: {assistant_message}"
         metadata = {
             "session_id": session_id,
             "intent": intent,
             "type": "conversation"
         }
-        memory_id = self.vector_db.add_memory(conversation_text, metadata)
+        return conversation_text, metadata
+    
+    async def asave_turn(
+        self,
+        session_id: str,
+        user_message: str,
+        assistant_message: str,
+        intent: Optional[str] = None,
+        refined_context: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        异步保存一轮对话及（可选的）精炼上下文
         
-        return memory_id
+        对话和精炼上下文的文本一次性批量编码并写入向量数据库（一次embedding请求），
+        整个写入过程在线程池中执行，不阻塞事件循环。
+        
+        Args:
+            session_id: 会话ID
+            user_message: 用户消息
+            assistant_message: Assistant回复
+            intent: 用户意图
+            refined_context: 精炼上下文（包含summary, key_points, important_info）
+            
+        Returns:
+            存储的ID列表
+        """
+        # 保存到短期记忆
+        self.get_session(session_id).add_messages([
+            ("user", user_message, {"intent": intent}),
+            ("assistant", assistant_message, None)
+        ])
+        
+        # 收集需要写入长期记忆的内容
+        conversation_text, conversation_metadata = self._build_conversation_memory(
+            session_id, user_message, assistant_message, intent
+        )
+        contents = [conversation_text]
+        metadatas = [conversation_metadata]
+        if refined_context and refined_context.get("summary"):
+            content, metadata = self.vector_db.build_refined_context(
+                summary=refined_context.get("summary", ""),
+                key_points=refined_context.get("key_points", []),
+                important_info=refined_context.get("important_info", {})
+            )
+            contents.append(content)
+            metadatas.append(metadata)
+        
+        return await asyncio.to_thread(self.vector_db.add_memories, contents, metadatas)
     
     def save_refined_context(
         self,
         summary: str,
         key_points: List[str],
-        important_info: Dict[str, Any]
+        important_info: Dict[str, Any],
+        embedding: Optional[np.ndarray] = None
     ) -> str:
         """
         保存精炼后的上下文到长期记忆
@@ -106,6 +172,7 @@ class MemoryManager:
             summary: 摘要
             key_points: 关键点列表
             important_info: 重要信息
+            embedding: 可选的预计算embedding（调用方已编码过时传入，省去一次embedding请求）
             
         Returns:
             存储的ID
@@ -113,7 +180,8 @@ class MemoryManager:
         return self.vector_db.add_refined_context(
             summary=summary,
             key_points=key_points,
-            important_info=important_info
+            important_info=important_info,
+            embedding=embedding
         )
     
     def save_tool_description(
@@ -153,8 +221,8 @@ class MemoryManager:
         Returns:
             相关记忆字典，包含long_term和short_term
         """
-        # 从长期记忆（向量数据库）检索
-        long_term_memories = self.vector_db.search(query, top_k=top_k)
+        # 从长期记忆（向量数据库）检索（同一内容可能被多次保存，去重后再放入上下文）
+        long_term_memories = self._deduplicate_by_content(self.vector_db.search(query, top_k=top_k))
         
         # 从短期记忆（session）获取最近对话
         session = self.get_session(session_id)
@@ -165,6 +233,28 @@ class MemoryManager:
             "short_term": recent_messages
         }
     
+    @staticmethod
+    def _deduplicate_by_content(memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按内容去重检索结果（保留排序靠前的一条）
+        
+        Args:
+            memories: 检索结果列表（按相似度降序）
+            
+        Returns:
+            去重后的检索结果列表
+        """
+        seen = set()
+        unique = []
+        for memory in memories:
+            # blake2b比sha256快，这里不需要密码学强度
+            key = hashlib.blake2b(memory.get("content", "").encode("utf-8"), digest_size=8).digest()
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(memory)
+        return unique
+    
     def retrieve_refined_contexts(
         self,
         query: str,
@@ -262,6 +352,7 @@ class MemoryManager:
                 ),
                 "refined_contexts": self.vector_db.count_memories(
                     filter_metadata={"type": "refined_context"}
-                )
+                ),
+                "search_cache": self.vector_db.get_cache_stats()
             }
         }
@@ -0,0 +1,219 @@
+"""向量量化编码（TurboQuant：随机Hadamard旋转 + Lloyd-Max标量量化）"""
+from typing import Tuple
+import math
+import numpy as np
+
+
+def _next_power_of_two(n: int) -> int:
+    """不小于n的最小2的幂"""
+    return 1 << max(0, (n - 1).bit_length())
+
+
+def fast_walsh_hadamard(x: np.ndarray) -> np.ndarray:
+    """
+    归一化的快速Walsh-Hadamard变换（按行，O(n log n)）
+    
+    归一化后变换矩阵是正交且对称的，因此该变换也是自身的逆变换。
+    
+    Args:
+        x: 形状为(N, n)的矩阵，n必须是2的幂
+    
+    Returns:
+        变换后的float32矩阵
+    """
+    rows, n = x.shape
+    y = np.array(x, dtype=np.float32, copy=True)
+    h = 1
+    while h < n:
+        y = y.reshape(rows, n // (2 * h), 2, h)
+        a = y[:, :, 0, :]
+        b = y[:, :, 1, :]
+        y = np.stack((a + b, a - b), axis=2)
+        h *= 2
+    return y.reshape(rows, n) * np.float32(1.0 / math.sqrt(n))
+
+
+class HadamardRotation:
+    """随机Hadamard旋转：先按固定种子随机翻转符号，再做归一化Hadamard变换"""
+    
+    def __init__(self, dimension: int, seed: int = 0):
+        """
+        初始化旋转
+        
+        Args:
+            dimension: 原始向量维度（内部补零到2的幂）
+            seed: 随机符号的固定种子（编码和解码必须一致）
+        """
+        self.dimension = dimension
+        self.padded_dimension = _next_power_of_two(dimension)
+        rng = np.random.default_rng(seed)
+        self.signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=self.padded_dimension)
+    
+    def rotate(self, x: np.ndarray) -> np.ndarray:
+        """
+        旋转向量
+        
+        Args:
+            x: 形状为(N, dimension)或(dimension,)的向量
+        
+        Returns:
+            旋转后的向量，最后一维为padded_dimension
+        """
+        x = np.asarray(x, dtype=np.float32)
+        single = x.ndim == 1
+        x = x.reshape(-1, self.dimension)
+        padded = np.zeros((x.shape[0], self.padded_dimension), dtype=np.float32)
+        padded[:, :self.dimension] = x
+        rotated = fast_walsh_hadamard(padded * self.signs)
+        return rotated[0] if single else rotated
+    
+    def inverse(self, y: np.ndarray) -> np.ndarray:
+        """
+        逆旋转
+        
+        Args:
+            y: 旋转空间中的向量
+        
+        Returns:
+            原始空间中的向量
+        """
+        y = np.asarray(y, dtype=np.float32)
+        single = y.ndim == 1
+        x = fast_walsh_hadamard(y.reshape(-1, self.padded_dimension)) * self.signs
+        x = x[:, :self.dimension]
+        return x[0] if single else x
+
+
+def lloyd_max_gaussian(bits: int, iterations: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算标准正态分布的Lloyd-Max最优标量量化器
+    
+    Args:
+        bits: 每个坐标的编码位数
+        iterations: Lloyd迭代次数
+    
+    Returns:
+        (centroids, boundaries)：2^bits个重建点和2^bits-1个判决边界
+    """
+    levels = 1 << bits
+    sqrt2 = math.sqrt(2.0)
+    
+    def pdf(t: float) -> float:
+        return math.exp(-0.5 * t * t) / math.sqrt(2.0 * math.pi)
+    
+    def cdf(t: float) -> float:
+        return 0.5 * (1.0 + math.erf(t / sqrt2))
+    
+    # 以等概率分位点附近作为初始重建点
+    centroids = [math.sqrt(2.0) * _erfinv(2.0 * (i + 0.5) / levels - 1.0) for i in range(levels)]
+    for _ in range(iterations):
+        boundaries = [(centroids[i] + centroids[i + 1]) / 2.0 for i in range(levels - 1)]
+        edges = [-math.inf] + boundaries + [math.inf]
+        # 每个区间的条件期望：E[X | a<X<b] = (pdf(a) - pdf(b)) / (cdf(b) - cdf(a))
+        centroids = [
+            (pdf(a) - pdf(b)) / max(cdf(b) - cdf(a), 1e-12)
+            for a, b in zip(edges[:-1], edges[1:])
+        ]
+    boundaries = [(centroids[i] + centroids[i + 1]) / 2.0 for i in range(levels - 1)]
+    return np.array(centroids, dtype=np.float32), np.array(boundaries, dtype=np.float32)
+
+
+def _erfinv(y: float) -> float:
+    """误差函数的反函数（牛顿迭代，仅用于生成初始重建点）"""
+    x = 0.0
+    for _ in range(50):
+        err = math.erf(x) - y
+        x -= err / (2.0 / math.sqrt(math.pi) * math.exp(-x * x))
+    return x
+
+
+class TurboQuantCodec:
+    """
+    TurboQuant向量编码器
+    
+    随机Hadamard旋转使各坐标近似服从独立同分布的高斯分布，因此可以对每个坐标
+    使用同一个Lloyd-Max码本做标量量化。每条向量存储bit-packed的坐标码字和一个
+    float32缩放因子（坐标标准差）。由于旋转是正交变换，内积可以直接在旋转空间中计算：
+    只需把查询向量旋转一次，再与解码后的向量做点积。
+    """
+    
+    def __init__(self, dimension: int, bits: int = 4, seed: int = 0):
+        """
+        初始化编码器
+        
+        Args:
+            dimension: 向量维度
+            bits: 每个坐标的编码位数（通常3-5）
+            seed: 旋转的随机种子
+        """
+        if not 1 <= bits <= 8:
+            raise ValueError(f"Unsupported quantization bits: {bits}, expected 1-8")
+        self.dimension = dimension
+        self.bits = bits
+        self.rotation = HadamardRotation(dimension, seed=seed)
+        self.padded_dimension = self.rotation.padded_dimension
+        self.centroids, self.boundaries = lloyd_max_gaussian(bits)
+        self._bit_weights = (1 << np.arange(bits)).astype(np.uint8)
+    
+    @property
+    def code_bytes(self) -> int:
+        """每条向量的码字字节数"""
+        return (self.padded_dimension * self.bits + 7) // 8
+    
+    def _pack(self, codes: np.ndarray) -> np.ndarray:
+        """把(N, padded_dimension)的码字按位打包"""
+        bit_planes = (codes[:, :, None] >> np.arange(self.bits, dtype=np.uint8)) & 1
+        return np.packbits(bit_planes.reshape(codes.shape[0], -1), axis=1, bitorder="little")
+    
+    def _unpack(self, packed: np.ndarray) -> np.ndarray:
+        """把按位打包的码字还原为(N, padded_dimension)的码字"""
+        bit_planes = np.unpackbits(
+            packed,
+            axis=1,
+            count=self.padded_dimension * self.bits,
+            bitorder="little"
+        ).reshape(packed.shape[0], self.padded_dimension, self.bits)
+        return (bit_planes * self._bit_weights).sum(axis=2, dtype=np.uint8)
+    
+    def encode(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        编码向量
+        
+        Args:
+            x: 形状为(N, dimension)的向量
+        
+        Returns:
+            (packed_codes, scales)：(N, code_bytes)的uint8码字和(N,)的float32缩放因子
+        """
+        rotated = self.rotation.rotate(np.asarray(x, dtype=np.float32).reshape(-1, self.dimension))
+        # 旋转后各坐标近似N(0, ||x||^2 / n)，用坐标标准差归一化到标准正态
+        scales = np.linalg.norm(rotated, axis=1) / np.float32(math.sqrt(self.padded_dimension))
+        safe_scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.searchsorted(self.boundaries, rotated / safe_scales[:, None]).astype(np.uint8)
+        return self._pack(codes), scales.astype(np.float32)
+    
+    def decode_rotated(self, packed: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """
+        解码为旋转空间中的近似向量（用于与旋转后的查询做内积）
+        
+        Args:
+            packed: (N, code_bytes)的码字
+            scales: (N,)的缩放因子
+        
+        Returns:
+            (N, padded_dimension)的float32矩阵
+        """
+        return self.centroids[self._unpack(packed)] * scales[:, None]
+    
+    def decode(self, packed: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """
+        解码为原始空间中的近似向量
+        
+        Args:
+            packed: (N, code_bytes)的码字
+            scales: (N,)的缩放因子
+        
+        Returns:
+            (N, dimension)的float32矩阵
+        """
+        return self.rotation.inverse(self.decode_rotated(packed, scales))
@@ -0,0 +1,97 @@
+"""检索结果缓存：线程安全的LRU缓存，条目带有效期"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class QueryCache:
+    """
+    检索结果LRU缓存
+    
+    同一轮对话中的多次检索（路由、工具选择、反思等环节）经常使用相同的查询，
+    命中缓存时不再计算embedding和访问向量存储。数据写入后由调用方clear()使缓存失效。
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries: 最大缓存条目数（超出后淘汰最久未使用的条目，0表示不缓存）
+            ttl_seconds: 条目有效期（秒）
+        """
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._version = 0  # 每次clear()加一，用于丢弃失效前开始的检索结果
+    
+    @property
+    def version(self) -> int:
+        """当前数据版本（检索开始前读取，写入时传给put）"""
+        return self._version
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        读取缓存
+        
+        Args:
+            key: 缓存键
+        
+        Returns:
+            缓存的值，不存在或已过期时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+                del self._entries[key]
+            self._misses += 1
+            return None
+    
+    def put(self, key: Hashable, value: Any, version: Optional[int] = None):
+        """
+        写入缓存
+        
+        Args:
+            key: 缓存键
+            value: 缓存的值
+            version: 检索开始时的version（期间缓存被清空过时不写入，避免缓存旧数据）
+        """
+        if not self.max_entries:
+            return
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """清空缓存（数据发生变化时调用）"""
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        
+        Returns:
+            包含size, hits, misses, hit_rate的字典
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0
+            }
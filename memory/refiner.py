@@ -1,11 +1,12 @@
 """上下文精炼模块，使用embedding进行精炼"""
+import io
 from typing import List, Dict, Any
 import numpy as np
 # 处理相对导入问题
 try:
     from ..config.config import Config
-    from ..models.model import EmbeddingModel
-    from ..models.llm import LLM
+    from ..models.model import get_embedding_model
+    from ..models.llm import get_llm
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -15,8 +16,8 @@ except (ImportError, ValueError):
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
     from config.config import Config
-    from models.model import EmbeddingModel
-    from models.llm import LLM
+    from models.model import get_embedding_model
+    from models.llm import get_llm
 
 
 class ContextRefiner:
@@ -30,8 +31,8 @@ class ContextRefiner:
             config: 系统配置
         """
         self.config = config
-        self.embedding_model = EmbeddingModel(config)
-        self.llm = LLM(config)
+        self.embedding_model = get_embedding_model(config)
+        self.llm = get_llm(config)
     
     def refine(
         self, 
@@ -128,14 +129,14 @@ class ContextRefiner:
     
     def _select_diverse_messages(
         self,
-        embeddings: List[List[float]],
+        embeddings: np.ndarray,
         max_points: int
     ) -> List[int]:
         """
         选择最不同的消息（使用embedding相似度）
         
         Args:
-            embeddings: embedding向量列表
+            embeddings: embedding矩阵（每行一个向量）
             max_points: 最大选择数量
             
         Returns:
@@ -144,58 +145,30 @@ class ContextRefiner:
         if len(embeddings) <= max_points:
             return list(range(len(embeddings)))
         
-        # 转换为numpy数组
-        embeddings_array = np.array(embeddings)
+        # 先把每个向量归一化（零向量保持为零，与任何向量的相似度为0），之后一次矩阵-向量乘即可
+        # 得到所有消息与新选中消息的余弦相似度
+        embeddings_array = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings_array, axis=1, keepdims=True)
+        normalized = np.divide(embeddings_array, norms, out=np.zeros_like(embeddings_array), where=norms > 0)
         
         # 选择第一个消息
         selected_indices = [0]
         
-        # 逐步选择最不同的消息
+        # 每个消息与已选择消息的最小相似度，随每次选择增量更新（不再重新两两比较）
+        min_similarities = normalized @ normalized[0]
+        min_similarities[0] = -np.inf
+        
+        # 逐步选择最小相似度最大的消息（最不同；并列时取下标最小的，与原先的稳定排序一致）
         for _ in range(max_points - 1):
-            if len(selected_indices) >= len(embeddings):
-                break
-            
-            # 计算已选择消息的embedding
-            selected_embeddings = embeddings_array[selected_indices]
-            
-            # 计算每个未选择消息与已选择消息的最小相似度
-            min_similarities = []
-            for i in range(len(embeddings)):
-                if i in selected_indices:
-                    continue
-                
-                # 计算与已选择消息的最大相似度（余弦相似度）
-                similarities = []
-                for selected_emb in selected_embeddings:
-                    similarity = self._cosine_similarity(embeddings[i], selected_emb)
-                    similarities.append(similarity)
-                
-                # 选择最小相似度（最不同）
-                min_similarities.append((i, min(similarities)))
-            
-            if not min_similarities:
+            candidate = int(np.argmax(min_similarities))
+            if min_similarities[candidate] == -np.inf:
                 break
-            
-            # 选择最小相似度最大的消息（最不同）
-            min_similarities.sort(key=lambda x: x[1], reverse=True)
-            selected_indices.append(min_similarities[0][0])
+            selected_indices.append(candidate)
+            np.minimum(min_similarities, normalized @ normalized[candidate], out=min_similarities)
+            min_similarities[candidate] = -np.inf
         
         return selected_indices
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """计算余弦相似度"""
-        vec1 = np.array(vec1)
-        vec2 = np.array(vec2)
-        
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        return dot_product / (norm1 * norm2)
-    
     def _summarize_message(self, message: str, max_length: int = 100) -> str:
         """
         摘要单个消息
@@ -231,18 +204,18 @@ class ContextRefiner:
         if not messages:
             return ""
         
-        # 构建消息文本
-        conversation_text = ""
+        # 构建消息文本（写入StringIO缓冲区，不做逐条字符串拼接）
+        buffer = io.StringIO()
         for msg in messages[-10:]:  # 只使用最近10条消息生成摘要
             if isinstance(msg, dict):
                 role = msg.get("role", "")
                 content = msg.get("content", "")
-                if content:
-                    conversation_text += f"{role}: {content}\n"
             else:
-                if hasattr(msg, "content") and msg.content:
-                    role = getattr(msg, "role", "")
-                    conversation_text += f"{role}: {msg.content}\n"
+                role = getattr(msg, "role", "")
+                content = getattr(msg, "content", "")
+            if content:
+                buffer.write(f"{role}: {content}\n")
+        conversation_text = buffer.getvalue()
         
         # 构建prompt
         prompt = f"""请对以下对话进行摘要，保留重要信息：
@@ -1,6 +1,8 @@
 """短期记忆Session管理"""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from collections import deque
+from dataclasses import dataclass
+from itertools import islice
 # 处理相对导入问题
 try:
     from ..config.config import Config
@@ -15,6 +17,22 @@ except (ImportError, ValueError):
     from config.config import Config
 
 
+@dataclass(slots=True)
+class SessionMessage:
+    """Session中的单条消息（使用slots，比dict更省内存）"""
+    role: str
+    content: str
+    metadata: Optional[Dict[str, Any]] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为对外返回的字典格式"""
+        return {
+            "role": self.role,
+            "content": self.content,
+            "metadata": self.metadata or {}
+        }
+
+
 class SessionMemory:
     """短期记忆Session，用于存储当前会话的对话历史"""
     
@@ -39,12 +57,16 @@ class SessionMemory:
             content: 消息内容
             metadata: 元数据（如意图、工具使用等）
         """
-        message = {
-            "role": role,
-            "content": content,
-            "metadata": metadata or {}
-        }
-        self.memory.append(message)
+        self.memory.append(SessionMessage(role, content, metadata))
+    
+    def add_messages(self, messages: List[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """
+        批量添加消息到session记忆（一次deque.extend）
+        
+        Args:
+            messages: (role, content, metadata)元组列表
+        """
+        self.memory.extend(SessionMessage(role, content, metadata) for role, content, metadata in messages)
     
     def get_recent_messages(self, n: int) -> List[Dict[str, Any]]:
         """
@@ -56,16 +78,18 @@ class SessionMemory:
         Returns:
             消息列表
         """
-        return list(self.memory)[-n:]
+        # 只拷贝尾部n条，避免每次复制整个deque
+        size = len(self.memory)
+        return [message.to_dict() for message in islice(self.memory, max(0, size - n), size)]
     
     def get_all_messages(self) -> List[Dict[str, Any]]:
         """
-        获取所有消息
+        获取所有消息（返回副本，调用方可自由修改）
         
         Returns:
             所有消息列表
         """
-        return list(self.memory)
+        return [message.to_dict() for message in self.memory]
     
     def clear(self):
         """清空session记忆"""
@@ -1,11 +1,19 @@
 """长期记忆向量数据库（使用统一接口）"""
-from typing import List, Dict, Any, Optional
-import uuid
+from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+import json
+import os
+import secrets
+import threading
+import time
+import zlib
+import numpy as np
 from .vector_store_interface import VectorStoreInterface
+from .query_cache import QueryCache
 # 处理相对导入问题
 try:
     from ..config.config import Config
-    from ..models.model import EmbeddingModel
+    from ..models.model import get_embedding_model
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -15,7 +23,161 @@ except (ImportError, ValueError):
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
     from config.config import Config
-    from models.model import EmbeddingModel
+    from models.model import get_embedding_model
+
+
+# 记忆ID位布局（共63位，保证为非负int64）：
+#   bits 0-39  : 序列号（高24位为随机块号，低16位为块内计数）
+#   bits 40-58 : session_id的19位哈希签名
+#   bit  59    : archived标志
+#   bits 60-62 : 记忆类型编码
+# 类型、归档标志和会话签名直接编码在ID中，按这些字段过滤时只需一次位运算，无需查询元数据
+_ID_SEQ_BITS = 40
+_ID_SESSION_SHIFT = 40
+_ID_SESSION_MASK = (1 << 19) - 1
+_ID_ARCHIVED_SHIFT = 59
+_ID_TYPE_SHIFT = 60
+_ID_TYPE_MASK = 0b111
+
+# 记忆类型编码（0保留给未知/其他类型）
+MEMORY_TYPE_CODES = {
+    "conversation": 1,
+    "refined_context": 2,
+    "tool_description": 3,
+}
+_MEMORY_TYPE_NAMES = {code: name for name, code in MEMORY_TYPE_CODES.items()}
+
+# 序列号分配：每个进程随机选取一个24位块号，在块内顺序计数，计满65536个后换一个新的随机块号。
+# 块号随机而不是取自时钟，进程重启、时钟回拨或多个进程写同一个持久化集合时都不会按顺序重复发放ID
+# （不同进程的块号相同的概率约为1/1600万，且还要求会话签名和类型都相同才会冲突）
+_ID_COUNTER_BITS = 16
+_ID_COUNTER_MASK = (1 << _ID_COUNTER_BITS) - 1
+_ID_BLOCK_BITS = _ID_SEQ_BITS - _ID_COUNTER_BITS
+_id_lock = threading.Lock()
+_id_block = secrets.randbits(_ID_BLOCK_BITS)
+_id_counter = 0
+
+
+def _reset_id_block():
+    """换一个新的随机块号（fork出的子进程不能沿用父进程的块号）"""
+    global _id_block, _id_counter
+    _id_block = secrets.randbits(_ID_BLOCK_BITS)
+    _id_counter = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_block)
+
+
+def _next_id_sequence() -> int:
+    """分配下一个40位序列号（线程安全）"""
+    global _id_counter
+    with _id_lock:
+        if _id_counter > _ID_COUNTER_MASK:
+            _reset_id_block()
+        sequence = (_id_block << _ID_COUNTER_BITS) | _id_counter
+        _id_counter += 1
+        return sequence
+
+
+def _session_signature(session_id: Any) -> int:
+    """session_id的19位稳定哈希（跨进程一致）"""
+    return zlib.crc32(str(session_id).encode("utf-8")) & _ID_SESSION_MASK
+
+
+def encode_memory_id(
+    memory_type: Optional[str] = None,
+    archived: bool = False,
+    session_id: Optional[str] = None
+) -> int:
+    """
+    生成新的记忆ID
+    
+    Args:
+        memory_type: 记忆类型（conversation/refined_context/tool_description）
+        archived: 是否为归档记忆
+        session_id: 会话ID（可选，其哈希签名写入ID）
+        
+    Returns:
+        63位整数ID
+    """
+    type_code = MEMORY_TYPE_CODES.get(memory_type, 0)
+    session_bits = _session_signature(session_id) if session_id is not None else 0
+    return (
+        (type_code << _ID_TYPE_SHIFT)
+        | (int(archived) << _ID_ARCHIVED_SHIFT)
+        | (session_bits << _ID_SESSION_SHIFT)
+        | _next_id_sequence()
+    )
+
+
+def build_id_filter(filter_metadata: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    把元数据过滤条件转换为ID位掩码
+    
+    Args:
+        filter_metadata: 元数据过滤条件（只使用type/archived/session_id三个字段）
+        
+    Returns:
+        (mask, expected)：满足条件的ID应有 id & mask == expected；mask为0表示无法按ID过滤
+    """
+    mask = expected = 0
+    if not filter_metadata:
+        return mask, expected
+    
+    type_code = MEMORY_TYPE_CODES.get(filter_metadata.get("type"))
+    if type_code is not None:
+        mask |= _ID_TYPE_MASK << _ID_TYPE_SHIFT
+        expected |= type_code << _ID_TYPE_SHIFT
+    if "archived" in filter_metadata:
+        mask |= 1 << _ID_ARCHIVED_SHIFT
+        expected |= int(bool(filter_metadata["archived"])) << _ID_ARCHIVED_SHIFT
+    if filter_metadata.get("session_id") is not None:
+        mask |= _ID_SESSION_MASK << _ID_SESSION_SHIFT
+        expected |= _session_signature(filter_metadata["session_id"]) << _ID_SESSION_SHIFT
+    return mask, expected
+
+
+def id_matches_filter(memory_id: Any, mask: int, expected: int) -> bool:
+    """
+    用ID位签名检查记忆是否满足过滤条件
+    
+    只检查本模块生成的ID（类型位非0），其他格式的ID一律视为匹配，交由元数据过滤处理。
+    
+    Args:
+        memory_id: 记忆ID
+        mask: build_id_filter返回的掩码
+        expected: build_id_filter返回的期望值
+        
+    Returns:
+        是否匹配
+    """
+    if not mask:
+        return True
+    try:
+        value = int(memory_id)
+    except (TypeError, ValueError):
+        return True
+    if not (value >> _ID_TYPE_SHIFT) & _ID_TYPE_MASK:
+        return True
+    return value & mask == expected
+
+
+def decode_memory_type(memory_id: Any) -> Optional[str]:
+    """
+    从记忆ID中解析记忆类型
+    
+    Args:
+        memory_id: 记忆ID（整数或数字字符串）
+        
+    Returns:
+        记忆类型，如果ID不是本模块生成的格式则返回None
+    """
+    try:
+        value = int(memory_id)
+    except (TypeError, ValueError):
+        return None
+    return _MEMORY_TYPE_NAMES.get((value >> _ID_TYPE_SHIFT) & _ID_TYPE_MASK)
 
 
 class VectorDatabase:
@@ -34,20 +196,28 @@ class VectorDatabase:
         self.collection_name = config.vector_db_collection
         
         # 初始化embedding模型
-        self.embedding_model = EmbeddingModel(config)
+        self.embedding_model = get_embedding_model(config)
         
         # 自动检测embedding维度（如果配置为0或需要检测）
         if config.embedding_dim == 0 or config.embedding_dim is None:
-            # 使用一个测试文本检测维度
-            try:
-                test_embedding = self.embedding_model.encode("test")
-                actual_dim = len(test_embedding)
-                config.embedding_dim = actual_dim
-                print(f"自动检测到embedding维度: {actual_dim}")
-            except Exception as e:
-                print(f"Warning: 无法自动检测embedding维度: {e}")
-                # 使用默认值
-                config.embedding_dim = config.embedding_dim or 1024
+            # 优先使用上次检测并持久化的结果，避免每次启动都调用一次embedding接口
+            cached_dim = self._load_cached_dimension()
+            if cached_dim:
+                config.embedding_dim = cached_dim
+            else:
+                # 使用一个测试文本检测维度
+                try:
+                    test_embedding = self.embedding_model.encode("test")
+                    actual_dim = len(test_embedding)
+                    config.embedding_dim = actual_dim
+                    print(f"自动检测到embedding维度: {actual_dim}")
+                    self._save_cached_dimension(actual_dim)
+                except Exception as e:
+                    print(f"Warning: 无法自动检测embedding维度: {e}")
+                    # 使用默认值
+                    config.embedding_dim = config.embedding_dim or 1024
+            # EmbeddingModel在构造时读取了配置中的维度，这里同步检测结果
+            self.embedding_model.dimension = config.embedding_dim
         
         # 初始化向量存储接口
         if vector_store is None:
@@ -56,9 +226,65 @@ class VectorDatabase:
         else:
             self.vector_store = vector_store
         
+        # 记忆数量缓存：键为None（总数）或记忆类型，首次查询时从存储读取，
+        # 之后随add/delete增量维护，避免每次统计都访问向量存储；
+        # 持久化存储可能被其他实例写入，缓存的数量在long_term_memory_cache_ttl秒后重新从存储读取
+        self._counts: Dict[Optional[str], int] = {}
+        self._counts_loaded_at: Dict[Optional[str], float] = {}
+        self._counts_ttl = config.long_term_memory_cache_ttl
+        self._counts_generation = 0  # 每次写操作加1，用于丢弃与写操作并发读取到的旧数量
+        self._counts_lock = threading.Lock()  # 记忆可能在线程池中并发写入
+        
+        # 查询向量缓存：同一查询文本在不同的检索（不同过滤条件、top_k）之间复用embedding；
+        # 向量只取决于文本本身，写入数据后不需要失效
+        self._encode_query = lru_cache(maxsize=config.query_embedding_cache_size)(self._encode_query_uncached)
+        
+        # 检索结果缓存：键为(查询文本, top_k, 过滤条件)，任何写操作都会清空
+        self._search_cache = QueryCache(
+            max_entries=config.long_term_memory_cache_size,
+            ttl_seconds=config.long_term_memory_cache_ttl
+        )
+        
         # 初始化向量数据库
         self._initialize_db()
     
+    def _embedding_meta_path(self) -> str:
+        """embedding维度缓存文件路径"""
+        return os.path.join(self.db_path, ".embedding_meta.json")
+    
+    def _load_cached_dimension(self) -> Optional[int]:
+        """
+        读取持久化的embedding维度
+        
+        Returns:
+            缓存的维度，如果缓存不存在、损坏或模型已变更则返回None
+        """
+        try:
+            with open(self._embedding_meta_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("embedding_model") != self.embedding_model.get_model_name():
+            return None
+        return meta.get("embedding_dim") or None
+    
+    def _save_cached_dimension(self, dimension: int):
+        """
+        持久化检测到的embedding维度
+        
+        Args:
+            dimension: embedding维度
+        """
+        try:
+            os.makedirs(self.db_path, exist_ok=True)
+            with open(self._embedding_meta_path(), "w", encoding="utf-8") as f:
+                json.dump({
+                    "embedding_model": self.embedding_model.get_model_name(),
+                    "embedding_dim": dimension
+                }, f)
+        except OSError as e:
+            print(f"Warning: Failed to save embedding dimension cache: {e}")
+    
     def _create_default_vector_store(self) -> VectorStoreInterface:
         """
         创建默认的向量存储实现
@@ -66,18 +292,39 @@ class VectorDatabase:
         Returns:
             向量存储接口实例
         """
+        # 大规模记忆：使用Faiss IVF-PQ压缩索引（如果配置且可用）
+        if self.config.vector_backend == "faiss_pq":
+            try:
+                from .vector_store_faiss import FaissPQVectorStore
+                return FaissPQVectorStore(
+                    persist_directory=self.db_path,
+                    collection_name=self.collection_name,
+                    m=self.config.faiss_pq_m,
+                    nbits=self.config.faiss_pq_nbits,
+                    train_threshold=self.config.faiss_train_threshold
+                )
+            except ImportError:
+                print("Warning: faiss not available, falling back to ChromaDB")
+        
         # 优先使用ChromaDB（如果可用）
         try:
             from .vector_store_chroma import ChromaVectorStore
             return ChromaVectorStore(
                 persist_directory=self.db_path,
-                collection_name=self.collection_name
+                collection_name=self.collection_name,
+                batch_size=self.config.vector_db_batch_size,
+                query_cache_size=self.config.vector_db_query_cache_size
             )
         except ImportError:
             # 如果ChromaDB不可用，使用占位符实现
             print("Warning: ChromaDB not available, using placeholder implementation")
             from .vector_store_placeholder import VectorStorePlaceholder
-            return VectorStorePlaceholder()
+            return VectorStorePlaceholder(
+                precision=self.config.vector_store_precision,
+                quant_bits=self.config.vector_store_quant_bits,
+                use_hnsw=self.config.vector_store_use_hnsw,
+                persist_directory=self.db_path if self.config.vector_store_mmap else None
+            )
     
     def _initialize_db(self):
         """初始化向量数据库连接"""
@@ -93,7 +340,7 @@ class VectorDatabase:
         self, 
         content: str, 
         metadata: Dict[str, Any],
-        embedding: Optional[List[float]] = None,
+        embedding: Optional[np.ndarray] = None,
         id: Optional[str] = None
     ) -> str:
         """
@@ -115,14 +362,9 @@ class VectorDatabase:
             except Exception as e:
                 raise RuntimeError(f"Failed to generate embedding: {e}")
         
-        # 如果没有提供ID，自动生成
-        if id is None:
-            id = str(uuid.uuid4())
-        
-        # 添加时间戳
-        import datetime
-        metadata["timestamp"] = datetime.datetime.now().isoformat()
-        metadata["id"] = id
+        # 调用方指定ID时可能覆盖已有记录，无法增量维护计数
+        custom_id = id is not None
+        id, metadata = self._prepare_memory(metadata, id)
         
         # 存储到向量数据库
         try:
@@ -132,9 +374,104 @@ class VectorDatabase:
                 metadata=metadata,
                 id=id
             )
-            return stored_id
         except Exception as e:
+            # 写入失败时缓冲区中此前的记录可能一并被丢弃，已增量维护的计数不再可信
+            self._invalidate_counts()
             raise RuntimeError(f"Failed to add memory to vector store: {e}")
+        
+        self._search_cache.clear()
+        if custom_id:
+            self._invalidate_counts()
+        else:
+            self._adjust_counts(metadata.get("type"), 1)
+        return stored_id
+    
+    @staticmethod
+    def _prepare_memory(metadata: Dict[str, Any], id: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        为待写入的记忆分配ID，并生成补充了时间戳和ID的元数据副本
+        
+        调用方传入的元数据不会被修改（同一个字典可以安全地重复使用）。
+        
+        Args:
+            metadata: 元数据
+            id: 可选的ID（不提供时自动生成，类型和归档标志编码在ID高位）
+            
+        Returns:
+            (记忆ID, 待写入的元数据)
+        """
+        if id is None:
+            id = str(encode_memory_id(
+                metadata.get("type"),
+                archived=bool(metadata.get("archived", False)),
+                session_id=metadata.get("session_id")
+            ))
+        
+        # 添加时间戳（epoch纳秒）
+        return id, {**metadata, "timestamp": time.time_ns(), "id": id}
+    
+    def _adjust_counts(self, memory_type: Optional[str], delta: int):
+        """增量更新已缓存的记忆数量（未缓存的键在下次查询时再从存储读取）"""
+        with self._counts_lock:
+            self._counts_generation += 1
+            if None in self._counts:
+                self._counts[None] += delta
+            if memory_type is not None and memory_type in self._counts:
+                self._counts[memory_type] += delta
+    
+    def _invalidate_counts(self):
+        """丢弃全部缓存的记忆数量（无法增量维护时使用）"""
+        with self._counts_lock:
+            self._counts_generation += 1
+            self._counts.clear()
+            self._counts_loaded_at.clear()
+    
+    def add_memories(
+        self,
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[str]:
+        """
+        批量添加记忆（所有内容一次性编码，只调用一次embedding接口，并一次批量写入向量存储）
+        
+        Args:
+            contents: 记忆内容列表
+            metadatas: 与contents一一对应的元数据列表
+            embeddings: 可选的预计算embedding矩阵（每行对应一条内容）
+            
+        Returns:
+            存储的ID列表
+        """
+        if len(contents) != len(metadatas):
+            raise ValueError(f"contents and metadatas length mismatch: {len(contents)} != {len(metadatas)}")
+        if not contents:
+            return []
+        
+        if embeddings is None:
+            try:
+                embeddings = self.embedding_model.encode(list(contents))
+            except Exception as e:
+                raise RuntimeError(f"Failed to generate embedding: {e}")
+        
+        items = []
+        for content, metadata, embedding in zip(contents, metadatas, embeddings):
+            id, stored_metadata = self._prepare_memory(metadata)
+            items.append({
+                "content": content,
+                "embedding": embedding,
+                "metadata": stored_metadata,
+                "id": id
+            })
+        try:
+            stored_ids = self.vector_store.add_many(items)
+        except Exception as e:
+            raise RuntimeError(f"Failed to add memories to vector store: {e}")
+        
+        self._search_cache.clear()
+        for metadata in metadatas:
+            self._adjust_counts(metadata.get("type"), 1)
+        return stored_ids
     
     def search(
         self, 
@@ -156,12 +493,50 @@ class VectorDatabase:
         if top_k is None:
             top_k = self.config.long_term_memory_top_k
         
-        # 将query转换为embedding
+        cache_key = (query, top_k, json.dumps(filter_metadata, sort_keys=True, default=str))
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return [dict(result) for result in cached]
+        cache_version = self._search_cache.version
+        
+        # 将query转换为embedding（相同文本复用缓存的向量）
         try:
-            query_embedding = self.embedding_model.encode(query)
+            query_embedding = self._encode_query(query)
         except Exception as e:
             raise RuntimeError(f"Failed to encode query: {e}")
         
+        results = self.search_by_vector(query_embedding, top_k=top_k, filter_metadata=filter_metadata)
+        
+        # 缓存副本，调用方修改返回结果不影响缓存
+        self._search_cache.put(cache_key, [dict(result) for result in results], version=cache_version)
+        return results
+    
+    def _encode_query_uncached(self, query: str) -> np.ndarray:
+        """编码查询文本（结果被lru_cache共享，设为只读防止调用方修改）"""
+        embedding = self.embedding_model.encode(query)
+        embedding.setflags(write=False)
+        return embedding
+    
+    def search_by_vector(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = None,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        用预先计算的查询向量搜索相关记忆
+        
+        Args:
+            query_embedding: 查询向量
+            top_k: 返回top-k结果
+            filter_metadata: 元数据过滤条件
+            
+        Returns:
+            相关记忆列表，每个记忆包含content, metadata, score等
+        """
+        if top_k is None:
+            top_k = self.config.long_term_memory_top_k
+        
         # 在向量数据库中搜索相似向量
         try:
             results = self.vector_store.search(
@@ -169,9 +544,58 @@ class VectorDatabase:
                 top_k=top_k,
                 filter_metadata=filter_metadata
             )
-            return results
         except Exception as e:
             raise RuntimeError(f"Failed to search vector store: {e}")
+        
+        # 用ID位签名复核过滤条件（后端无法下推过滤时，以一次位运算剔除不匹配的结果）
+        mask, expected = build_id_filter(filter_metadata)
+        if mask:
+            results = [r for r in results if id_matches_filter(r.get("id"), mask, expected)]
+        return results
+    
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相关记忆（一次embedding调用编码全部查询，再批量检索）
+        
+        Args:
+            queries: 查询文本列表
+            top_k: 每个查询返回top-k结果
+            filter_metadata: 元数据过滤条件
+            
+        Returns:
+            与查询一一对应的相关记忆列表
+        """
+        if not queries:
+            return []
+        if top_k is None:
+            top_k = self.config.long_term_memory_top_k
+        
+        try:
+            query_embeddings = self.embedding_model.encode(queries)
+        except Exception as e:
+            raise RuntimeError(f"Failed to encode queries: {e}")
+        
+        try:
+            all_results = self.vector_store.search_many(
+                query_embeddings,
+                top_k=top_k,
+                filter_metadata=filter_metadata
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to search vector store: {e}")
+        
+        mask, expected = build_id_filter(filter_metadata)
+        if mask:
+            all_results = [
+                [r for r in results if id_matches_filter(r.get("id"), mask, expected)]
+                for results in all_results
+            ]
+        return all_results
     
     def delete_memory(self, memory_id: str) -> bool:
         """
@@ -184,23 +608,43 @@ class VectorDatabase:
             是否删除成功
         """
         try:
-            return self.vector_store.delete(memory_id)
+            deleted = self.vector_store.delete(memory_id)
         except Exception as e:
             print(f"Warning: Failed to delete memory: {e}")
             return False
+        
+        if deleted:
+            self._search_cache.clear()
+            # 记忆类型直接从ID高位解析，无需再读取元数据
+            memory_type = decode_memory_type(memory_id)
+            if memory_type is None:
+                self._invalidate_counts()
+            else:
+                self._adjust_counts(memory_type, -1)
+        return deleted
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取检索结果缓存的统计信息
+        
+        Returns:
+            包含size, hits, misses, hit_rate的字典
+        """
+        return self._search_cache.stats()
     
-    def get_memory(self, memory_id: str) -> Optional[Dict[str, Any]]:
+    def get_memory(self, memory_id: str, include_embedding: bool = False) -> Optional[Dict[str, Any]]:
         """
         获取指定ID的记忆
         
         Args:
             memory_id: 记忆ID
+            include_embedding: 是否返回向量
             
         Returns:
             记忆信息，如果不存在返回None
         """
         try:
-            return self.vector_store.get(memory_id)
+            return self.vector_store.get(memory_id, include_embedding=include_embedding)
         except Exception as e:
             print(f"Warning: Failed to get memory: {e}")
             return None
@@ -208,7 +652,8 @@ class VectorDatabase:
     def get_all_memories(
         self, 
         limit: Optional[int] = None,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include_embedding: bool = False
     ) -> List[Dict[str, Any]]:
         """
         获取所有记忆
@@ -216,12 +661,17 @@ class VectorDatabase:
         Args:
             limit: 限制返回数量
             filter_metadata: 元数据过滤条件
+            include_embedding: 是否返回向量
             
         Returns:
             记忆列表
         """
         try:
-            return self.vector_store.get_all(limit=limit, filter_metadata=filter_metadata)
+            return self.vector_store.get_all(
+                limit=limit,
+                filter_metadata=filter_metadata,
+                include_embedding=include_embedding
+            )
         except Exception as e:
             print(f"Warning: Failed to get all memories: {e}")
             return []
@@ -236,11 +686,36 @@ class VectorDatabase:
         Returns:
             记忆数量
         """
+        # 只缓存总数和按单一type过滤的数量，其他过滤条件直接查询存储
+        if not filter_metadata:
+            cache_key, cacheable = None, True
+        elif list(filter_metadata) == ["type"]:
+            cache_key, cacheable = filter_metadata["type"], True
+        else:
+            cache_key, cacheable = None, False
+        
+        with self._counts_lock:
+            if (
+                cacheable
+                and cache_key in self._counts
+                and time.monotonic() - self._counts_loaded_at[cache_key] < self._counts_ttl
+            ):
+                return self._counts[cache_key]
+            generation = self._counts_generation
+        
         try:
-            return self.vector_store.count(filter_metadata=filter_metadata)
+            count = self.vector_store.count(filter_metadata=filter_metadata)
         except Exception as e:
             print(f"Warning: Failed to count memories: {e}")
             return 0
+        
+        if cacheable:
+            with self._counts_lock:
+                # 读取期间有写操作时，读到的数量可能已经过时，不写入缓存
+                if self._counts_generation == generation:
+                    self._counts[cache_key] = count
+                    self._counts_loaded_at[cache_key] = time.monotonic()
+        return count
     
     def clear_all_memories(self) -> bool:
         """
@@ -250,16 +725,26 @@ class VectorDatabase:
             是否清空成功
         """
         try:
-            return self.vector_store.clear()
+            cleared = self.vector_store.clear()
         except Exception as e:
             print(f"Warning: Failed to clear memories: {e}")
             return False
+        
+        if cleared:
+            self._search_cache.clear()
+            with self._counts_lock:
+                self._counts_generation += 1
+                now = time.monotonic()
+                self._counts = dict.fromkeys(self._counts, 0)
+                self._counts[None] = 0
+                self._counts_loaded_at = dict.fromkeys(self._counts, now)
+        return cleared
     
     def add_tool_description(
         self,
         tool_name: str,
         description: str,
-        embedding: Optional[List[float]] = None
+        embedding: Optional[np.ndarray] = None
     ) -> str:
         """
         添加工具描述到向量数据库（用于工具选择）
@@ -305,7 +790,7 @@ class VectorDatabase:
         summary: str,
         key_points: List[str],
         important_info: Dict[str, Any],
-        embedding: Optional[List[float]] = None
+        embedding: Optional[np.ndarray] = None
     ) -> str:
         """
         添加精炼后的上下文到向量数据库
@@ -319,17 +804,39 @@ class VectorDatabase:
         Returns:
             存储的ID
         """
-        # 合并内容
-        content = f"Summary: {summary}\n\nKey Points:\n" + "\n".join(f"- {point}" for point in key_points)
-        
-        metadata = {
-            "type": "refined_context",
-            "key_points": key_points,
-            "important_info": important_info
-        }
+        content, metadata = self.build_refined_context(summary, key_points, important_info)
         
         return self.add_memory(
             content=content,
             metadata=metadata,
             embedding=embedding
         )
+    
+    @staticmethod
+    def build_refined_context(
+        summary: str,
+        key_points: List[str],
+        important_info: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        构建精炼上下文的存储内容和元数据
+        
+        key_points和important_info以JSON字符串存入元数据（向量存储的元数据只支持标量值）。
+        
+        Args:
+            summary: 摘要
+            key_points: 关键点列表
+            important_info: 重要信息
+            
+        Returns:
+            (content, metadata)
+        """
+        # 合并内容
+        content = f"Summary: {summary}\n\nKey Points:\n" + "\n".join(f"- {point}" for point in key_points)
+        
+        metadata = {
+            "type": "refined_context",
+            "key_points": json.dumps(key_points, ensure_ascii=False),
+            "important_info": json.dumps(important_info, ensure_ascii=False, default=str)
+        }
+        return content, metadata
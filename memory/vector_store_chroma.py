@@ -1,7 +1,14 @@
 """ChromaDB向量数据库实现"""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
 import os
-from .vector_store_interface import VectorStoreInterface
+import json
+import atexit
+import hashlib
+import threading
+import weakref
+import numpy as np
+from .vector_store_interface import VectorStoreInterface, content_hash_id
 
 try:
     import chromadb
@@ -11,16 +18,134 @@ except ImportError:
     CHROMADB_AVAILABLE = False
 
 
+# 按持久化目录缓存的ChromaDB客户端（PersistentClient打开SQLite并加载索引，开销较大）
+_CLIENT_CACHE: Dict[str, Any] = {}
+_CLIENT_CACHE_LOCK = threading.Lock()
+_MEMORY_CLIENT_KEY = "__memory__"
+_CLEAR_BATCH_SIZE = 5000  # clear()每次获取并删除的ID数量（不超过ChromaDB的单批上限）
+
+# 按(客户端, 集合)记录的数据版本号：共享同一集合的所有实例通过它使各自的检索缓存失效
+_COLLECTION_VERSIONS: Dict[Tuple[str, str], int] = {}
+_COLLECTION_VERSIONS_LOCK = threading.Lock()
+
+
+def _client_key(persist_directory: Optional[str]) -> str:
+    """客户端缓存键（持久化目录的绝对路径，内存模式为固定键）"""
+    return os.path.abspath(persist_directory) if persist_directory else _MEMORY_CLIENT_KEY
+
+
+def _get_client(persist_directory: Optional[str]):
+    """
+    获取（或创建并缓存）ChromaDB客户端
+    
+    Args:
+        persist_directory: 持久化目录（如果为None，则使用内存模式）
+        
+    Returns:
+        ChromaDB客户端
+    """
+    key = _client_key(persist_directory)
+    with _CLIENT_CACHE_LOCK:
+        client = _CLIENT_CACHE.get(key)
+        if client is None:
+            if persist_directory:
+                # 持久化模式
+                os.makedirs(persist_directory, exist_ok=True)
+                client = chromadb.PersistentClient(
+                    path=persist_directory,
+                    settings=Settings(anonymized_telemetry=False)
+                )
+            else:
+                # 内存模式
+                client = chromadb.Client(
+                    settings=Settings(anonymized_telemetry=False)
+                )
+            _CLIENT_CACHE[key] = client
+        return client
+
+
+def _flush_at_exit(store_ref: "weakref.ref"):
+    """进程退出时写入仍在缓冲区中的向量"""
+    store = store_ref()
+    if store is not None and store.collection is not None:
+        try:
+            store.flush()
+        except Exception as e:
+            print(f"Warning: Failed to flush ChromaDB buffer at exit: {e}")
+
+
+_METADATA_SCALAR_TYPES = (str, int, float, bool)
+
+
+def _validate_metadata(metadata: Dict[str, Any]):
+    """
+    检查元数据能否写入ChromaDB（写入缓冲区前调用，避免坏记录在flush时才报错）
+    
+    ChromaDB只接受str/int/float/bool/None类型的值，以及元素类型一致的非空列表。
+    
+    Args:
+        metadata: 元数据
+        
+    Raises:
+        ValueError: 元数据包含ChromaDB不支持的值
+    """
+    if not isinstance(metadata, dict):
+        raise ValueError(f"Expected metadata to be a dict, got {type(metadata).__name__}")
+    for key, value in metadata.items():
+        if not isinstance(key, str):
+            raise ValueError(f"Expected metadata key to be a str, got {key!r}")
+        if value is None or isinstance(value, _METADATA_SCALAR_TYPES):
+            continue
+        if isinstance(value, list):
+            if not value:
+                raise ValueError(f"Metadata value for '{key}' is an empty list")
+            if not all(isinstance(item, _METADATA_SCALAR_TYPES) for item in value):
+                raise ValueError(f"Metadata list for '{key}' must contain only str, int, float or bool")
+            if len({type(item) for item in value}) > 1:
+                raise ValueError(f"Metadata list for '{key}' must contain values of a single type")
+            continue
+        raise ValueError(
+            f"Metadata value for '{key}' has unsupported type {type(value).__name__}"
+        )
+
+
+def _build_where(filter_metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    把元数据过滤条件转换为ChromaDB的where条件（在ANN检索前过滤）
+    
+    ChromaDB的where只允许一个顶层字段，多个条件需要用$and组合。
+    
+    Args:
+        filter_metadata: 元数据过滤条件
+        
+    Returns:
+        where条件，无过滤条件时返回None
+    """
+    if not filter_metadata:
+        return None
+    if len(filter_metadata) == 1:
+        return dict(filter_metadata)
+    return {"$and": [{key: value} for key, value in filter_metadata.items()]}
+
+
 class ChromaVectorStore(VectorStoreInterface):
     """ChromaDB向量数据库实现"""
     
-    def __init__(self, persist_directory: Optional[str] = None, collection_name: str = "default"):
+    def __init__(
+        self,
+        persist_directory: Optional[str] = None,
+        collection_name: str = "default",
+        batch_size: int = 100,
+        query_cache_size: int = 1024
+    ):
         """
         初始化ChromaDB向量存储
         
         Args:
             persist_directory: 持久化目录（如果为None，则使用内存模式）
             collection_name: 集合名称
+            batch_size: add()的写入缓冲大小，累计到该数量时一次性写入ChromaDB
+            query_cache_size: search()结果LRU缓存的条目数（0表示不缓存）
         """
         if not CHROMADB_AVAILABLE:
             raise ImportError("ChromaDB is not installed. Please install it with: pip install chromadb")
@@ -30,6 +155,109 @@ class ChromaVectorStore(VectorStoreInterface):
         self.client: Optional[chromadb.ClientAPI] = None
         self.collection: Optional[chromadb.Collection] = None
         self.dimension: Optional[int] = None
+        
+        # add()写入缓冲：攒够batch_size条后一次collection.add，摊薄每次写入的事务开销
+        self.batch_size = max(1, batch_size)
+        self._buffer_ids: List[str] = []
+        self._buffer_embeddings: List[np.ndarray] = []
+        self._buffer_documents: List[str] = []
+        self._buffer_metadatas: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()  # 记忆可能在线程池中并发写入
+        atexit.register(_flush_at_exit, weakref.ref(self))
+        
+        # search()结果LRU缓存：键包含集合的数据版本号（模块级，按集合共享），
+        # 任何实例对同一集合的写操作都会使旧结果失效
+        self.query_cache_size = max(0, query_cache_size)
+        self._query_cache: "OrderedDict[bytes, List[Dict[str, Any]]]" = OrderedDict()
+        self._query_cache_lock = threading.RLock()
+    
+    @property
+    def _version_key(self) -> Tuple[str, str]:
+        """当前集合在_COLLECTION_VERSIONS中的键"""
+        return (_client_key(self.persist_directory), self.collection_name)
+    
+    def _invalidate_query_cache(self):
+        """数据发生变化，使所有共享该集合的实例已缓存的检索结果失效"""
+        key = self._version_key
+        with _COLLECTION_VERSIONS_LOCK:
+            _COLLECTION_VERSIONS[key] = _COLLECTION_VERSIONS.get(key, 0) + 1
+    
+    def _query_cache_key(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> bytes:
+        """检索缓存键：查询向量（降为float16，容忍微小差异）+ top_k + 过滤条件 + 数据版本号"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.asarray(query_embedding, dtype=np.float16).tobytes())
+        digest.update(top_k.to_bytes(4, "little"))
+        digest.update(json.dumps(filter_metadata, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(_COLLECTION_VERSIONS.get(self._version_key, 0).to_bytes(8, "little"))
+        return digest.digest()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+    
+    def flush(self):
+        """
+        把缓冲区中的向量一次性写入ChromaDB
+        
+        写入失败时丢弃该批次并重新抛出异常，避免同一批数据在之后每次调用时反复失败。
+        """
+        with self._buffer_lock:
+            if not self._buffer_ids:
+                return
+            ids = self._buffer_ids
+            embeddings = self._buffer_embeddings
+            documents = self._buffer_documents
+            metadatas = self._buffer_metadatas
+            self._buffer_ids = []
+            self._buffer_embeddings = []
+            self._buffer_documents = []
+            self._buffer_metadatas = []
+            try:
+                self._upsert(ids, np.stack(embeddings), documents, metadatas)
+            except Exception as e:
+                print(f"Warning: Dropped {len(ids)} buffered vectors after a failed ChromaDB write: {e}")
+                raise
+            finally:
+                self._invalidate_query_cache()
+    
+    def _upsert(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ):
+        """
+        批量写入ChromaDB（upsert：已存在的ID被覆盖，重复写入相同内容不会新增记录）
+        
+        同一批次中ChromaDB不允许重复ID，重复时只保留最后一次写入。
+        
+        Args:
+            ids: ID列表
+            embeddings: (N, D)的float32向量矩阵
+            documents: 文本内容列表
+            metadatas: 元数据列表
+        """
+        if len(set(ids)) != len(ids):
+            last_index = {id: i for i, id in enumerate(ids)}
+            keep = sorted(last_index.values())
+            ids = [ids[i] for i in keep]
+            embeddings = embeddings[keep]
+            documents = [documents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+        self.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas
+        )
     
     def initialize(self, collection_name: str, dimension: int):
         """
@@ -41,35 +269,21 @@ class ChromaVectorStore(VectorStoreInterface):
         """
         self.collection_name = collection_name
         self.dimension = dimension
+        self._invalidate_query_cache()
         
-        # 初始化ChromaDB客户端
-        if self.persist_directory:
-            # 持久化模式
-            os.makedirs(self.persist_directory, exist_ok=True)
-            self.client = chromadb.PersistentClient(
-                path=self.persist_directory,
-                settings=Settings(anonymized_telemetry=False)
-            )
-        else:
-            # 内存模式
-            self.client = chromadb.Client(
-                settings=Settings(anonymized_telemetry=False)
-            )
+        # 获取ChromaDB客户端（同一目录的客户端在进程内复用）
+        self.client = _get_client(self.persist_directory)
         
-        # 获取或创建集合
-        try:
-            self.collection = self.client.get_collection(name=self.collection_name)
-        except Exception:
-            # 集合不存在，创建新集合
-            self.collection = self.client.create_collection(
-                name=self.collection_name,
-                metadata={"dimension": dimension}
-            )
+        # 获取或创建集合（一次调用）
+        self.collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"dimension": dimension}
+        )
     
     def add(
         self,
         content: str,
-        embedding: List[float],
+        embedding: np.ndarray,
         metadata: Dict[str, Any],
         id: Optional[str] = None
     ) -> str:
@@ -80,7 +294,7 @@ class ChromaVectorStore(VectorStoreInterface):
             content: 文本内容
             embedding: 向量
             metadata: 元数据
-            id: 可选的ID（如果不提供则自动生成）
+            id: 可选的ID（如果不提供则由内容哈希生成）
             
         Returns:
             存储的ID
@@ -89,26 +303,65 @@ class ChromaVectorStore(VectorStoreInterface):
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
         
         if id is None:
-            import uuid
-            id = str(uuid.uuid4())
+            id = content_hash_id(content)
         
         # 验证embedding维度
         if self.dimension and len(embedding) != self.dimension:
             raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {len(embedding)}")
         
-        # 添加向量到ChromaDB
-        self.collection.add(
-            ids=[id],
-            embeddings=[embedding],
-            documents=[content],
-            metadatas=[metadata]
-        )
+        # 在写入缓冲区前检查元数据，不合法的记录直接在这里报错
+        _validate_metadata(metadata)
+        
+        # 写入缓冲区，攒够batch_size条后一次性写入ChromaDB
+        with self._buffer_lock:
+            self._buffer_ids.append(id)
+            self._buffer_embeddings.append(np.asarray(embedding, dtype=np.float32))
+            self._buffer_documents.append(content)
+            self._buffer_metadatas.append(metadata)
+            buffer_full = len(self._buffer_ids) >= self.batch_size
+        if buffer_full:
+            self.flush()
         
         return id
     
+    def add_many(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        批量添加向量（不经过缓冲区，一次upsert写入）
+        
+        Args:
+            items: 向量列表，每项包含content, embedding, metadata, 可选id
+            
+        Returns:
+            存储的ID列表
+        """
+        if self.collection is None:
+            raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        if not items:
+            return []
+        
+        ids = [item.get("id") or content_hash_id(item["content"]) for item in items]
+        embeddings = np.stack([np.asarray(item["embedding"], dtype=np.float32) for item in items])
+        
+        # 验证embedding维度
+        if self.dimension and embeddings.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {embeddings.shape[1]}")
+        for item in items:
+            _validate_metadata(item["metadata"])
+        
+        # 先写入缓冲区中的旧数据，保证写入顺序
+        self.flush()
+        self._invalidate_query_cache()
+        self._upsert(
+            ids,
+            embeddings,
+            [item["content"] for item in items],
+            [item["metadata"] for item in items]
+        )
+        return ids
+    
     def search(
         self,
-        query_embedding: List[float],
+        query_embedding: np.ndarray,
         top_k: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
@@ -125,32 +378,96 @@ class ChromaVectorStore(VectorStoreInterface):
         """
         if self.collection is None:
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        self.flush()  # 先写入缓冲区中的数据，保证能检索到刚添加的记忆
         
-        # 构建查询where条件（ChromaDB的过滤语法）
-        where = None
-        if filter_metadata:
-            where = filter_metadata
+        if self.query_cache_size:
+            with self._query_cache_lock:
+                key = self._query_cache_key(query_embedding, top_k, filter_metadata)
+                cached = self._query_cache.get(key)
+                if cached is not None:
+                    self._query_cache.move_to_end(key)
+                    return [dict(result) for result in cached]
         
-        # 在ChromaDB中搜索
+        # 在ChromaDB中搜索（过滤条件下推为where，检索时只计算满足条件的向量）
         results = self.collection.query(
             query_embeddings=[query_embedding],
             n_results=top_k,
-            where=where
+            where=_build_where(filter_metadata)
         )
         
         # 格式化结果
-        formatted_results = []
-        if results["ids"] and len(results["ids"][0]) > 0:
-            for i in range(len(results["ids"][0])):
-                formatted_results.append({
-                    "id": results["ids"][0][i],
-                    "content": results["documents"][0][i] if results["documents"] else "",
-                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                    "score": 1.0 - results["distances"][0][i] if results["distances"] else 0.0  # 距离转相似度
-                })
+        formatted_results = self._format_query_results(results, 0)
+        
+        if self.query_cache_size:
+            with self._query_cache_lock:
+                self._query_cache[key] = [dict(result) for result in formatted_results]
+                self._query_cache.move_to_end(key)
+                if len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
         
         return formatted_results
     
+    def search_many(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似向量（一次collection.query提交全部查询）
+        
+        Args:
+            query_embeddings: (Q, D)的查询向量矩阵
+            top_k: 每个查询返回top-k个结果
+            filter_metadata: 元数据过滤条件
+            
+        Returns:
+            与查询一一对应的搜索结果列表
+        """
+        if self.collection is None:
+            raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        self.flush()
+        
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if queries.shape[0] == 0:
+            return []
+        
+        results = self.collection.query(
+            query_embeddings=queries,
+            n_results=top_k,
+            where=_build_where(filter_metadata)
+        )
+        return [self._format_query_results(results, i) for i in range(queries.shape[0])]
+    
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any], query_index: int) -> List[Dict[str, Any]]:
+        """
+        把collection.query返回的第query_index个查询的结果格式化为结果列表
+        
+        Args:
+            results: collection.query的返回值
+            query_index: 查询下标
+            
+        Returns:
+            搜索结果列表
+        """
+        formatted_results = []
+        if not results["ids"] or not results["ids"][query_index]:
+            return formatted_results
+        
+        ids = results["ids"][query_index]
+        documents = results["documents"][query_index] if results["documents"] else None
+        metadatas = results["metadatas"][query_index] if results["metadatas"] else None
+        distances = results["distances"][query_index] if results["distances"] else None
+        for i in range(len(ids)):
+            formatted_results.append({
+                "id": ids[i],
+                "content": documents[i] if documents else "",
+                "metadata": metadatas[i] if metadatas else {},
+                "score": 1.0 - distances[i] if distances else 0.0  # 距离转相似度
+            })
+        return formatted_results
+    
     def delete(self, id: str) -> bool:
         """
         删除向量
@@ -163,6 +480,8 @@ class ChromaVectorStore(VectorStoreInterface):
         """
         if self.collection is None:
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        self.flush()
+        self._invalidate_query_cache()
         
         try:
             self.collection.delete(ids=[id])
@@ -170,28 +489,35 @@ class ChromaVectorStore(VectorStoreInterface):
         except Exception:
             return False
     
-    def get(self, id: str) -> Optional[Dict[str, Any]]:
+    def get(self, id: str, include_embedding: bool = True) -> Optional[Dict[str, Any]]:
         """
         获取指定ID的向量
         
         Args:
             id: 向量ID
+            include_embedding: 是否返回向量（不需要时不传输向量）
             
         Returns:
-            向量信息（包含content, embedding, metadata等），如果不存在返回None
+            向量信息（包含content, metadata，以及可选的embedding），如果不存在返回None
         """
         if self.collection is None:
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        self.flush()
         
         try:
-            results = self.collection.get(ids=[id], include=["embeddings", "documents", "metadatas"])
+            include = ["documents", "metadatas"]
+            if include_embedding:
+                include.append("embeddings")
+            results = self.collection.get(ids=[id], include=include)
             if results["ids"] and len(results["ids"]) > 0:
-                return {
+                item = {
                     "id": results["ids"][0],
                     "content": results["documents"][0] if results["documents"] else "",
-                    "metadata": results["metadatas"][0] if results["metadatas"] else {},
-                    "embedding": results["embeddings"][0] if results["embeddings"] else []
+                    "metadata": results["metadatas"][0] if results["metadatas"] else {}
                 }
+                if include_embedding:
+                    item["embedding"] = results["embeddings"][0] if results["embeddings"] is not None else []
+                return item
         except Exception:
             pass
         
@@ -201,7 +527,7 @@ class ChromaVectorStore(VectorStoreInterface):
         self,
         id: str,
         content: Optional[str] = None,
-        embedding: Optional[List[float]] = None,
+        embedding: Optional[np.ndarray] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
         """
@@ -218,31 +544,35 @@ class ChromaVectorStore(VectorStoreInterface):
         """
         if self.collection is None:
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        self.flush()
+        self._invalidate_query_cache()
         
         try:
-            # 获取现有数据
-            existing = self.get(id)
-            if existing is None:
+            # 检查ID是否存在（collection.update对不存在的ID不会报错）；
+            # 需要合并元数据时顺带取回元数据，任何情况下都不取向量
+            existing = self.collection.get(
+                ids=[id],
+                include=["metadatas"] if metadata is not None else []
+            )
+            if not existing["ids"]:
                 return False
             
-            # 合并更新
-            new_content = content if content is not None else existing["content"]
-            new_embedding = embedding if embedding is not None else existing.get("embedding", [])
-            new_metadata = existing["metadata"].copy()
+            kwargs: Dict[str, Any] = {}
+            if content is not None:
+                kwargs["documents"] = [content]
+            if embedding is not None:
+                kwargs["embeddings"] = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
             if metadata is not None:
+                # collection.update会整体覆盖元数据，先合并再写回
+                new_metadata = dict(existing["metadatas"][0] or {})
                 new_metadata.update(metadata)
+                kwargs["metadatas"] = [new_metadata]
             
-            # 删除旧数据
-            self.collection.delete(ids=[id])
-            
-            # 添加新数据
-            self.collection.add(
-                ids=[id],
-                embeddings=[new_embedding],
-                documents=[new_content],
-                metadatas=[new_metadata]
-            )
+            if not kwargs:
+                return True
             
+            # 原地更新，只修改提供的字段
+            self.collection.update(ids=[id], **kwargs)
             return True
         except Exception:
             return False
@@ -250,7 +580,8 @@ class ChromaVectorStore(VectorStoreInterface):
     def get_all(
         self,
         limit: Optional[int] = None,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include_embedding: bool = False
     ) -> List[Dict[str, Any]]:
         """
         获取所有向量
@@ -258,35 +589,37 @@ class ChromaVectorStore(VectorStoreInterface):
         Args:
             limit: 限制返回数量
             filter_metadata: 元数据过滤条件
+            include_embedding: 是否返回向量（默认不返回，避免传输向量）
             
         Returns:
             向量列表
         """
         if self.collection is None:
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
-        
-        # 构建查询where条件
-        where = None
-        if filter_metadata:
-            where = filter_metadata
+        self.flush()
         
         # 获取所有数据
+        include = ["documents", "metadatas"]
+        if include_embedding:
+            include.append("embeddings")
         results = self.collection.get(
-            where=where,
+            where=_build_where(filter_metadata),
             limit=limit,
-            include=["embeddings", "documents", "metadatas"]
+            include=include
         )
         
         # 格式化结果
         formatted_results = []
         if results["ids"]:
             for i in range(len(results["ids"])):
-                formatted_results.append({
+                item = {
                     "id": results["ids"][i],
                     "content": results["documents"][i] if results["documents"] else "",
-                    "metadata": results["metadatas"][i] if results["metadatas"] else {},
-                    "embedding": results["embeddings"][i] if results["embeddings"] else []
-                })
+                    "metadata": results["metadatas"][i] if results["metadatas"] else {}
+                }
+                if include_embedding:
+                    item["embedding"] = results["embeddings"][i] if results["embeddings"] is not None else []
+                formatted_results.append(item)
         
         return formatted_results
     
@@ -302,14 +635,14 @@ class ChromaVectorStore(VectorStoreInterface):
         """
         if self.collection is None:
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        self.flush()
         
-        # 构建查询where条件
-        where = None
-        if filter_metadata:
-            where = filter_metadata
+        # 无过滤条件时直接使用collection.count()，不需要拉取任何数据
+        if not filter_metadata:
+            return self.collection.count()
         
-        # 获取所有ID（用于计数）
-        results = self.collection.get(where=where)
+        # 有过滤条件时只获取ID（不包含文档、元数据和向量）
+        results = self.collection.get(where=_build_where(filter_metadata), include=[])
         return len(results["ids"]) if results["ids"] else 0
     
     def clear(self) -> bool:
@@ -321,14 +654,23 @@ class ChromaVectorStore(VectorStoreInterface):
         """
         if self.collection is None:
             raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        with self._buffer_lock:
+            self._buffer_ids = []
+            self._buffer_embeddings = []
+            self._buffer_documents = []
+            self._buffer_metadatas = []
         
         try:
-            # 获取所有ID
-            results = self.collection.get()
-            if results["ids"]:
-                # 删除所有向量
-                self.collection.delete(ids=results["ids"])
+            # 只按ID分批删除记录，不删除集合本身：同一目录的客户端在进程内共享，
+            # 删除重建集合会让其他实例持有的集合句柄失效
+            while True:
+                ids = self.collection.get(include=[], limit=_CLEAR_BATCH_SIZE)["ids"]
+                if not ids:
+                    break
+                self.collection.delete(ids=ids)
             return True
         except Exception:
             return False
+        finally:
+            self._invalidate_query_cache()
 
@@ -0,0 +1,468 @@
+"""Faiss IVF-PQ向量数据库实现（用于大规模长期记忆）"""
+from typing import List, Dict, Any, Optional
+import os
+import json
+import atexit
+import numpy as np
+from .vector_store_interface import VectorStoreInterface, content_hash_id
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+class FaissPQVectorStore(VectorStoreInterface):
+    """
+    基于faiss.IndexIVFPQ的向量存储
+    
+    向量经乘积量化（PQ）压缩后每条只占m个字节（d=1024、m=64时压缩64倍），
+    检索使用faiss的SIMD非对称距离计算（ADC）。
+    
+    IVF聚类中心需要训练样本：记忆数量未达到train_threshold之前，向量以float32
+    缓存在内存中并精确检索；达到阈值后用缓存向量训练索引并整体迁移到IVF-PQ。
+    所有向量在写入前归一化，内积即余弦相似度。
+    """
+    
+    _INDEX_FILE = "index.faiss"
+    _PENDING_FILE = "pending.npz"
+    _META_FILE = "meta.json"
+    
+    def __init__(
+        self,
+        persist_directory: Optional[str] = None,
+        collection_name: str = "default",
+        m: int = 64,
+        nbits: int = 8,
+        train_threshold: int = 20000,
+        nprobe: int = 16
+    ):
+        """
+        初始化Faiss PQ向量存储
+        
+        Args:
+            persist_directory: 持久化目录（如果为None，则使用内存模式）
+            collection_name: 集合名称
+            m: PQ子空间数量（每条向量压缩后的字节数，需整除维度）
+            nbits: 每个子空间的编码位数
+            train_threshold: 训练IVF-PQ索引所需的最少向量数
+            nprobe: 检索时访问的IVF倒排列表数量
+        """
+        if not FAISS_AVAILABLE:
+            raise ImportError("faiss is not installed. Please install it with: pip install faiss-cpu")
+        
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.m = m
+        self.nbits = nbits
+        self.train_threshold = max(train_threshold, 1 << nbits)
+        self.nprobe = nprobe
+        self.dimension: Optional[int] = None
+        
+        self.index = None  # 训练完成后的faiss.IndexIVFPQ
+        self.storage: Dict[str, Dict[str, Any]] = {}  # ID -> {content, metadata, id}
+        self._id_to_label: Dict[str, int] = {}  # ID -> faiss内部int64标签
+        self._label_to_id: Dict[int, str] = {}
+        self._next_label = 0
+        # 训练前缓存的归一化向量（标签 -> 向量）
+        self._pending: Dict[int, np.ndarray] = {}
+        
+        if self.persist_directory:
+            atexit.register(self.persist)
+    
+    def _collection_dir(self) -> Optional[str]:
+        """当前集合的持久化目录"""
+        if not self.persist_directory:
+            return None
+        return os.path.join(self.persist_directory, self.collection_name)
+    
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        """转换为float32并L2归一化"""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        return vector
+    
+    def _pq_subspaces(self, dimension: int) -> int:
+        """选择不超过m且能整除维度的最大子空间数"""
+        m = min(self.m, dimension)
+        while dimension % m != 0:
+            m -= 1
+        return m
+    
+    def _train_index(self):
+        """用缓存的向量训练IVF-PQ索引，并把缓存向量迁移进索引"""
+        labels = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+        vectors = np.stack([self._pending[int(label)] for label in labels])
+        
+        # 倒排列表数量按经验取4*sqrt(N)，并保证每个聚类中心至少有39个训练样本
+        nlist = max(1, min(int(4 * np.sqrt(len(vectors))), len(vectors) // 39))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFPQ(
+            quantizer,
+            self.dimension,
+            nlist,
+            self._pq_subspaces(self.dimension),
+            self.nbits,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        # 使用哈希直接映射，支持按标签重建向量和删除
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        index.add_with_ids(vectors, labels)
+        index.nprobe = self.nprobe
+        
+        self.index = index
+        self._pending.clear()
+        self.persist()
+    
+    def initialize(self, collection_name: str, dimension: int):
+        """
+        初始化向量数据库（如果持久化目录中已有索引则加载）
+        
+        Args:
+            collection_name: 集合名称
+            dimension: 向量维度
+        """
+        self.collection_name = collection_name
+        self.dimension = dimension
+        self.index = None
+        self.storage.clear()
+        self._id_to_label.clear()
+        self._label_to_id.clear()
+        self._pending.clear()
+        self._next_label = 0
+        
+        collection_dir = self._collection_dir()
+        if not collection_dir or not os.path.exists(os.path.join(collection_dir, self._META_FILE)):
+            return
+        
+        with open(os.path.join(collection_dir, self._META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.storage = meta["storage"]
+        self._id_to_label = meta["id_to_label"]
+        self._label_to_id = {label: id for id, label in self._id_to_label.items()}
+        self._next_label = meta["next_label"]
+        
+        index_path = os.path.join(collection_dir, self._INDEX_FILE)
+        if os.path.exists(index_path):
+            self.index = faiss.read_index(index_path)
+            self.index.nprobe = self.nprobe
+        
+        pending_path = os.path.join(collection_dir, self._PENDING_FILE)
+        if os.path.exists(pending_path):
+            pending = np.load(pending_path)
+            labels, vectors = pending["labels"], pending["vectors"]
+            self._pending = {int(label): vector for label, vector in zip(labels, vectors)}
+    
+    def persist(self):
+        """把索引、未训练的缓存向量和元数据写入持久化目录"""
+        collection_dir = self._collection_dir()
+        if not collection_dir or self.dimension is None:
+            return
+        
+        os.makedirs(collection_dir, exist_ok=True)
+        if self.index is not None:
+            faiss.write_index(self.index, os.path.join(collection_dir, self._INDEX_FILE))
+        
+        pending_path = os.path.join(collection_dir, self._PENDING_FILE)
+        if self._pending:
+            labels = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+            vectors = np.stack([self._pending[int(label)] for label in labels])
+            with open(pending_path, "wb") as f:
+                np.savez(f, labels=labels, vectors=vectors)
+        elif os.path.exists(pending_path):
+            os.remove(pending_path)
+        
+        with open(os.path.join(collection_dir, self._META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "storage": self.storage,
+                "id_to_label": self._id_to_label,
+                "next_label": self._next_label
+            }, f, ensure_ascii=False)
+    
+    def add(
+        self,
+        content: str,
+        embedding: np.ndarray,
+        metadata: Dict[str, Any],
+        id: Optional[str] = None
+    ) -> str:
+        """
+        添加向量到数据库
+        
+        Args:
+            content: 文本内容
+            embedding: 向量
+            metadata: 元数据
+            id: 可选的ID（如果不提供则由内容哈希生成）
+        
+        Returns:
+            存储的ID
+        """
+        if self.dimension is None:
+            raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        
+        if id is None:
+            id = content_hash_id(content)
+        
+        # 验证embedding维度
+        if len(embedding) != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {len(embedding)}")
+        
+        # 同一ID重复写入时先删除旧向量
+        if id in self._id_to_label:
+            self.delete(id)
+        
+        label = self._next_label
+        self._next_label += 1
+        self._id_to_label[id] = label
+        self._label_to_id[label] = id
+        self.storage[id] = {
+            "content": content,
+            "metadata": metadata,
+            "id": id
+        }
+        
+        vector = self._normalize(embedding)
+        if self.index is not None:
+            self.index.add_with_ids(vector.reshape(1, -1), np.array([label], dtype=np.int64))
+        else:
+            self._pending[label] = vector
+            if len(self._pending) >= self.train_threshold:
+                self._train_index()
+        
+        return id
+    
+    def _filtered_labels(self, filter_metadata: Dict[str, Any]) -> np.ndarray:
+        """满足元数据过滤条件的faiss标签"""
+        labels = [
+            self._id_to_label[id] for id, item in self.storage.items()
+            if self._match_filter(item.get("metadata", {}), filter_metadata)
+        ]
+        return np.array(labels, dtype=np.int64)
+    
+    def _search_pending(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None):
+        """训练前在缓存向量上精确检索（allowed不为None时只计算这些标签的距离）"""
+        if allowed is None:
+            labels = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+        else:
+            labels = np.array([label for label in allowed.tolist() if label in self._pending], dtype=np.int64)
+        if not labels.size:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        scores = np.stack([self._pending[int(label)] for label in labels]) @ query
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return scores[top], labels[top]
+    
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        搜索相似向量
+        
+        Args:
+            query_embedding: 查询向量
+            top_k: 返回top-k个结果
+            filter_metadata: 元数据过滤条件
+        
+        Returns:
+            搜索结果列表，每个结果包含content, metadata, score, id等
+        """
+        if self.dimension is None:
+            raise RuntimeError("Vector store not initialized. Call initialize() first.")
+        if top_k <= 0 or not self.storage:
+            return []
+        
+        query = self._normalize(query_embedding)
+        
+        # 有过滤条件时先筛出满足条件的标签（预过滤），检索只计算这些向量的距离，
+        # 不会因为候选被过滤掉而返回不足top_k个结果
+        allowed = None
+        if filter_metadata:
+            allowed = self._filtered_labels(filter_metadata)
+            if not allowed.size:
+                return []
+        
+        if self.index is not None:
+            params = None
+            if allowed is not None:
+                params = faiss.SearchParametersIVF(
+                    sel=faiss.IDSelectorBatch(allowed),
+                    nprobe=self.nprobe
+                )
+            distances, labels = self.index.search(query.reshape(1, -1), top_k, params=params)
+            scores, labels = distances[0], labels[0]
+        else:
+            scores, labels = self._search_pending(query, top_k, allowed)
+        
+        results = []
+        for score, label in zip(scores, labels):
+            if label < 0:
+                continue  # faiss用-1填充不足k个的结果
+            item = self.storage[self._label_to_id[int(label)]]
+            result = item.copy()
+            result["score"] = float(score)
+            results.append(result)
+            if len(results) >= top_k:
+                break
+        
+        return results
+    
+    def delete(self, id: str) -> bool:
+        """
+        删除向量
+        
+        Args:
+            id: 向量ID
+        
+        Returns:
+            是否删除成功
+        """
+        if id not in self.storage:
+            return False
+        
+        label = self._id_to_label.pop(id)
+        del self._label_to_id[label]
+        del self.storage[id]
+        if label in self._pending:
+            del self._pending[label]
+        elif self.index is not None:
+            self.index.remove_ids(np.array([label], dtype=np.int64))
+        return True
+    
+    def _reconstruct(self, id: str) -> List[float]:
+        """取回向量（训练后为PQ解码的近似值，已归一化）"""
+        label = self._id_to_label[id]
+        if label in self._pending:
+            return self._pending[label].tolist()
+        return self.index.reconstruct(label).tolist()
+    
+    def get(self, id: str, include_embedding: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        获取指定ID的向量
+        
+        Args:
+            id: 向量ID
+            include_embedding: 是否返回向量（PQ解码的近似值）
+        
+        Returns:
+            向量信息（包含content, metadata，以及可选的embedding），如果不存在返回None
+        """
+        if id not in self.storage:
+            return None
+        item = self.storage[id].copy()
+        if include_embedding:
+            item["embedding"] = self._reconstruct(id)
+        return item
+    
+    def update(
+        self,
+        id: str,
+        content: Optional[str] = None,
+        embedding: Optional[np.ndarray] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        更新向量
+        
+        Args:
+            id: 向量ID
+            content: 新的文本内容（可选）
+            embedding: 新的向量（可选）
+            metadata: 新的元数据（可选）
+        
+        Returns:
+            是否更新成功
+        """
+        if id not in self.storage:
+            return False
+        
+        if content is not None:
+            self.storage[id]["content"] = content
+        if metadata is not None:
+            self.storage[id]["metadata"].update(metadata)
+        if embedding is not None:
+            item = self.storage[id]
+            self.add(item["content"], embedding, item["metadata"], id=id)
+        return True
+    
+    def get_all(
+        self,
+        limit: Optional[int] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include_embedding: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        获取所有向量
+        
+        Args:
+            limit: 限制返回数量
+            filter_metadata: 元数据过滤条件
+            include_embedding: 是否返回向量（默认不返回）
+        
+        Returns:
+            向量列表
+        """
+        results = []
+        for id, item in self.storage.items():
+            if filter_metadata and not self._match_filter(item.get("metadata", {}), filter_metadata):
+                continue
+            result = item.copy()
+            if include_embedding:
+                result["embedding"] = self._reconstruct(id)
+            results.append(result)
+            if limit and len(results) >= limit:
+                break
+        return results
+    
+    def count(self, filter_metadata: Optional[Dict[str, Any]] = None) -> int:
+        """
+        获取向量数量
+        
+        Args:
+            filter_metadata: 元数据过滤条件
+        
+        Returns:
+            向量数量
+        """
+        if not filter_metadata:
+            return len(self.storage)
+        return sum(
+            1 for item in self.storage.values()
+            if self._match_filter(item.get("metadata", {}), filter_metadata)
+        )
+    
+    def clear(self) -> bool:
+        """
+        清空所有向量
+        
+        Returns:
+            是否清空成功
+        """
+        self.index = None
+        self.storage.clear()
+        self._id_to_label.clear()
+        self._label_to_id.clear()
+        self._pending.clear()
+        
+        collection_dir = self._collection_dir()
+        if collection_dir and os.path.exists(os.path.join(collection_dir, self._INDEX_FILE)):
+            os.remove(os.path.join(collection_dir, self._INDEX_FILE))
+        self.persist()
+        return True
+    
+    def _match_filter(self, metadata: Dict[str, Any], filter_metadata: Dict[str, Any]) -> bool:
+        """检查元数据是否匹配过滤条件"""
+        for key, value in filter_metadata.items():
+            if key not in metadata:
+                return False
+            if metadata[key] != value:
+                return False
+        return True
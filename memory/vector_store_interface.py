@@ -1,6 +1,21 @@
 """向量数据库接口（抽象基类）"""
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
+import hashlib
+import numpy as np
+
+
+def content_hash_id(content: str) -> str:
+    """
+    根据内容生成确定性ID（相同内容得到相同ID，重复写入时覆盖而不是新增）
+    
+    Args:
+        content: 文本内容
+        
+    Returns:
+        32位十六进制ID
+    """
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
 
 
 class VectorStoreInterface(ABC):
@@ -21,7 +36,7 @@ class VectorStoreInterface(ABC):
     def add(
         self,
         content: str,
-        embedding: List[float],
+        embedding: np.ndarray,
         metadata: Dict[str, Any],
         id: Optional[str] = None
     ) -> str:
@@ -30,19 +45,39 @@ class VectorStoreInterface(ABC):
         
         Args:
             content: 文本内容
-            embedding: 向量
+            embedding: float32向量
             metadata: 元数据
-            id: 可选的ID（如果不提供则自动生成）
+            id: 可选的ID（如果不提供则由内容哈希生成，相同内容不会重复存储）
             
         Returns:
             存储的ID
         """
         pass
     
+    def add_many(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        批量添加向量（默认逐条调用add，子类可覆盖为一次批量写入）
+        
+        Args:
+            items: 向量列表，每项包含content, embedding, metadata, 可选id
+            
+        Returns:
+            存储的ID列表
+        """
+        return [
+            self.add(
+                content=item["content"],
+                embedding=item["embedding"],
+                metadata=item["metadata"],
+                id=item.get("id")
+            )
+            for item in items
+        ]
+    
     @abstractmethod
     def search(
         self,
-        query_embedding: List[float],
+        query_embedding: np.ndarray,
         top_k: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
@@ -59,6 +94,28 @@ class VectorStoreInterface(ABC):
         """
         pass
     
+    def search_many(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似向量（默认逐条调用search，子类可覆盖为一次批量计算）
+        
+        Args:
+            query_embeddings: (Q, D)的查询向量矩阵
+            top_k: 每个查询返回top-k个结果
+            filter_metadata: 元数据过滤条件（对所有查询生效）
+            
+        Returns:
+            与查询一一对应的搜索结果列表
+        """
+        return [
+            self.search(query_embedding, top_k=top_k, filter_metadata=filter_metadata)
+            for query_embedding in query_embeddings
+        ]
+    
     @abstractmethod
     def delete(self, id: str) -> bool:
         """
@@ -73,15 +130,16 @@ class VectorStoreInterface(ABC):
         pass
     
     @abstractmethod
-    def get(self, id: str) -> Optional[Dict[str, Any]]:
+    def get(self, id: str, include_embedding: bool = True) -> Optional[Dict[str, Any]]:
         """
         获取指定ID的向量
         
         Args:
             id: 向量ID
+            include_embedding: 是否返回向量（不需要时可省去向量的读取和传输）
             
         Returns:
-            向量信息（包含content, embedding, metadata等），如果不存在返回None
+            向量信息（包含content, metadata，以及可选的embedding），如果不存在返回None
         """
         pass
     
@@ -90,7 +148,7 @@ class VectorStoreInterface(ABC):
         self,
         id: str,
         content: Optional[str] = None,
-        embedding: Optional[List[float]] = None,
+        embedding: Optional[np.ndarray] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
         """
@@ -111,7 +169,8 @@ class VectorStoreInterface(ABC):
     def get_all(
         self,
         limit: Optional[int] = None,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include_embedding: bool = False
     ) -> List[Dict[str, Any]]:
         """
         获取所有向量
@@ -119,6 +178,7 @@ class VectorStoreInterface(ABC):
         Args:
             limit: 限制返回数量
             filter_metadata: 元数据过滤条件
+            include_embedding: 是否返回向量（默认不返回）
             
         Returns:
             向量列表
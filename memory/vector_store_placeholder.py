@@ -1,37 +1,527 @@
 """向量数据库占位符实现（用于测试和开发）"""
-from typing import List, Dict, Any, Optional
-from .vector_store_interface import VectorStoreInterface
+from typing import List, Dict, Any, Optional, Tuple
+import os
+import json
+import atexit
+from .vector_store_interface import VectorStoreInterface, content_hash_id
+from .quantization import TurboQuantCodec
 import numpy as np
 
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# 列式元数据中缺失键的占位值（与任何过滤值都不相等）
+_MISSING = object()
+
+# 可以直接在object数组上做逐元素比较的过滤值类型
+_COLUMN_FILTER_TYPES = (str, int, float, bool)
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _numba_dot_rows(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """按行并行计算内积（低维时省去BLAS调用的固定开销）"""
+        out = np.empty(matrix.shape[0], dtype=np.float32)
+        for i in numba.prange(matrix.shape[0]):
+            total = np.float32(0.0)
+            for j in range(matrix.shape[1]):
+                total += matrix[i, j] * query[j]
+            out[i] = total
+        return out
+
 
 class VectorStorePlaceholder(VectorStoreInterface):
-    """向量数据库占位符实现，使用内存存储（用于测试和开发）"""
+    """向量数据库占位符实现，使用内存存储（用于测试和开发）
+    
+    所有向量保存在一个连续的float32矩阵中（按行存储），并缓存每行的范数，
+    检索时通过一次矩阵-向量乘法（BLAS GEMV）计算全部余弦相似度，元数据过滤以
+    布尔掩码的形式作用在相似度上，再用argpartition选出top-k，避免Python逐条循环。
+    
+    precision为"fp16"时向量以float16存储（内存占用减半），范数和检索计算仍使用float32。
+    precision为"int8"时向量先L2归一化，再按每条向量的缩放因子（max|v|/127）量化为int8，
+    检索时查询向量以同样方式量化，用int32累加的整数矩阵乘法分块计算内积得到候选，
+    再用未量化的查询向量对少量候选重新打分（消除查询量化引入的误差）。
+    precision为"turbo"时使用TurboQuant编码（Hadamard旋转+Lloyd-Max量化），
+    每个坐标只占quant_bits位，检索时旋转查询向量并分块解码后计算内积。
+    
+    元数据除保存在storage中外，还按键以列式object数组（与矩阵行对齐）保存，
+    过滤时对每个过滤键做一次逐元素比较得到布尔掩码，避免逐条遍历元数据字典。
+    
+    指定persist_directory时，矩阵、范数和缩放因子保存在np.memmap映射的文件中，
+    ID和元数据保存在JSON文件中（persist()或进程退出时写入）。重启后直接映射已有文件，
+    无需重新插入，多个进程也可以共享同一份页缓存。
+    
+    use_hnsw为True时额外维护一个hnswlib HNSW图索引（索引内部保存float32副本），
+    检索走近似最近邻；图为空、向量数量很少或过滤条件过于严格时回退到精确扫描。
+    """
+    
+    # 矩阵初始容量（行数），容量不足时按2倍扩容
+    _INITIAL_CAPACITY = 64
     
-    def __init__(self):
-        """初始化占位符实现"""
+    # 量化模式下每次解码/扩展的行数（限制临时矩阵大小，使其留在CPU缓存中）
+    _DECODE_BLOCK_ROWS = 4096
+    
+    # int8模式下用float查询向量重新打分的候选数量（至少为top_k的4倍）
+    _INT8_RERANK_CANDIDATES = 50
+    
+    # 维度不超过该值时使用numba内核计算fp32内积（高维时BLAS更快）
+    _NUMBA_MAX_DIMENSION = 512
+    
+    # 向量数量低于该值时HNSW没有优势，直接精确扫描
+    _HNSW_MIN_ROWS = 1000
+    
+    # 过滤后剩余行数占比低于该值时认为过滤条件过于严格，回退到精确扫描
+    _HNSW_MIN_FILTER_RATIO = 0.1
+    
+    # 持久化文件名
+    _MATRIX_FILE = "matrix.bin"
+    _NORMS_FILE = "norms.bin"
+    _SCALES_FILE = "scales.bin"
+    _META_FILE = "meta.json"
+    
+    # 支持的存储精度（turbo模式存储bit-packed码字）
+    _PRECISION_DTYPES = {
+        "fp32": np.float32,
+        "fp16": np.float16,
+        "int8": np.int8,
+        "turbo": np.uint8,
+    }
+    
+    def __init__(
+        self,
+        precision: str = "fp32",
+        quant_bits: int = 4,
+        use_hnsw: bool = False,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef_search: int = 64,
+        persist_directory: Optional[str] = None
+    ):
+        """
+        初始化占位符实现
+        
+        Args:
+            precision: 向量存储精度（fp32、fp16、int8或turbo）
+            quant_bits: turbo模式下每个坐标的编码位数
+            use_hnsw: 是否使用HNSW近似最近邻索引（需要hnswlib）
+            hnsw_m: HNSW图中每个节点的邻居数
+            hnsw_ef_construction: 建图时的候选列表大小
+            hnsw_ef_search: 检索时的候选列表大小（越大召回越高、越慢）
+            persist_directory: 持久化目录（如果为None，则使用内存模式；否则向量使用mmap文件存储）
+        """
+        if precision not in self._PRECISION_DTYPES:
+            raise ValueError(f"Unsupported precision: {precision}, expected one of {list(self._PRECISION_DTYPES)}")
+        if use_hnsw and not HNSWLIB_AVAILABLE:
+            print("Warning: hnswlib not available, using exact search")
+            use_hnsw = False
+        self.precision = precision
+        self.quant_bits = quant_bits
+        self.use_hnsw = use_hnsw
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self._dtype = self._PRECISION_DTYPES[precision]
         self.collection_name: Optional[str] = None
         self.dimension: Optional[int] = None
         self.storage: Dict[str, Dict[str, Any]] = {}
-        self.embeddings: Dict[str, List[float]] = {}
+        self.persist_directory = persist_directory
+        self._reset_matrix()
+        
+        if self.persist_directory:
+            atexit.register(self.persist)
+    
+    def _collection_dir(self) -> Optional[str]:
+        """当前集合的持久化目录"""
+        if not self.persist_directory or not self.collection_name:
+            return None
+        return os.path.join(self.persist_directory, self.collection_name)
+    
+    def _allocate(
+        self,
+        name: str,
+        shape: Tuple[int, ...],
+        dtype,
+        old: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        分配（或扩容）一个数组：内存模式下为普通数组，持久化模式下为文件映射的np.memmap
+        
+        Args:
+            name: 持久化文件名
+            shape: 数组形状（第一维为行容量）
+            dtype: 数据类型
+            old: 扩容前的数组（其中已有的行会保留）
+            
+        Returns:
+            新数组
+        """
+        collection_dir = self._collection_dir()
+        if collection_dir is None:
+            array = np.zeros(shape, dtype=dtype)
+            if old is not None:
+                array[:old.shape[0]] = old
+            return array
+        
+        # 文件按行优先存储，扩容只需在文件末尾追加，已有数据原地保留
+        os.makedirs(collection_dir, exist_ok=True)
+        path = os.path.join(collection_dir, name)
+        if old is not None:
+            old.flush()
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+    
+    def _load(self):
+        """从持久化目录映射已有的向量文件并恢复ID和元数据"""
+        collection_dir = self._collection_dir()
+        if collection_dir is None or not os.path.exists(os.path.join(collection_dir, self._META_FILE)):
+            return
+        
+        with open(os.path.join(collection_dir, self._META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta["precision"], meta["quant_bits"], meta["dimension"]) != (self.precision, self.quant_bits, self.dimension):
+            print("Warning: Persisted vector store does not match current precision or dimension, starting empty")
+            return
+        if not meta["row_ids"]:
+            return
+        
+        capacity, width = meta["capacity"], meta["width"]
+        if self.precision == "turbo":
+            self._codec = TurboQuantCodec(self.dimension, bits=self.quant_bits)
+        self._matrix = self._allocate(self._MATRIX_FILE, (capacity, width), self._dtype)
+        self._norms = self._allocate(self._NORMS_FILE, (capacity,), np.float32)
+        self._scales = self._allocate(self._SCALES_FILE, (capacity,), np.float32)
+        self.storage = meta["storage"]
+        self._row_ids = meta["row_ids"]
+        self._id_to_row = {id: row for row, id in enumerate(self._row_ids)}
+        
+        # 列式元数据和HNSW索引不持久化，按行重建
+        for row, id in enumerate(self._row_ids):
+            self._write_metadata_row(row, self.storage[id]["metadata"])
+            if self.use_hnsw:
+                self._hnsw_add(id, self._row_vector(row))
+    
+    def persist(self):
+        """把ID和元数据写入持久化目录，并把映射的向量文件刷回磁盘"""
+        collection_dir = self._collection_dir()
+        if collection_dir is None or self.dimension is None:
+            return
+        
+        os.makedirs(collection_dir, exist_ok=True)
+        for array in (self._matrix, self._norms, self._scales):
+            if isinstance(array, np.memmap):
+                array.flush()
+        with open(os.path.join(collection_dir, self._META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "precision": self.precision,
+                "quant_bits": self.quant_bits,
+                "dimension": self.dimension,
+                "capacity": 0 if self._matrix is None else self._matrix.shape[0],
+                "width": 0 if self._matrix is None else self._matrix.shape[1],
+                "row_ids": self._row_ids,
+                "storage": self.storage
+            }, f, ensure_ascii=False)
+    
+    def _reset_matrix(self):
+        """重置向量矩阵及行索引"""
+        self._matrix: Optional[np.ndarray] = None  # (capacity, width)，dtype由precision决定
+        self._norms: Optional[np.ndarray] = None   # (capacity,) float32
+        self._scales: Optional[np.ndarray] = None  # (capacity,) float32，仅int8和turbo模式使用
+        self._codec: Optional[TurboQuantCodec] = None
+        self._row_ids: List[str] = []               # 行号 -> ID
+        self._id_to_row: Dict[str, int] = {}        # ID -> 行号
+        self._meta_cols: Dict[str, np.ndarray] = {} # 元数据键 -> (capacity,) object数组
+        # HNSW索引使用不随删除变化的int标签（行号会因删除时的行交换而改变）
+        self._hnsw = None
+        self._id_to_label: Dict[str, int] = {}
+        self._label_to_id: Dict[int, str] = {}
+        self._next_label = 0
+    
+    def _ensure_capacity(self, dimension: int):
+        """确保矩阵还能容纳一行，不足时按几何级数扩容"""
+        size = len(self._row_ids)
+        if self._matrix is None:
+            capacity = self._INITIAL_CAPACITY
+            width = dimension
+            if self.precision == "turbo":
+                self._codec = TurboQuantCodec(dimension, bits=self.quant_bits)
+                width = self._codec.code_bytes
+            self._matrix = self._allocate(self._MATRIX_FILE, (capacity, width), self._dtype)
+            self._norms = self._allocate(self._NORMS_FILE, (capacity,), np.float32)
+            self._scales = self._allocate(self._SCALES_FILE, (capacity,), np.float32)
+        elif size >= self._matrix.shape[0]:
+            capacity = self._matrix.shape[0] * 2
+            self._matrix = self._allocate(self._MATRIX_FILE, (capacity, self._matrix.shape[1]), self._dtype, old=self._matrix)
+            self._norms = self._allocate(self._NORMS_FILE, (capacity,), np.float32, old=self._norms)
+            self._scales = self._allocate(self._SCALES_FILE, (capacity,), np.float32, old=self._scales)
+            for key, column in self._meta_cols.items():
+                grown = np.full(capacity, _MISSING, dtype=object)
+                grown[:size] = column[:size]
+                self._meta_cols[key] = grown
+    
+    def _write_row(self, row: int, embedding: np.ndarray):
+        """写入一行向量并更新其范数"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self._codec is not None:
+            packed, scales = self._codec.encode(vector.reshape(1, -1))
+            self._matrix[row] = packed[0]
+            self._scales[row] = scales[0]
+            stored = self._codec.decode_rotated(packed, scales)[0]
+        elif self.precision == "int8":
+            codes, scale = self._quantize_int8(vector)
+            self._matrix[row] = codes
+            self._scales[row] = scale
+            stored = codes.astype(np.float32) * scale
+        else:
+            self._matrix[row] = vector
+            stored = self._matrix[row].astype(np.float32)
+        # 范数按实际存储的（可能已降精度的）向量计算，保证余弦相似度自洽
+        self._norms[row] = np.linalg.norm(stored)
+    
+    def _write_metadata_row(self, row: int, metadata: Dict[str, Any]):
+        """把一行元数据写入列式存储（新出现的键创建新列）"""
+        for key, column in self._meta_cols.items():
+            column[row] = metadata.get(key, _MISSING)
+        for key in metadata.keys() - self._meta_cols.keys():
+            column = np.full(self._matrix.shape[0], _MISSING, dtype=object)
+            column[row] = metadata[key]
+            self._meta_cols[key] = column
+    
+    def _filter_mask(self, filter_metadata: Dict[str, Any]) -> np.ndarray:
+        """
+        计算元数据过滤的布尔掩码
+        
+        Args:
+            filter_metadata: 元数据过滤条件
+            
+        Returns:
+            (size,)的布尔数组，与矩阵行对齐
+        """
+        size = len(self._row_ids)
+        mask = np.ones(size, dtype=bool)
+        for key, value in filter_metadata.items():
+            column = self._meta_cols.get(key)
+            if column is None:
+                return np.zeros(size, dtype=bool)
+            if isinstance(value, _COLUMN_FILTER_TYPES):
+                mask &= column[:size] == value
+            else:
+                # 列表等值不能直接做逐元素比较，逐个比较
+                mask &= np.fromiter((item == value for item in column[:size]), dtype=bool, count=size)
+        return mask
+    
+    @staticmethod
+    def _quantize_int8(vector: np.ndarray) -> Tuple[np.ndarray, np.float32]:
+        """
+        把向量L2归一化后按对称缩放量化为int8
+        
+        Args:
+            vector: float32向量
+            
+        Returns:
+            (codes, scale)：int8码字和float32缩放因子（v ≈ codes * scale）
+        """
+        norm = np.linalg.norm(vector)
+        normalized = vector / norm if norm > 0 else vector
+        max_abs = np.max(np.abs(normalized))
+        scale = np.float32(max_abs / 127.0) if max_abs > 0 else np.float32(1.0)
+        codes = np.clip(np.round(normalized / scale), -127, 127).astype(np.int8)
+        return codes, scale
+    
+    def _hnsw_add(self, id: str, embedding: np.ndarray):
+        """把向量写入HNSW索引（已存在的标签会被原地更新）"""
+        if self._hnsw is None:
+            self._hnsw = hnswlib.Index(space="cosine", dim=len(embedding))
+            self._hnsw.init_index(
+                max_elements=self._INITIAL_CAPACITY,
+                ef_construction=self.hnsw_ef_construction,
+                M=self.hnsw_m
+            )
+            self._hnsw.set_ef(self.hnsw_ef_search)
+        
+        label = self._id_to_label.get(id)
+        if label is None:
+            label = self._next_label
+            self._next_label += 1
+            self._id_to_label[id] = label
+            self._label_to_id[label] = id
+            # 被标记删除的节点仍占用容量，按已插入的标签总数扩容
+            if self._hnsw.get_current_count() >= self._hnsw.get_max_elements():
+                self._hnsw.resize_index(self._hnsw.get_max_elements() * 2)
+        self._hnsw.add_items(
+            np.asarray(embedding, dtype=np.float32).reshape(1, -1),
+            np.array([label], dtype=np.int64)
+        )
+    
+    def _hnsw_search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        使用HNSW索引检索
+        
+        Args:
+            query: float32查询向量
+            top_k: 返回数量
+            filter_metadata: 元数据过滤条件（过滤时多取候选再后过滤）
+            
+        Returns:
+            检索结果；候选不足top_k个时返回None，由调用方回退到精确扫描
+        """
+        size = len(self._row_ids)
+        k = min(size, top_k * 4 if filter_metadata else top_k)
+        labels, distances = self._hnsw.knn_query(query.reshape(1, -1), k=k)
+        
+        results = []
+        for label, distance in zip(labels[0], distances[0]):
+            item = self.storage[self._label_to_id[int(label)]]
+            if filter_metadata and not self._match_filter(item.get("metadata", {}), filter_metadata):
+                continue
+            result = item.copy()
+            result["score"] = float(1.0 - distance)  # cosine空间的距离为1-余弦相似度
+            results.append(result)
+            if len(results) >= top_k:
+                break
+        
+        if filter_metadata and len(results) < top_k:
+            return None  # 后过滤后候选不足
+        return results
+    
+    def _row_vector(self, row: int) -> np.ndarray:
+        """取回一行向量（float32，原始空间；int8模式下为归一化后的向量）"""
+        if self._codec is not None:
+            return self._codec.decode(self._matrix[row:row + 1], self._scales[row:row + 1])[0]
+        if self.precision == "int8":
+            return self._matrix[row].astype(np.float32) * self._scales[row]
+        return self._matrix[row].astype(np.float32)
+    
+    def _dot_rows(self, rows, query: np.ndarray) -> np.ndarray:
+        """
+        计算指定行与查询向量的内积
+        
+        Args:
+            rows: 行号数组或行切片
+            query: float32查询向量
+            
+        Returns:
+            (len(rows),)的float32内积
+        """
+        # 量化模式分块计算，需要显式的行号数组（fp32/fp16保留切片，避免复制矩阵）
+        if isinstance(rows, slice) and (self._codec is not None or self.precision == "int8"):
+            rows = np.arange(rows.start, rows.stop)
+        
+        if self.precision == "int8":
+            # 查询向量同样量化为int8，以int32累加做整数内积，再乘回两侧的缩放因子；
+            # 分块扩展为int32，避免一次把整个int8矩阵复制成4倍大小的临时矩阵
+            query_codes, query_scale = self._quantize_int8(query)
+            query_codes = query_codes.astype(np.int32)
+            dots = np.empty(rows.shape[0], dtype=np.float32)
+            for start in range(0, rows.shape[0], self._DECODE_BLOCK_ROWS):
+                block = rows[start:start + self._DECODE_BLOCK_ROWS]
+                dots[start:start + block.shape[0]] = self._matrix[block].astype(np.int32) @ query_codes
+            return dots * (self._scales[rows] * query_scale)
+        
+        if self._codec is None:
+            if SIMSIMD_AVAILABLE and self.precision in ("fp32", "fp16"):
+                # simsimd按CPU运行时分派手写的AVX-512/NEON内积内核（支持float16直接计算）
+                matrix = np.ascontiguousarray(self._matrix[rows])
+                dots = simsimd.cdist(query.astype(self._dtype, copy=False).reshape(1, -1), matrix, metric="dot")
+                return np.asarray(dots, dtype=np.float32).reshape(-1)
+            if NUMBA_AVAILABLE and self.precision == "fp32" and query.shape[0] <= self._NUMBA_MAX_DIMENSION:
+                return _numba_dot_rows(self._matrix[rows], query)
+            # fp16存储时先升为float32再计算，避免半精度累加误差
+            return self._matrix[rows].astype(np.float32, copy=False) @ query
+        
+        # turbo模式：查询向量只旋转一次，码字分块解码后在旋转空间中计算内积
+        rotated_query = self._codec.rotation.rotate(query)
+        dots = np.empty(rows.shape[0], dtype=np.float32)
+        for start in range(0, rows.shape[0], self._DECODE_BLOCK_ROWS):
+            block = rows[start:start + self._DECODE_BLOCK_ROWS]
+            decoded = self._codec.decode_rotated(self._matrix[block], self._scales[block])
+            dots[start:start + block.shape[0]] = decoded @ rotated_query
+        return dots
+    
+    @staticmethod
+    def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        选出相似度最高的top_k个下标（按相似度降序）
+        
+        argpartition只需O(N)即可选出k个候选，再只对这k个候选排序（O(k log k)），
+        避免对全部N个相似度排序。被过滤掉的行（-inf）不会出现在结果中。
+        
+        Args:
+            scores: (N,)的相似度，被过滤的行为-inf
+            top_k: 返回数量
+            
+        Returns:
+            下标数组
+        """
+        k = min(top_k, int(np.count_nonzero(scores != -np.inf)))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        return top[np.argsort(-scores[top])]
+    
+    def _rerank_int8(self, rows: np.ndarray, query: np.ndarray, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        int8模式下用未量化的查询向量对候选行重新打分
+        
+        Args:
+            rows: 整数内积选出的候选行
+            query: float32查询向量
+            scores: (N,)的相似度（候选行的相似度会被原地更新）
+            top_k: 返回数量
+            
+        Returns:
+            重新排序后的top_k个行号
+        """
+        if rows.shape[0] == 0:
+            return rows
+        vectors = self._matrix[rows].astype(np.float32) * self._scales[rows, None]
+        scores[rows] = (vectors @ query) / (self._norms[rows] * np.linalg.norm(query) + 1e-12)
+        return rows[np.argsort(-scores[rows])[:top_k]]
     
     def initialize(self, collection_name: str, dimension: int):
         """初始化向量数据库"""
         self.collection_name = collection_name
         self.dimension = dimension
-        self.storage.clear()
-        self.embeddings.clear()
+        self.storage = {}
+        self._reset_matrix()
+        self._load()
     
     def add(
         self,
         content: str,
-        embedding: List[float],
+        embedding: np.ndarray,
         metadata: Dict[str, Any],
         id: Optional[str] = None
     ) -> str:
         """添加向量到数据库"""
         if id is None:
-            import uuid
-            id = str(uuid.uuid4())
+            id = content_hash_id(content)
         
         # 验证embedding维度
         if self.dimension and len(embedding) != self.dimension:
@@ -43,58 +533,143 @@ class VectorStorePlaceholder(VectorStoreInterface):
             "metadata": metadata,
             "id": id
         }
-        self.embeddings[id] = embedding
+        
+        row = self._id_to_row.get(id)
+        if row is None:
+            self._ensure_capacity(len(embedding))
+            row = len(self._row_ids)
+            self._row_ids.append(id)
+            self._id_to_row[id] = row
+        self._write_row(row, embedding)
+        self._write_metadata_row(row, metadata)
+        if self.use_hnsw:
+            self._hnsw_add(id, embedding)
         
         return id
     
     def search(
         self,
-        query_embedding: List[float],
+        query_embedding: np.ndarray,
         top_k: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """搜索相似向量"""
-        if not self.embeddings:
+        size = len(self._row_ids)
+        if size == 0 or top_k <= 0:
             return []
         
-        # 计算相似度
-        similarities = []
-        for id, embedding in self.embeddings.items():
-            # 应用元数据过滤
+        query = np.asarray(query_embedding, dtype=np.float32)
+        
+        # HNSW近似检索（向量数量太少时精确扫描更快）
+        if self._hnsw is not None and size >= self._HNSW_MIN_ROWS:
             if filter_metadata:
-                metadata = self.storage[id].get("metadata", {})
-                if not self._match_filter(metadata, filter_metadata):
-                    continue
-            
-            # 计算余弦相似度
-            similarity = self._cosine_similarity(query_embedding, embedding)
-            similarities.append((id, similarity))
+                matched = self.count(filter_metadata)
+                use_index = matched >= size * self._HNSW_MIN_FILTER_RATIO
+            else:
+                use_index = True
+            if use_index:
+                results = self._hnsw_search(query, top_k, filter_metadata)
+                if results is not None:
+                    return results
         
-        # 按相似度排序
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        # 一次GEMV计算全部余弦相似度（分母加epsilon，零向量的相似度为0）
+        scores = self._dot_rows(slice(0, size), query) / (self._norms[:size] * np.linalg.norm(query) + 1e-12)
+        
+        # 元数据过滤：构建布尔掩码，不匹配的行相似度置为-inf，不参与top-k
+        if filter_metadata:
+            mask = self._filter_mask(filter_metadata)
+            if not mask.any():
+                return []
+            scores[~mask] = -np.inf
+        
+        if self.precision == "int8":
+            candidates = self._top_k_indices(scores, max(top_k * 4, self._INT8_RERANK_CANDIDATES))
+            top = self._rerank_int8(candidates, query, scores, top_k)
+        else:
+            top = self._top_k_indices(scores, top_k)
         
         # 返回top-k结果
         results = []
-        for id, score in similarities[:top_k]:
-            item = self.storage[id].copy()
-            item["score"] = score
+        for row in top:
+            item = self.storage[self._row_ids[row]].copy()
+            item["score"] = float(scores[row])
             results.append(item)
         
         return results
     
+    def search_many(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批量搜索相似向量（fp32/fp16精度下用一次GEMM计算全部查询的相似度）"""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        size = len(self._row_ids)
+        if size == 0 or top_k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        
+        # 量化存储和HNSW索引逐条检索
+        if self.precision not in ("fp32", "fp16") or (self._hnsw is not None and size >= self._HNSW_MIN_ROWS):
+            return super().search_many(queries, top_k=top_k, filter_metadata=filter_metadata)
+        
+        # (size, Q)的相似度矩阵
+        scores = self._matrix[:size].astype(np.float32, copy=False) @ queries.T
+        scores /= self._norms[:size, None] * np.linalg.norm(queries, axis=1)[None, :] + 1e-12
+        
+        if filter_metadata:
+            mask = self._filter_mask(filter_metadata)
+            if not mask.any():
+                return [[] for _ in range(queries.shape[0])]
+            scores[~mask] = -np.inf
+        
+        all_results = []
+        for column in range(queries.shape[0]):
+            column_scores = scores[:, column]
+            results = []
+            for row in self._top_k_indices(column_scores, top_k):
+                item = self.storage[self._row_ids[row]].copy()
+                item["score"] = float(column_scores[row])
+                results.append(item)
+            all_results.append(results)
+        
+        return all_results
+    
     def delete(self, id: str) -> bool:
         """删除向量"""
-        if id in self.storage:
-            del self.storage[id]
-            del self.embeddings[id]
-            return True
-        return False
+        if id not in self.storage:
+            return False
+        
+        del self.storage[id]
+        
+        # 用最后一行填补被删除的行，保持矩阵紧凑
+        row = self._id_to_row.pop(id)
+        last_row = len(self._row_ids) - 1
+        if row != last_row:
+            last_id = self._row_ids[last_row]
+            self._matrix[row] = self._matrix[last_row]
+            self._norms[row] = self._norms[last_row]
+            self._scales[row] = self._scales[last_row]
+            for column in self._meta_cols.values():
+                column[row] = column[last_row]
+            self._row_ids[row] = last_id
+            self._id_to_row[last_id] = row
+        for column in self._meta_cols.values():
+            column[last_row] = _MISSING  # 释放对元数据值的引用
+        self._row_ids.pop()
+        
+        if self._hnsw is not None:
+            label = self._id_to_label.pop(id)
+            del self._label_to_id[label]
+            self._hnsw.mark_deleted(label)
+        return True
     
-    def get(self, id: str) -> Optional[Dict[str, Any]]:
+    def get(self, id: str, include_embedding: bool = True) -> Optional[Dict[str, Any]]:
         """获取指定ID的向量"""
         if id in self.storage:
             item = self.storage[id].copy()
-            item["embedding"] = self.embeddings[id]
+            if include_embedding:
+                item["embedding"] = self._row_vector(self._id_to_row[id]).tolist()
             return item
         return None
     
@@ -102,7 +677,7 @@ class VectorStorePlaceholder(VectorStoreInterface):
         self,
         id: str,
         content: Optional[str] = None,
-        embedding: Optional[List[float]] = None,
+        embedding: Optional[np.ndarray] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
         """更新向量"""
@@ -115,17 +690,21 @@ class VectorStorePlaceholder(VectorStoreInterface):
         if embedding is not None:
             if self.dimension and len(embedding) != self.dimension:
                 raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {len(embedding)}")
-            self.embeddings[id] = embedding
+            self._write_row(self._id_to_row[id], embedding)
+            if self.use_hnsw:
+                self._hnsw_add(id, embedding)
         
         if metadata is not None:
             self.storage[id]["metadata"].update(metadata)
+            self._write_metadata_row(self._id_to_row[id], self.storage[id]["metadata"])
         
         return True
     
     def get_all(
         self,
         limit: Optional[int] = None,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include_embedding: bool = False
     ) -> List[Dict[str, Any]]:
         """获取所有向量"""
         results = []
@@ -137,7 +716,8 @@ class VectorStorePlaceholder(VectorStoreInterface):
                     continue
             
             result = item.copy()
-            result["embedding"] = self.embeddings[id]
+            if include_embedding:
+                result["embedding"] = self._row_vector(self._id_to_row[id]).tolist()
             results.append(result)
             
             if limit and len(results) >= limit:
@@ -150,32 +730,21 @@ class VectorStorePlaceholder(VectorStoreInterface):
         if not filter_metadata:
             return len(self.storage)
         
-        count = 0
-        for item in self.storage.values():
-            metadata = item.get("metadata", {})
-            if self._match_filter(metadata, filter_metadata):
-                count += 1
-        return count
+        return int(np.count_nonzero(self._filter_mask(filter_metadata)))
     
     def clear(self) -> bool:
         """清空所有向量"""
         self.storage.clear()
-        self.embeddings.clear()
-        return True
-    
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """计算余弦相似度"""
-        vec1 = np.array(vec1)
-        vec2 = np.array(vec2)
-        
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
+        self._reset_matrix()
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        return dot_product / (norm1 * norm2)
+        collection_dir = self._collection_dir()
+        if collection_dir:
+            for name in (self._MATRIX_FILE, self._NORMS_FILE, self._SCALES_FILE):
+                path = os.path.join(collection_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            self.persist()
+        return True
     
     def _match_filter(self, metadata: Dict[str, Any], filter_metadata: Dict[str, Any]) -> bool:
         """检查元数据是否匹配过滤条件"""
@@ -185,4 +754,3 @@ class VectorStorePlaceholder(VectorStoreInterface):
             if metadata[key] != value:
                 return False
         return True
-
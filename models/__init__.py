@@ -1,8 +1,8 @@
 """模型模块：包含LLM和Embedding模型"""
 # 处理相对导入问题
 try:
-    from .llm import LLM
-    from .model import EmbeddingModel
+    from .llm import LLM, get_llm
+    from .model import EmbeddingModel, get_embedding_model
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -11,7 +11,7 @@ except (ImportError, ValueError):
     project_root = current_file.parent.parent
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
-    from models.llm import LLM
-    from models.model import EmbeddingModel
+    from models.llm import LLM, get_llm
+    from models.model import EmbeddingModel, get_embedding_model
 
-__all__ = ['LLM', 'EmbeddingModel']
+__all__ = ['LLM', 'EmbeddingModel', 'get_llm', 'get_embedding_model']
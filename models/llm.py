@@ -1,30 +1,64 @@
 """LLM模块，使用OpenAI接口连接到DashScope兼容端点"""
 import os
-from typing import List, Dict, Any, Optional
+import io
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import weakref
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Iterable, AsyncIterator, Tuple
 
 # 处理不同版本的openai包
 try:
     # 尝试新版本 (>=1.0.0)
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     from openai import APITimeoutError, APIError
+    from openai import (
+        BadRequestError,
+        AuthenticationError,
+        PermissionDeniedError,
+        NotFoundError,
+        UnprocessableEntityError
+    )
+    # 4xx错误（请求参数、鉴权、模型不存在等）重试也不会成功，不做重试
+    NON_RETRYABLE_ERRORS = (
+        BadRequestError,
+        AuthenticationError,
+        PermissionDeniedError,
+        NotFoundError,
+        UnprocessableEntityError
+    )
+    import httpx
     OPENAI_NEW_VERSION = True
 except ImportError:
     try:
         # 旧版本 (<1.0.0) 使用不同的API
         import openai
         OpenAI = None
+        AsyncOpenAI = None
         OPENAI_NEW_VERSION = False
         # 旧版本使用 openai.ChatCompletion 等
         APITimeoutError = Exception
         APIError = openai.OpenAIError if hasattr(openai, 'OpenAIError') else Exception
+        NON_RETRYABLE_ERRORS = ()
     except ImportError:
         raise ImportError("需要安装 openai 包")
 
+# tiktoken（可选）：用于发送前估算输入token数
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
 # 处理相对导入问题
 try:
     from ..config.config import Config
     from ..schema import Message
     from ..utils.retry import retry_on_timeout
+    from .llm_cache import SemanticLLMCache, DiskCache, CacheQuery
+    from .model import get_embedding_model
 except (ImportError, ValueError):
     # 如果相对导入失败，使用绝对导入
     import sys
@@ -35,6 +69,8 @@ except (ImportError, ValueError):
         sys.path.insert(0, str(project_root))
     from config.config import Config
     from schema import Message
+    from models.llm_cache import SemanticLLMCache, DiskCache, CacheQuery
+    from models.model import get_embedding_model
     # 使用明确的路径避免与eval/utils.py冲突
     # 使用 importlib 明确导入项目根目录下的 utils.retry
     import importlib.util
@@ -56,6 +92,121 @@ except (ImportError, ValueError):
             retry_on_timeout = utils_retry.retry_on_timeout
 
 
+# 按配置共享的LLM实例：每个实例持有自己的HTTP连接池，复用时不必为每个Agent重新建立TLS连接
+_SHARED_LLMS: Dict[tuple, "LLM"] = {}
+_SHARED_LLMS_LOCK = threading.Lock()
+
+
+def get_llm(config: Optional[Config] = None) -> "LLM":
+    """
+    获取（或创建并缓存）与配置对应的共享LLM实例
+    
+    Args:
+        config: 系统配置
+        
+    Returns:
+        LLM实例（LLM和Embedding配置相同的调用方共享同一实例）
+    """
+    config = config or Config()
+    # 回复缓存会用到Embedding模型，键中同时包含embedding配置
+    key = config.subset_key("llm_", "embedding_")
+    with _SHARED_LLMS_LOCK:
+        llm = _SHARED_LLMS.get(key)
+        if llm is None:
+            llm = LLM(config)
+            _SHARED_LLMS[key] = llm
+        return llm
+
+
+# 进程内共享的同步HTTP客户端：所有LLM实例的OpenAI客户端复用同一个连接池
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def _http_limits(config: Config) -> "httpx.Limits":
+    """连接池大小限制"""
+    return httpx.Limits(
+        max_connections=config.llm_max_connections,
+        max_keepalive_connections=config.llm_max_keepalive_connections
+    )
+
+
+def _shared_http_client(config: Config) -> "httpx.Client":
+    """
+    获取（首次调用时创建）共享的同步HTTP客户端
+    
+    Args:
+        config: 系统配置（只在首次创建时读取连接池大小）
+        
+    Returns:
+        httpx.Client
+    """
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            # 超时在每次请求时单独指定，这里只限定建立连接的时间
+            _HTTP_CLIENT = httpx.Client(
+                limits=_http_limits(config),
+                timeout=httpx.Timeout(config.llm_timeout, connect=10.0)
+            )
+        return _HTTP_CLIENT
+
+
+_TOKEN_ENCODING = None
+_TOKEN_ENCODING_LOCK = threading.Lock()
+
+
+def _get_token_encoding():
+    """获取（首次调用时加载）用于估算token数的编码器，不可用时返回None"""
+    global _TOKEN_ENCODING, TIKTOKEN_AVAILABLE
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    with _TOKEN_ENCODING_LOCK:
+        if _TOKEN_ENCODING is None:
+            try:
+                # cl100k_base与Qwen的分词并不相同，这里只用于发送前的长度估算
+                _TOKEN_ENCODING = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"Warning: Failed to load tiktoken encoding, falling back to character count: {e}")
+                TIKTOKEN_AVAILABLE = False
+                return None
+        return _TOKEN_ENCODING
+
+
+def count_tokens(text: str) -> int:
+    """
+    估算文本的token数（没有tiktoken时按字符数估算，对中文基本准确，对英文偏保守）
+    
+    Args:
+        text: 文本
+        
+    Returns:
+        token数
+    """
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return len(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _trim_middle(text: str, keep: int) -> str:
+    """保留文本首尾共约keep个token，中间部分替换为省略标记"""
+    marker = "\n……（中间内容过长已省略）……\n"
+    encoding = _get_token_encoding()
+    if encoding is None:
+        head = keep // 2
+        return text[:head] + marker + text[len(text) - (keep - head):] if keep > 0 else marker
+    tokens = encoding.encode(text, disallowed_special=())
+    head = keep // 2
+    tail = keep - head
+    return encoding.decode(tokens[:head]) + marker + (encoding.decode(tokens[-tail:]) if tail > 0 else "")
+
+
+def _unsupported_message(msg: Any):
+    """消息类型不受支持时抛出异常"""
+    raise ValueError(f"Unsupported message type: {type(msg)}")
+
+
 class LLM:
     """LLM类，使用OpenAI接口连接到DashScope兼容端点"""
     
@@ -76,7 +227,8 @@ class LLM:
         if OPENAI_NEW_VERSION:
             self.client = OpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                http_client=_shared_http_client(self.config)
             )
         else:
             # 旧版本：设置全局配置
@@ -85,11 +237,134 @@ class LLM:
             openai.api_base = self.base_url
             self.client = None
         
+        # 异步客户端（见aclient属性）：异步连接池与事件循环绑定，LLM实例又会被get_llm跨事件循环共享，
+        # 因此按事件循环分别创建；事件循环被回收后对应的客户端随之释放
+        self._aclients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._aclients_lock = threading.Lock()
+        
         self.model = self.config.llm_model
         self.temperature = self.config.llm_temperature
         self.max_tokens = self.config.llm_max_tokens
         self.timeout = self.config.llm_timeout
         self.max_retries = self.config.llm_max_retries
+        self.concurrency = self.config.llm_concurrency
+        self._warmed_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()  # 已预先建立连接的事件循环
+        self.context_window = self.config.llm_context_window
+        
+        # 回复缓存（可选）：低温度请求先按精确哈希匹配，再按最后一条用户消息的语义相似度匹配
+        self.cache: Optional[SemanticLLMCache] = None
+        if self.config.llm_cache_enabled:
+            embedding_model = None
+            try:
+                embedding_model = get_embedding_model(self.config)
+            except Exception as e:
+                print(f"Warning: Failed to create embedding model for LLM cache, using exact match only: {e}")
+            self.cache = SemanticLLMCache(
+                embedding_model,
+                ttl=self.config.llm_cache_ttl,
+                threshold=self.config.llm_cache_threshold,
+                max_entries=self.config.llm_cache_size
+            )
+        
+        # 磁盘缓存（可选）：跨进程复用低温度请求的回复
+        self.disk_cache: Optional[DiskCache] = None
+        if self.config.llm_disk_cache_enabled:
+            self.disk_cache = DiskCache(self.config.llm_disk_cache_dir)
+    
+    @property
+    def aclient(self) -> Optional["AsyncOpenAI"]:
+        """
+        当前事件循环对应的异步客户端（首次在该循环中使用时创建；只能在协程中访问）
+        
+        批量请求时并发发出，避免逐条阻塞在网络延迟上；放宽连接数上限以支撑高并发。
+        
+        Returns:
+            AsyncOpenAI客户端，旧版本openai返回None
+        """
+        if not OPENAI_NEW_VERSION:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._aclients_lock:
+            # 连接池中的连接会引用事件循环，弱引用不一定能释放它们，这里主动丢弃已关闭循环的客户端
+            for closed_loop in [l for l in self._aclients if l.is_closed()]:
+                del self._aclients[closed_loop]
+            aclient = self._aclients.get(loop)
+            if aclient is None:
+                aclient = AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    http_client=httpx.AsyncClient(
+                        limits=_http_limits(self.config),
+                        timeout=httpx.Timeout(self.config.llm_timeout, connect=10.0)
+                    )
+                )
+                self._aclients[loop] = aclient
+            return aclient
+    
+    def _build_chat_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        构建OpenAI格式的消息列表
+        
+        Args:
+            messages: 消息列表（Message对象或OpenAI格式的字典）
+            system_prompt: 系统提示词（可选）
+            
+        Returns:
+            OpenAI格式的消息列表
+        """
+        # 系统提示词 + 对话消息（Message对象直接使用缓存的OpenAI格式字典）
+        return ([{"role": "system", "content": system_prompt}] if system_prompt else []) + [
+            msg.dict_form if isinstance(msg, Message) else msg if isinstance(msg, dict) else _unsupported_message(msg)
+            for msg in messages
+        ]
+    
+    def _fit_context_window(
+        self,
+        chat_messages: List[Dict[str, Any]],
+        max_tokens: int
+    ) -> List[Dict[str, Any]]:
+        """
+        发送前估算输入token数，输入加上max_tokens超出上下文窗口时裁剪最长用户消息的中间部分，
+        避免请求被服务端拒绝后还要经过重试
+        
+        Args:
+            chat_messages: OpenAI格式的消息列表（不会被修改）
+            max_tokens: 本次请求的最大输出token数
+            
+        Returns:
+            可以发送的消息列表（未超出时原样返回）
+        """
+        limit = self.context_window - max_tokens
+        if self.context_window <= 0 or limit <= 0:
+            return chat_messages
+        
+        counts = [
+            count_tokens(msg["content"]) if isinstance(msg.get("content"), str) else 0
+            for msg in chat_messages
+        ]
+        total = sum(counts)
+        if total <= limit:
+            return chat_messages
+        
+        user_indices = [
+            i for i, msg in enumerate(chat_messages)
+            if msg.get("role") == "user" and counts[i] > 0
+        ]
+        if not user_indices:
+            return chat_messages
+        
+        longest = max(user_indices, key=counts.__getitem__)
+        keep = max(0, counts[longest] - (total - limit))
+        print(f"Warning: Prompt too long ({total} + {max_tokens} > {self.context_window} tokens), trimming the longest user message")
+        
+        # 替换为新的字典，不修改调用方（或Message缓存）中的消息
+        trimmed = list(chat_messages)
+        trimmed[longest] = {**chat_messages[longest], "content": _trim_middle(chat_messages[longest]["content"], keep)}
+        return trimmed
     
     def chat(
         self,
@@ -97,7 +372,9 @@ class LLM:
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
-        stream: bool = False
+        stream: bool = False,
+        on_token: Optional[Callable[[str], None]] = None,
+        stop_predicate: Optional[Callable[[str], bool]] = None
     ) -> str:
         """
         进行对话
@@ -108,32 +385,28 @@ class LLM:
             temperature: 温度参数（可选）
             max_tokens: 最大token数（可选）
             stream: 是否流式输出（可选）
+            on_token: 流式输出时每收到一段内容的回调（可选）
+            stop_predicate: 流式输出时的提前终止条件，参数为已收到的全部内容，返回True时停止生成（可选）
             
         Returns:
             LLM回复内容
         """
+        # 显式传入的temperature=0.0也要生效，不能用or回退到默认值
+        temperature = self.temperature if temperature is None else temperature
+        
         # 构建消息列表
-        chat_messages = []
-        
-        # 添加系统提示词
-        if system_prompt:
-            chat_messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
-        
-        # 添加对话消息
-        for msg in messages:
-            if isinstance(msg, Message):
-                # 转换为OpenAI格式
-                chat_messages.append(msg.to_dict())
-            elif isinstance(msg, dict):
-                chat_messages.append(msg)
-            else:
-                raise ValueError(f"Unsupported message type: {type(msg)}")
+        chat_messages = self._fit_context_window(
+            self._build_chat_messages(messages, system_prompt),
+            max_tokens or self.max_tokens
+        )
+        
+        # 先查询回复缓存（内存缓存，然后是磁盘缓存），命中时不再调用API
+        answer, cache_query, disk_key = self._lookup_cache(chat_messages, temperature)
+        if answer is not None:
+            return answer
         
         # 调用OpenAI API（连接到DashScope兼容端点），带重试机制
-        @retry_on_timeout(max_retries=self.max_retries, timeout=self.timeout)
+        @retry_on_timeout(max_retries=self.max_retries, timeout=self.timeout, non_retryable=NON_RETRYABLE_ERRORS)
         def _call_api():
             if OPENAI_NEW_VERSION:
                 # 新版本API
@@ -142,25 +415,26 @@ class LLM:
                     response = self.client.chat.completions.create(
                         model=self.model,
                         messages=chat_messages,
-                        temperature=temperature or self.temperature,
+                        temperature=temperature,
                         max_tokens=max_tokens or self.max_tokens,
                         stream=True,
                         timeout=self.timeout
                     )
                     
-                    # 收集流式输出
-                    content = ""
-                    for chunk in response:
-                        if chunk.choices[0].delta.content:
-                            content += chunk.choices[0].delta.content
-                    
+                    # 收集流式输出（满足终止条件时关闭连接，不再接收剩余内容）
+                    content = self._collect_stream(
+                        (chunk.choices[0].delta.content for chunk in response if chunk.choices),
+                        on_token,
+                        stop_predicate
+                    )
+                    response.close()
                     return content
                 else:
                     # 非流式输出
                     response = self.client.chat.completions.create(
                         model=self.model,
                         messages=chat_messages,
-                        temperature=temperature or self.temperature,
+                        temperature=temperature,
                         max_tokens=max_tokens or self.max_tokens,
                         timeout=self.timeout
                     )
@@ -175,24 +449,23 @@ class LLM:
                     response = openai.ChatCompletion.create(
                         model=self.model,
                         messages=chat_messages,
-                        temperature=temperature or self.temperature,
+                        temperature=temperature,
                         max_tokens=max_tokens or self.max_tokens,
                         stream=True
                     )
                     
                     # 收集流式输出
-                    content = ""
-                    for chunk in response:
-                        if chunk.choices[0].delta.get('content'):
-                            content += chunk.choices[0].delta['content']
-                    
-                    return content
+                    return self._collect_stream(
+                        (chunk.choices[0].delta.get('content') for chunk in response),
+                        on_token,
+                        stop_predicate
+                    )
                 else:
                     # 非流式输出
                     response = openai.ChatCompletion.create(
                         model=self.model,
                         messages=chat_messages,
-                        temperature=temperature or self.temperature,
+                        temperature=temperature,
                         max_tokens=max_tokens or self.max_tokens
                     )
                     
@@ -200,13 +473,425 @@ class LLM:
                     return response.choices[0].message.content
         
         try:
-            return _call_api()
+            content = _call_api()
         except (APITimeoutError, TimeoutError) as e:
             raise TimeoutError(f"LLM API调用超时（{self.timeout}秒）: {str(e)}")
         except APIError as e:
             raise RuntimeError(f"LLM API调用失败: {str(e)}")
         except Exception as e:
             raise RuntimeError(f"LLM调用出错: {str(e)}")
+        
+        # 提前终止的回复只是前缀，不写入缓存
+        if stop_predicate is None:
+            self._store_cache(cache_query, disk_key, content)
+        return content
+    
+    def _lookup_cache(
+        self,
+        chat_messages: List[Dict[str, Any]],
+        temperature: float
+    ) -> Tuple[Optional[str], Optional[CacheQuery], Optional[str]]:
+        """
+        查询回复缓存（先查内存缓存，再查磁盘缓存）
+        
+        Args:
+            chat_messages: 最终发送的OpenAI格式消息列表
+            temperature: 实际使用的温度
+            
+        Returns:
+            (命中的回复或None, 内存缓存查询对象, 磁盘缓存键)；未启用或不可缓存时后两项为None
+        """
+        cache_query = None
+        if self.cache is not None and self.cache.cacheable(temperature):
+            cache_query = self.cache.lookup(self.model, chat_messages, temperature)
+            if cache_query.answer is not None:
+                return cache_query.answer, cache_query, None
+        disk_key = None
+        if self.disk_cache is not None and self.disk_cache.cacheable(temperature):
+            disk_key = DiskCache.make_key(self.model, chat_messages, temperature)
+            answer = self.disk_cache.get(disk_key)
+            if answer is not None:
+                if cache_query is not None:
+                    self.cache.store(cache_query, answer)
+                return answer, cache_query, disk_key
+        return None, cache_query, disk_key
+    
+    def _store_cache(self, cache_query: Optional[CacheQuery], disk_key: Optional[str], content: Optional[str]):
+        """
+        把完整回复写入回复缓存（参数来自_lookup_cache）
+        
+        Args:
+            cache_query: 内存缓存查询对象
+            disk_key: 磁盘缓存键
+            content: LLM回复内容（为空时不写入）
+        """
+        if not content:
+            return
+        if cache_query is not None:
+            self.cache.store(cache_query, content)
+        if disk_key is not None:
+            self.disk_cache.put(disk_key, content)
+    
+    @property
+    def _cache_enabled(self) -> bool:
+        """是否启用了任一回复缓存"""
+        return self.cache is not None or self.disk_cache is not None
+    
+    @staticmethod
+    def _collect_stream(
+        deltas: Iterable[Optional[str]],
+        on_token: Optional[Callable[[str], None]] = None,
+        stop_predicate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """
+        收集流式输出的内容片段
+        
+        Args:
+            deltas: 内容片段迭代器（空片段会被跳过）
+            on_token: 每收到一段内容的回调（可选）
+            stop_predicate: 提前终止条件（可选）
+            
+        Returns:
+            拼接后的完整内容
+        """
+        # 片段先放入列表，最后一次join，避免逐段字符串拼接的重复拷贝
+        parts: List[str] = []
+        for delta in deltas:
+            if not delta:
+                continue
+            parts.append(delta)
+            if on_token:
+                on_token(delta)
+            if stop_predicate and stop_predicate("".join(parts)):
+                break
+        return "".join(parts)
+    
+    async def _acall_with_retry(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        带指数退避重试地执行异步API调用（与retry_on_timeout的重试参数一致）
+        
+        Args:
+            call: 返回协程的无参函数（每次重试重新创建协程）
+            
+        Returns:
+            API调用结果
+        """
+        delay = 2.0
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call()
+            except Exception as e:
+                if attempt >= self.max_retries or isinstance(e, NON_RETRYABLE_ERRORS):
+                    raise
+                await asyncio.sleep(delay)
+                delay *= 1.5
+    
+    async def achat(
+        self,
+        messages: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        异步进行对话（使用AsyncOpenAI，不阻塞事件循环）
+        
+        Args:
+            messages: 消息列表（OpenAI格式）
+            system_prompt: 系统提示词（可选）
+            temperature: 温度参数（可选）
+            max_tokens: 最大token数（可选）
+            
+        Returns:
+            LLM回复内容
+        """
+        if self.aclient is None:
+            # 旧版本openai没有异步客户端，在线程池中执行同步调用
+            return await asyncio.to_thread(
+                self.chat,
+                messages,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        
+        temperature = self.temperature if temperature is None else temperature
+        chat_messages = self._fit_context_window(
+            self._build_chat_messages(messages, system_prompt),
+            max_tokens or self.max_tokens
+        )
+        
+        # 查询回复缓存（语义缓存需要计算embedding，磁盘缓存读文件，都放到线程池执行）
+        cache_query, disk_key = None, None
+        if self._cache_enabled:
+            answer, cache_query, disk_key = await asyncio.to_thread(self._lookup_cache, chat_messages, temperature)
+            if answer is not None:
+                return answer
+        
+        async def _acall_api():
+            response = await self.aclient.chat.completions.create(
+                model=self.model,
+                messages=chat_messages,
+                temperature=temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                timeout=self.timeout
+            )
+            return response.choices[0].message.content
+        
+        try:
+            content = await self._acall_with_retry(_acall_api)
+        except (APITimeoutError, TimeoutError, asyncio.TimeoutError) as e:
+            raise TimeoutError(f"LLM API调用超时（{self.timeout}秒）: {str(e)}")
+        except APIError as e:
+            raise RuntimeError(f"LLM API调用失败: {str(e)}")
+        except Exception as e:
+            raise RuntimeError(f"LLM调用出错: {str(e)}")
+        
+        if cache_query is not None or disk_key is not None:
+            await asyncio.to_thread(self._store_cache, cache_query, disk_key, content)
+        return content
+    
+    async def achat_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        异步流式对话：边生成边返回内容片段，调用方可以在生成完成前开始显示或处理
+        
+        只有建立流式请求的阶段会重试，开始接收内容后出错直接抛出（已返回的片段无法撤回）。
+        
+        Args:
+            messages: 消息列表（OpenAI格式）
+            system_prompt: 系统提示词（可选）
+            temperature: 温度参数（可选）
+            max_tokens: 最大token数（可选）
+            
+        Yields:
+            内容片段（需要完整回复时由调用方"".join）
+        """
+        if self.aclient is None:
+            # 旧版本openai没有异步客户端，退化为一次返回完整回复
+            yield await self.achat(
+                messages,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            return
+        
+        temperature = self.temperature if temperature is None else temperature
+        chat_messages = self._fit_context_window(
+            self._build_chat_messages(messages, system_prompt),
+            max_tokens or self.max_tokens
+        )
+        
+        # 缓存命中时一次返回完整回复
+        cache_query, disk_key = None, None
+        if self._cache_enabled:
+            answer, cache_query, disk_key = await asyncio.to_thread(self._lookup_cache, chat_messages, temperature)
+            if answer is not None:
+                yield answer
+                return
+        
+        async def _acall_api():
+            return await self.aclient.chat.completions.create(
+                model=self.model,
+                messages=chat_messages,
+                temperature=temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                stream=True,
+                timeout=self.timeout
+            )
+        
+        try:
+            response = await self._acall_with_retry(_acall_api)
+            parts: List[str] = []
+            try:
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                # 完整接收后才写入缓存（调用方提前停止时不会执行到这里）
+                if cache_query is not None or disk_key is not None:
+                    await asyncio.to_thread(self._store_cache, cache_query, disk_key, "".join(parts))
+            finally:
+                # 调用方提前停止迭代时关闭连接，不再接收剩余内容
+                await response.close()
+        except (APITimeoutError, TimeoutError, asyncio.TimeoutError) as e:
+            raise TimeoutError(f"LLM API调用超时（{self.timeout}秒）: {str(e)}")
+        except APIError as e:
+            raise RuntimeError(f"LLM API调用失败: {str(e)}")
+    
+    async def awarmup(self):
+        """
+        预先建立异步客户端到API端点的连接（TLS握手等），可与检索等准备工作并发执行，
+        之后的achat直接复用已建立的连接；失败时不影响后续调用
+        """
+        aclient = self.aclient
+        loop = asyncio.get_running_loop()
+        if aclient is None or loop in self._warmed_loops:
+            return
+        self._warmed_loops.add(loop)
+        try:
+            await aclient.models.list(timeout=self.timeout)
+        except Exception as e:
+            print(f"Warning: LLM warmup failed: {e}")
+    
+    async def abatch_chat(
+        self,
+        list_of_messages: List[List[Dict[str, Any]]],
+        **kwargs
+    ) -> List[str]:
+        """
+        异步并发进行多组对话（并发数受llm_concurrency限制，避免触发限流）
+        
+        内容完全相同的消息列表只请求一次，结果按原顺序分发回每个位置。
+        
+        Args:
+            list_of_messages: 多组消息列表
+            **kwargs: 传给achat的其他参数（system_prompt、temperature等）
+            
+        Returns:
+            与输入顺序一致的回复列表
+        """
+        # 按内容哈希去重（其他参数对整批相同，只需比较消息）
+        keys = [
+            hashlib.sha256(json.dumps(
+                [msg.dict_form if isinstance(msg, Message) else msg for msg in messages],
+                sort_keys=True,
+                ensure_ascii=False,
+                default=str
+            ).encode("utf-8")).digest()
+            for messages in list_of_messages
+        ]
+        unique: Dict[bytes, List[Dict[str, Any]]] = {}
+        for key, messages in zip(keys, list_of_messages):
+            unique.setdefault(key, messages)
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def _limited(messages):
+            async with semaphore:
+                return await self.achat(messages, **kwargs)
+        
+        results = await asyncio.gather(*(_limited(messages) for messages in unique.values()))
+        answers = dict(zip(unique.keys(), results))
+        return [answers[key] for key in keys]
+    
+    def batch_chat(
+        self,
+        list_of_messages: List[List[Dict[str, Any]]],
+        **kwargs
+    ) -> List[str]:
+        """
+        同步接口：并发进行多组对话（不能在已运行的事件循环中调用，此时请使用abatch_chat）
+        
+        Args:
+            list_of_messages: 多组消息列表
+            **kwargs: 传给achat的其他参数（system_prompt、temperature等）
+            
+        Returns:
+            与输入顺序一致的回复列表
+        """
+        return asyncio.run(self.abatch_chat(list_of_messages, **kwargs))
+    
+    def submit_batch(
+        self,
+        list_of_messages: List[List[Dict[str, Any]]],
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        通过Batch API提交一批离线对话请求（费用约为实时调用的一半，24小时内完成）
+        
+        适用于评测、数据处理等不要求实时返回的批量任务，结果通过wait_batch获取。
+        
+        Args:
+            list_of_messages: 多组消息列表
+            system_prompt: 系统提示词（可选）
+            temperature: 温度参数（可选）
+            max_tokens: 最大token数（可选）
+            
+        Returns:
+            批任务ID
+        """
+        if not OPENAI_NEW_VERSION:
+            raise RuntimeError("Batch API需要openai>=1.0.0")
+        
+        # 每组消息写为一行JSONL请求，custom_id为输入下标
+        buffer = io.BytesIO()
+        for i, messages in enumerate(list_of_messages):
+            request = {
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": self._build_chat_messages(messages, system_prompt),
+                    "temperature": self.temperature if temperature is None else temperature,
+                    "max_tokens": max_tokens or self.max_tokens
+                }
+            }
+            buffer.write(json.dumps(request, ensure_ascii=False).encode("utf-8"))
+            buffer.write(b"\n")
+        buffer.seek(0)
+        
+        try:
+            input_file = self.client.files.create(file=("batch_input.jsonl", buffer), purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except APIError as e:
+            raise RuntimeError(f"提交Batch任务失败: {str(e)}")
+        return batch.id
+    
+    def wait_batch(self, batch_id: str, poll_interval: float = 30.0) -> List[str]:
+        """
+        等待Batch任务完成并取回结果
+        
+        Args:
+            batch_id: submit_batch返回的批任务ID
+            poll_interval: 轮询间隔（秒）
+            
+        Returns:
+            与提交顺序一致的回复列表（失败的请求为空字符串）
+        """
+        if not OPENAI_NEW_VERSION:
+            raise RuntimeError("Batch API需要openai>=1.0.0")
+        
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch任务未完成: {batch_id} ({batch.status})")
+            time.sleep(poll_interval)
+        
+        total = batch.request_counts.total if batch.request_counts else 0
+        results = [""] * total
+        if not batch.output_file_id:
+            return results
+        
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            index = int(record["custom_id"])
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                print(f"Warning: Batch request {index} failed: {record.get('error') or response}")
+                continue
+            if index >= len(results):
+                results.extend([""] * (index + 1 - len(results)))
+            results[index] = response["body"]["choices"][0]["message"]["content"] or ""
+        return results
     
     def chat_with_tools(
         self,
@@ -232,29 +917,16 @@ class LLM:
             包含content和tool_calls的字典
         """
         # 构建消息列表
-        chat_messages = []
-        
-        # 添加系统提示词
-        if system_prompt:
-            chat_messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
-        
-        # 添加对话消息
-        for msg in messages:
-            if isinstance(msg, Message):
-                chat_messages.append(msg.to_dict())
-            elif isinstance(msg, dict):
-                chat_messages.append(msg)
-            else:
-                raise ValueError(f"Unsupported message type: {type(msg)}")
+        chat_messages = self._fit_context_window(
+            self._build_chat_messages(messages, system_prompt),
+            max_tokens or self.max_tokens
+        )
         
         # 构建请求参数
         request_params = {
             "model": self.model,
             "messages": chat_messages,
-            "temperature": temperature or self.temperature,
+            "temperature": self.temperature if temperature is None else temperature,
             "max_tokens": max_tokens or self.max_tokens
         }
         
@@ -266,7 +938,7 @@ class LLM:
             request_params["tool_choice"] = tool_choice
         
         # 调用OpenAI API（连接到DashScope兼容端点），带重试机制
-        @retry_on_timeout(max_retries=self.max_retries, timeout=self.timeout)
+        @retry_on_timeout(max_retries=self.max_retries, timeout=self.timeout, non_retryable=NON_RETRYABLE_ERRORS)
         def _call_api():
             if OPENAI_NEW_VERSION:
                 return self.client.chat.completions.create(
@@ -0,0 +1,245 @@
+"""LLM回复缓存：精确匹配 + 语义相似度匹配，以及跨进程复用的磁盘缓存"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+
+@dataclass
+class CacheQuery:
+    """一次缓存查询的中间结果（未命中时传回store，避免重复计算哈希和embedding）"""
+    exact_key: str
+    scope_key: str
+    embedding: Optional[np.ndarray] = None
+    answer: Optional[str] = None
+
+
+class SemanticLLMCache:
+    """
+    两级LLM回复缓存
+    
+    第一级按(model, messages, temperature)的SHA256精确匹配；未命中时第二级对最后一条
+    用户消息做embedding，在上下文完全相同（系统提示词和历史消息相同）的缓存条目中
+    查找余弦相似度不低于threshold的回复。只缓存低温度（确定性较强）的请求。
+    """
+    
+    def __init__(
+        self,
+        embedding_model=None,
+        ttl: float = 3600.0,
+        threshold: float = 0.95,
+        max_entries: int = 1024,
+        max_temperature: float = 0.3
+    ):
+        """
+        初始化缓存
+        
+        Args:
+            embedding_model: 用于语义匹配的EmbeddingModel（为None时只做精确匹配）
+            ttl: 缓存有效期（秒）
+            threshold: 语义命中的最低余弦相似度
+            max_entries: 最大缓存条目数（超出后淘汰最久未使用的条目）
+            max_temperature: 可缓存请求的最高温度
+        """
+        self.embedding_model = embedding_model
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+        # 精确匹配：exact_key -> (answer, 过期时间)
+        self._exact: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # 语义匹配：归一化向量矩阵及与行对齐的上下文键、回复和过期时间
+        self._vectors: Optional[np.ndarray] = None
+        self._scope_keys: List[str] = []
+        self._answers: List[str] = []
+        self._expires: List[float] = []
+    
+    @staticmethod
+    def _hash(payload: Any) -> str:
+        """对可JSON序列化的数据计算SHA256"""
+        data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+    
+    def cacheable(self, temperature: float) -> bool:
+        """该温度下的请求是否可以缓存"""
+        return temperature <= self.max_temperature
+    
+    def lookup(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float
+    ) -> CacheQuery:
+        """
+        查询缓存
+        
+        Args:
+            model: 模型名称
+            messages: OpenAI格式的消息列表
+            temperature: 温度
+        
+        Returns:
+            查询结果，命中时answer不为None
+        """
+        query = CacheQuery(
+            exact_key=self._hash([model, messages, temperature]),
+            scope_key=self._hash([model, messages[:-1], temperature])
+        )
+        now = time.time()
+        
+        with self._lock:
+            entry = self._exact.get(query.exact_key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._exact.move_to_end(query.exact_key)
+                    query.answer = entry[0]
+                    return query
+                del self._exact[query.exact_key]
+        
+        # 语义匹配只针对最后一条用户消息
+        if self.embedding_model is None or not messages or messages[-1].get("role") != "user":
+            return query
+        try:
+            embedding = np.asarray(self.embedding_model.encode(str(messages[-1].get("content", ""))), dtype=np.float32)
+        except Exception as e:
+            print(f"Warning: Failed to encode prompt for LLM cache: {e}")
+            return query
+        norm = np.linalg.norm(embedding)
+        query.embedding = embedding / norm if norm > 0 else embedding
+        
+        with self._lock:
+            if self._vectors is None or not self._scope_keys:
+                return query
+            scores = self._vectors @ query.embedding
+            valid = (np.array(self._scope_keys) == query.scope_key) & (np.array(self._expires) > now)
+            scores[~valid] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                query.answer = self._answers[best]
+        return query
+    
+    def store(self, query: CacheQuery, answer: str):
+        """
+        写入缓存
+        
+        Args:
+            query: lookup返回的查询结果
+            answer: LLM回复
+        """
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._exact[query.exact_key] = (answer, expires)
+            self._exact.move_to_end(query.exact_key)
+            if len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+            
+            if query.embedding is None:
+                return
+            row = query.embedding.reshape(1, -1)
+            self._vectors = row if self._vectors is None else np.vstack((self._vectors, row))
+            self._scope_keys.append(query.scope_key)
+            self._answers.append(answer)
+            self._expires.append(expires)
+            # 超出容量时淘汰最早写入的语义条目
+            overflow = len(self._answers) - self.max_entries
+            if overflow > 0:
+                self._vectors = self._vectors[overflow:]
+                del self._scope_keys[:overflow]
+                del self._answers[:overflow]
+                del self._expires[:overflow]
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._exact.clear()
+            self._vectors = None
+            self._scope_keys = []
+            self._answers = []
+            self._expires = []
+
+
+class DiskCache:
+    """
+    LLM回复的磁盘缓存
+    
+    以blake2b(model, messages, temperature)为键，每条回复存为一个JSON文件
+    （root/键前两位/键），开发调试和重复评测时相同请求直接读取，不再调用API。
+    """
+    
+    def __init__(self, root: str = "~/.cache/law_agent/llm", max_temperature: float = 0.3):
+        """
+        初始化磁盘缓存
+        
+        Args:
+            root: 缓存根目录
+            max_temperature: 可缓存请求的最高温度
+        """
+        self.root = Path(os.path.expanduser(root))
+        self.max_temperature = max_temperature
+    
+    def cacheable(self, temperature: float) -> bool:
+        """该温度下的请求是否可以缓存"""
+        return temperature <= self.max_temperature
+    
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, Any]], temperature: float) -> str:
+        """计算请求的缓存键"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.blake2b(payload.encode("utf-8")).hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        """缓存文件路径（按键的前两位分目录，避免单个目录下文件过多）"""
+        return self.root / key[:2] / key
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存的回复
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            缓存的回复，不存在或读取失败时返回None
+        """
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["answer"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Failed to read LLM disk cache entry {key}: {e}")
+            return None
+    
+    def put(self, key: str, answer: str):
+        """
+        写入回复（先写临时文件再原子替换，并发写入或中途退出不会留下不完整的文件）
+        
+        Args:
+            key: 缓存键
+            answer: LLM回复
+        """
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"answer": answer}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Warning: Failed to write LLM disk cache entry {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
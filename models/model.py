@@ -1,14 +1,14 @@
-"""Embedding模型，使用DashScope接口"""
+"""Embedding模型，使用DashScope接口（直接调用HTTP API）"""
 import os
 import time
-from typing import List, Union
-try:
-    import dashscope
-except ImportError:
-    # dashscope未安装时，设置为None，后续会使用fallback
-    dashscope = None
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Union
+import numpy as np
 from http import HTTPStatus
 import requests
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel
 # 处理相对导入问题
 try:
     from ..config.config import Config
@@ -23,9 +23,73 @@ except (ImportError, ValueError):
     from config.config import Config
 
 
+# 这些HTTP状态码表示请求本身有问题（参数错误、鉴权失败等），重试也不会成功
+_NON_RETRYABLE_STATUS = (
+    HTTPStatus.BAD_REQUEST,
+    HTTPStatus.UNAUTHORIZED,
+    HTTPStatus.FORBIDDEN,
+    HTTPStatus.NOT_FOUND,
+)
+
+
+# 按配置共享的EmbeddingModel实例
+_SHARED_MODELS: Dict[tuple, "EmbeddingModel"] = {}
+_SHARED_MODELS_LOCK = threading.Lock()
+
+
+def get_embedding_model(config: Config) -> "EmbeddingModel":
+    """
+    获取（或创建并缓存）与配置对应的共享EmbeddingModel实例
+    
+    Args:
+        config: 系统配置
+        
+    Returns:
+        EmbeddingModel实例
+    """
+    # embedding_api_key为空时会回退到llm_api_key，键中需要包含它
+    key = config.subset_key("embedding_", "llm_api_key")
+    with _SHARED_MODELS_LOCK:
+        model = _SHARED_MODELS.get(key)
+        if model is None:
+            model = EmbeddingModel(config)
+            _SHARED_MODELS[key] = model
+        return model
+
+
+class _EmbeddingItem(BaseModel):
+    """DashScope返回的单条向量"""
+    text_index: int
+    embedding: List[float]
+
+
+class _EmbeddingOutput(BaseModel):
+    embeddings: List[_EmbeddingItem]
+
+
+class _EmbeddingResponse(BaseModel):
+    """DashScope文本向量接口的响应（只声明用到的字段，其余字段忽略）"""
+    output: _EmbeddingOutput
+
+
 class EmbeddingModel:
     """Embedding模型，用于将文本转换为向量（使用DashScope API）"""
     
+    # DashScope文本向量HTTP接口
+    _API_URL = "https://dashscope.aliyuncs.com/api/v1/services/embeddings/text-embedding/text-embedding"
+    
+    # 所有实例共享的HTTP会话：复用连接池（分批并发编码时每个线程可以复用已建立的TLS连接），
+    # 重试由_encode_batch自己控制
+    _SESSION = requests.Session()
+    _SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0))
+    
+    # DashScope单次请求的最大文本数（text-embedding-v3/v4为10条，更早的模型为25条）
+    _MAX_BATCH_SIZE = 25
+    _MODEL_BATCH_SIZES = {
+        "text-embedding-v3": 10,
+        "text-embedding-v4": 10,
+    }
+    
     def __init__(self, config: Config):
         """
         初始化Embedding模型
@@ -39,10 +103,6 @@ class EmbeddingModel:
         self.timeout = config.embedding_timeout
         self.max_retries = config.embedding_max_retries
         
-        # 检查dashscope是否可用
-        if dashscope is None:
-            raise ImportError("dashscope module is not installed. Please install it with: pip install dashscope")
-        
         # 初始化DashScope API Key
         # 优先使用embedding_api_key，如果没有则使用llm_api_key（因为它们通常是同一个key）
         api_key = (
@@ -52,11 +112,21 @@ class EmbeddingModel:
             os.getenv("OPENAI_API_KEY")
         )
         if api_key:
-            dashscope.api_key = api_key
+            self.api_key = api_key
         else:
             raise ValueError("DashScope API key is required. Set embedding_api_key/llm_api_key in config or DASHSCOPE_API_KEY/OPENAI_API_KEY environment variable.")
+        
+        # 分批并发请求使用的线程池（实例共享，线程在首次提交任务时才创建）
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, config.embedding_concurrency),
+            thread_name_prefix="embedding"
+        )
+    
+    def close(self):
+        """关闭分批请求使用的线程池"""
+        self._executor.shutdown(wait=False)
     
-    def encode(self, texts: Union[str, List[str]]) -> Union[List[float], List[List[float]]]:
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
         """
         将文本编码为向量（使用DashScope embedding API）
         
@@ -64,7 +134,7 @@ class EmbeddingModel:
             texts: 单个文本或文本列表
             
         Returns:
-            单个向量或向量列表
+            单个文本返回形状为(dim,)的float32向量，文本列表返回形状为(n, dim)的float32矩阵
         """
         # 确保texts是列表格式
         if isinstance(texts, str):
@@ -73,74 +143,82 @@ class EmbeddingModel:
         else:
             single_text = False
         
+        # 按模型的单次请求上限分批，多批时并发调用API（网络延迟为主，线程并发即可）
+        batch_size = self._batch_size()
+        if len(texts) <= batch_size:
+            embedding_matrix = self._encode_batch(texts)
+        else:
+            starts = range(0, len(texts), batch_size)
+            batches = [texts[i:i + batch_size] for i in starts]
+            embedding_matrix = None
+            # executor.map按输入顺序返回结果，逐批写入预先分配的结果矩阵（不再拼接复制）
+            for start, batch_matrix in zip(starts, self._executor.map(self._encode_batch, batches)):
+                if embedding_matrix is None:
+                    embedding_matrix = np.empty((len(texts), batch_matrix.shape[1]), dtype=np.float32)
+                embedding_matrix[start:start + len(batch_matrix)] = batch_matrix
+        
+        # 如果输入是单个文本，返回单个向量
+        if single_text:
+            return embedding_matrix[0]
+        return embedding_matrix
+    
+    def _batch_size(self) -> int:
+        """当前模型单次请求允许的最大文本数"""
+        return self._MODEL_BATCH_SIZES.get(self.model_name, self._MAX_BATCH_SIZE)
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        调用一次DashScope embedding API编码一批文本（带重试）
+        
+        Args:
+            texts: 文本列表（不超过模型的单次请求上限）
+            
+        Returns:
+            形状为(n, dim)的float32矩阵
+        """
         # 调用DashScope embedding API，带重试机制
         last_exception = None
         delay = 1.0
         
         for attempt in range(self.max_retries + 1):
             try:
-                # 设置超时（DashScope SDK可能不支持timeout参数，这里通过重试机制实现）
-                start_time = time.time()
-                
-                # 尝试设置requests的超时（如果DashScope内部使用requests）
-                # 注意：DashScope SDK可能不支持直接传递timeout，这里通过监控时间实现
-                if dashscope is None:
-                    raise ImportError("dashscope module is not installed")
-                
+                # requests的timeout对连接和读取都生效，超时会直接抛出异常
                 try:
-                    resp = dashscope.TextEmbedding.call(
-                        model=self.model_name,
-                        input=texts
+                    resp = self._SESSION.post(
+                        self._API_URL,
+                        json={
+                            "model": self.model_name,
+                            "input": {"texts": texts}
+                        },
+                        headers={
+                            "Authorization": f"Bearer {self.api_key}",
+                            "Content-Type": "application/json"
+                        },
+                        timeout=self.timeout
                     )
                 except requests.exceptions.Timeout as e:
-                    elapsed_time = time.time() - start_time
-                    raise TimeoutError(f"Embedding API调用超时（{elapsed_time:.2f}秒 > {self.timeout}秒）: {str(e)}")
-                
-                # 检查是否超时
-                elapsed_time = time.time() - start_time
-                if elapsed_time > self.timeout:
-                    raise TimeoutError(f"Embedding API调用超时（{elapsed_time:.2f}秒 > {self.timeout}秒）")
+                    raise TimeoutError(f"Embedding API调用超时（{self.timeout}秒）: {str(e)}")
+                except requests.exceptions.ConnectionError as e:
+                    raise RuntimeError(f"Embedding API连接失败: {str(e)}")
                 
-                # 检查响应状态
+                # 检查响应状态（永久性错误抛出ValueError，不进入重试）
+                if resp.status_code in _NON_RETRYABLE_STATUS:
+                    raise ValueError(f"DashScope API error ({resp.status_code}): {resp.text}")
                 if resp.status_code != HTTPStatus.OK:
-                    raise RuntimeError(f"DashScope API error: {resp.message}")
+                    raise RuntimeError(f"DashScope API error ({resp.status_code}): {resp.text}")
                 
-                # 提取embedding向量
-                embeddings = []
-                if hasattr(resp, 'output') and resp.output:
-                    # DashScope返回格式：resp.output.embeddings 或 resp.output['embeddings']
-                    if hasattr(resp.output, 'embeddings'):
-                        # 对象格式
-                        for item in resp.output.embeddings:
-                            if hasattr(item, 'embedding'):
-                                embeddings.append(item.embedding)
-                            elif isinstance(item, dict) and 'embedding' in item:
-                                embeddings.append(item['embedding'])
-                    elif isinstance(resp.output, dict) and 'embeddings' in resp.output:
-                        # 字典格式
-                        for item in resp.output['embeddings']:
-                            if isinstance(item, dict) and 'embedding' in item:
-                                embeddings.append(item['embedding'])
-                            elif hasattr(item, 'embedding'):
-                                embeddings.append(item.embedding)
-                    elif isinstance(resp.output, list):
-                        # 列表格式
-                        for item in resp.output:
-                            if isinstance(item, dict) and 'embedding' in item:
-                                embeddings.append(item['embedding'])
-                            elif hasattr(item, 'embedding'):
-                                embeddings.append(item.embedding)
-                            elif isinstance(item, list):
-                                embeddings.append(item)
-                
-                if not embeddings:
+                # 用pydantic直接从响应字节解析并校验结构（解析在pydantic-core中完成），
+                # 响应格式不符时抛出ValidationError
+                items = _EmbeddingResponse.model_validate_json(resp.content).output.embeddings
+                if not items:
                     raise RuntimeError("No embeddings returned from DashScope API")
                 
-                # 如果输入是单个文本，返回单个向量
-                if single_text:
-                    return embeddings[0]
-                else:
-                    return embeddings
+                # 一次分配float32矩阵，按text_index（输入顺序）逐行填充，不经过中间的嵌套列表；
+                # 维度取自返回结果（自动检测维度时配置中的embedding_dim为0）
+                embedding_matrix = np.empty((len(items), len(items[0].embedding)), dtype=np.float32)
+                for item in items:
+                    embedding_matrix[item.text_index] = item.embedding
+                return embedding_matrix
             
             except (TimeoutError, RuntimeError) as e:
                 last_exception = e
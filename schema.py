@@ -1,6 +1,9 @@
 """数据模式定义"""
+from collections import deque
+from collections.abc import Sequence
 from enum import Enum
-from typing import List, Optional, Dict, Any, Callable
+from itertools import islice
+from typing import List, Optional, Dict, Any, Callable, Deque
 from dataclasses import dataclass, field
 
 
@@ -59,14 +62,65 @@ class LegalIntent(str, Enum):
     CLARIFICATION = "Clarification"  # 信息不足，需要反问
 
 
-@dataclass
+# 枚举成员到字符串值的映射（用字典查找代替.value属性访问）
+_ENUM_STR: Dict[Enum, str] = {
+    member: member.value
+    for enum_cls in (Role, AgentState, AnswerSource, LegalDomain, LegalIntent)
+    for member in enum_cls
+}
+
+
+def enum_str(value: Any) -> Any:
+    """
+    获取枚举成员的字符串值
+    
+    Args:
+        value: 枚举成员或普通字符串
+        
+    Returns:
+        枚举成员的字符串值（不是本模块中的枚举成员时原样返回）
+    """
+    return _ENUM_STR.get(value, value)
+
+
+def _tool_dict_form(message: "Message") -> Dict[str, Any]:
+    """tool消息的OpenAI格式：需要role="tool"且包含tool_call_id"""
+    return {
+        "role": "tool",
+        "content": message.content,
+        "tool_call_id": message.tool_call_id
+    }
+
+
+def _chat_dict_form(message: "Message", role: str) -> Dict[str, Any]:
+    """其他消息的OpenAI格式（assistant消息可能包含tool_calls）"""
+    result = {
+        "role": role,
+        "content": message.content
+    }
+    if message.tool_calls:
+        result["tool_calls"] = message.tool_calls
+    return result
+
+
+# 按角色分派的序列化函数（未列出的角色使用_chat_dict_form）
+_DICT_FORM_BUILDERS: Dict[str, Callable[["Message"], Dict[str, Any]]] = {
+    "system": lambda message: _chat_dict_form(message, "system"),
+    "user": lambda message: _chat_dict_form(message, "user"),
+    "assistant": lambda message: _chat_dict_form(message, "assistant"),
+    "tool": _tool_dict_form,
+}
+
+
+@dataclass(frozen=True, slots=True)
 class Message:
-    """消息类"""
+    """消息类（不可变，需要修改时用dataclasses.replace创建新消息）"""
     role: ROLE_TYPE
     content: str
     tool_calls: Optional[List[Dict[str, Any]]] = None
     tool_call_id: Optional[str] = None
     name: Optional[str] = None
+    _dict_form: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
     
     @classmethod
     def system_message(cls, content: str) -> "Message":
@@ -88,44 +142,129 @@ class Message:
         """创建工具消息"""
         return cls(role=Role.TOOL, content=content, tool_call_id=tool_call_id, name=name)
     
+    def __hash__(self):
+        # tool_calls是列表，不能参与哈希；只用role和content（相等的消息哈希值一定相同）
+        return hash((self.role, self.content))
+    
+    def invalidate(self):
+        """丢弃缓存的字典形式（原地修改tool_calls中的列表/字典后需要调用）"""
+        object.__setattr__(self, "_dict_form", None)
+    
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典（OpenAI格式）"""
-        role = self.role.value if isinstance(self.role, Role) else self.role
-        
-        # 对于tool消息，OpenAI格式需要role="tool"且包含tool_call_id
-        if role == "tool":
-            result = {
-                "role": "tool",
-                "content": self.content,
-                "tool_call_id": self.tool_call_id
-            }
-        else:
-            result = {
-                "role": role,
-                "content": self.content
-            }
-            # assistant消息可能包含tool_calls
-            if self.tool_calls:
-                result["tool_calls"] = self.tool_calls
-        return result
-
-
-@dataclass
+        """转换为字典（OpenAI格式，返回副本，可以安全修改）"""
+        return dict(self.dict_form)
+    
+    @property
+    def dict_form(self) -> Dict[str, Any]:
+        """OpenAI格式的字典（首次访问时生成并缓存，调用方不应修改）"""
+        if self._dict_form is None:
+            role = _ENUM_STR.get(self.role, self.role)
+            builder = _DICT_FORM_BUILDERS.get(role)
+            # 冻结的dataclass只能通过object.__setattr__写入缓存
+            object.__setattr__(
+                self, "_dict_form",
+                builder(self) if builder is not None else _chat_dict_form(self, role)
+            )
+        return self._dict_form
+
+
+class _RecentView(Sequence):
+    """消息deque末尾N条的只读视图（不复制消息，随记忆变化；需要独立列表时用list(view)）"""
+    
+    __slots__ = ("_messages", "_n")
+    
+    def __init__(self, messages: Deque[Message], n: int):
+        self._messages = messages
+        self._n = max(0, n)
+    
+    def __len__(self) -> int:
+        return min(self._n, len(self._messages))
+    
+    def __iter__(self):
+        return islice(self._messages, len(self._messages) - len(self), None)
+    
+    def __getitem__(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(length))]
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("recent message index out of range")
+        return self._messages[len(self._messages) - length + index]
+    
+    def __repr__(self) -> str:
+        return f"_RecentView({list(self)!r})"
+
+
+@dataclass(slots=True)
 class Memory:
-    """记忆类"""
-    messages: List[Message] = field(default_factory=list)
+    """记忆类（messages为定长deque，超出max_size时自动丢弃最早的消息）"""
+    messages: Deque[Message] = field(default_factory=deque)
     max_size: int = 100
+    summarizer: Optional[Callable[[List[Message]], str]] = None  # 摘要函数（为None时不压缩，只按max_size丢弃）
+    summarize_threshold: int = 40  # 消息数超过该值时把较早的消息压缩为一条摘要
+    keep_recent: int = 20  # 压缩时保留的最近消息数
+    summary: Optional[str] = None  # 最近一次压缩得到的摘要
+    
+    def __post_init__(self):
+        self.messages = deque(self.messages, maxlen=self.max_size)
     
     def add_message(self, message: Message):
         """添加消息"""
         self.messages.append(message)
-        if len(self.messages) > self.max_size:
-            self.messages = self.messages[-self.max_size:]
+        if self.summarizer is not None and len(self.messages) > self.summarize_threshold:
+            self.compact()
+    
+    def compact(self):
+        """
+        把较早的消息压缩为一条系统摘要消息，只保留最近keep_recent条原始消息
+        
+        上一次的摘要消息会和较早的消息一起交给summarizer，从而合并为新的摘要；
+        保留部分不以tool消息开头，避免tool消息与产生它的tool_calls被拆开。
+        摘要失败时保持消息不变。
+        """
+        if self.summarizer is None:
+            return
+        
+        cut = len(self.messages) - self.keep_recent
+        while cut < len(self.messages) and self.messages[cut].role == Role.TOOL:
+            cut += 1
+        if cut <= 0:
+            return
+        
+        old = list(islice(self.messages, cut))
+        try:
+            summary = self.summarizer(old)
+        except Exception as e:
+            print(f"Warning: Failed to summarize memory: {e}")
+            return
+        if not summary:
+            return
+        
+        for _ in range(cut):
+            self.messages.popleft()
+        self.summary = summary
+        self.messages.appendleft(Message.system_message(f"[Previously: {summary}]"))
     
-    def get_recent_messages(self, n: int = 10) -> List[Message]:
-        """获取最近N条消息"""
-        return self.messages[-n:] if len(self.messages) > n else self.messages
+    def get_recent_messages(self, n: int = 10) -> Sequence[Message]:
+        """获取最近N条消息（返回只读视图，不复制消息列表）"""
+        return _RecentView(self.messages, n)
+    
+    def to_openai_messages(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        把消息批量转换为OpenAI格式的字典列表
+        
+        Args:
+            n: 只转换最近N条消息（None表示全部）
+            
+        Returns:
+            字典列表（每个字典都是副本，可以安全修改）
+        """
+        messages = self.messages if n is None else self.get_recent_messages(n)
+        return list(map(Message.to_dict, messages))
     
     def clear(self):
         """清空消息"""
         self.messages.clear()
+        self.summary = None
@@ -1,15 +1,34 @@
 """工具系统模块"""
+import importlib
+
 from .base import BaseTool
-from .web_search import WebSearchTool
-from .common_tools import (
-    PythonExecutorTool,
-    CalculatorTool,
-    FileReadTool,
-    DateTimeTool
-)
-from .realtime_tools import WeatherTool, WebCrawlerTool
-from .tool_manager import ToolManager
-from .tool_registry import ToolRegistry
+
+# 其余工具在首次访问时才导入（PEP 562），避免导入本包时连带加载requests等依赖
+_LAZY_ATTRS = {
+    'WebSearchTool': '.web_search',
+    'PythonExecutorTool': '.common_tools',
+    'CalculatorTool': '.common_tools',
+    'FileReadTool': '.common_tools',
+    'DateTimeTool': '.common_tools',
+    'WeatherTool': '.realtime_tools',
+    'WebCrawlerTool': '.realtime_tools',
+    'ToolManager': '.tool_manager',
+    'ToolRegistry': '.tool_registry',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
+
 
 __all__ = [
     'BaseTool',
@@ -23,4 +42,3 @@ __all__ = [
     'ToolManager',
     'ToolRegistry'
 ]
-
@@ -1,4 +1,5 @@
 """工具基类"""
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, Callable
 
@@ -31,6 +32,19 @@ class BaseTool(ABC):
         """
         pass
     
+    async def aexecute(self, user_input: str, context: Dict[str, Any] = None) -> Any:
+        """
+        异步执行工具（默认在线程池中运行execute，不阻塞事件循环；原生异步的工具可以覆盖此方法）
+        
+        Args:
+            user_input: 用户输入
+            context: 上下文信息（可选）
+            
+        Returns:
+            工具执行结果
+        """
+        return await asyncio.to_thread(self.execute, user_input, context)
+    
     @abstractmethod
     def to_schema(self) -> Dict[str, Any]:
         """
@@ -1,5 +1,6 @@
 """实时信息获取工具"""
 from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from datetime import datetime
 from .base import BaseTool
@@ -208,6 +209,13 @@ class WebCrawlerTool(BaseTool):
         self.config = config
         self.timeout = 10
         self.max_content_length = 50000  # 最大内容长度
+        self.max_urls = 5  # 单次最多爬取的URL数量
+        # 并发爬取使用的线程池（工具实例共享，线程在首次提交任务时才创建）
+        self._executor = ThreadPoolExecutor(max_workers=self.max_urls, thread_name_prefix="crawler")
+    
+    def close(self):
+        """关闭并发爬取使用的线程池"""
+        self._executor.shutdown(wait=False)
     
     def execute(self, user_input: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -235,33 +243,9 @@ class WebCrawlerTool(BaseTool):
                 "contents": []
             }
         
-        results = []
-        for url in urls[:5]:  # 最多处理5个URL
-            try:
-                content = self._crawl_url(url)
-                if content:
-                    results.append({
-                        "url": url,
-                        "content": content,
-                        "length": len(content),
-                        "status": "success"
-                    })
-                else:
-                    results.append({
-                        "url": url,
-                        "content": "",
-                        "length": 0,
-                        "status": "failed",
-                        "error": "Failed to extract content"
-                    })
-            except Exception as e:
-                results.append({
-                    "url": url,
-                    "content": "",
-                    "length": 0,
-                    "status": "error",
-                    "error": str(e)
-                })
+        # 最多处理max_urls个URL；各页面的请求互不依赖，并发爬取（总耗时取决于最慢的页面）
+        # executor.map按输入顺序返回结果
+        results = list(self._executor.map(self._crawl_result, urls[:self.max_urls]))
         
         return {
             "urls": urls,
@@ -270,6 +254,41 @@ class WebCrawlerTool(BaseTool):
             "successful": sum(1 for r in results if r["status"] == "success")
         }
     
+    def _crawl_result(self, url: str) -> Dict[str, Any]:
+        """
+        爬取单个URL并构建结果条目
+        
+        Args:
+            url: 网页URL
+            
+        Returns:
+            包含url, content, length, status（失败时还有error）的字典
+        """
+        try:
+            content = self._crawl_url(url)
+            if content:
+                return {
+                    "url": url,
+                    "content": content,
+                    "length": len(content),
+                    "status": "success"
+                }
+            return {
+                "url": url,
+                "content": "",
+                "length": 0,
+                "status": "failed",
+                "error": "Failed to extract content"
+            }
+        except Exception as e:
+            return {
+                "url": url,
+                "content": "",
+                "length": 0,
+                "status": "error",
+                "error": str(e)
+            }
+    
     def _crawl_url(self, url: str) -> Optional[str]:
         """
         爬取单个URL的内容
@@ -308,10 +327,19 @@ class WebCrawlerTool(BaseTool):
             # 提取文本内容
             text = soup.get_text()
             
-            # 清理文本
+            # 清理文本（生成器惰性产出片段，累计长度超过上限后不再处理页面剩余部分）
             lines = (line.strip() for line in text.splitlines())
             chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
+            parts = []
+            length = -1  # 第一个片段前没有分隔空格
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                parts.append(chunk)
+                length += len(chunk) + 1
+                if length > self.max_content_length:
+                    break
+            text = ' '.join(parts)
             
             # 限制长度
             if len(text) > self.max_content_length:
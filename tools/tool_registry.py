@@ -39,6 +39,9 @@ class ToolRegistry:
         
         # 映射字典：工具名称 -> 真实函数对象（execute方法）
         self.available_functions: Dict[str, Callable] = {}
+        
+        # 工具Schema列表缓存（工具定义在注册后不变，注册新工具时失效）
+        self._tools_schema: Optional[List[Dict[str, Any]]] = None
     
     def register_tool(self, tool: BaseTool):
         """
@@ -52,6 +55,7 @@ class ToolRegistry:
         
         # 建立映射：工具名称 -> execute方法
         self.available_functions[tool_name] = tool.get_execute_function()
+        self._tools_schema = None
     
     def get_tool(self, tool_name: str) -> Optional[BaseTool]:
         """
@@ -95,17 +99,20 @@ class ToolRegistry:
                 ...
             ]
         """
-        tools_schema = []
-        
-        for tool_name, tool in self.tools.items():
-            try:
-                schema = tool.to_schema()
-                tools_schema.append(schema)
-            except Exception as e:
-                print(f"Warning: Failed to generate schema for tool '{tool_name}': {e}")
-                continue
+        if self._tools_schema is None:
+            tools_schema = []
+            
+            for tool_name, tool in self.tools.items():
+                try:
+                    schema = tool.to_schema()
+                    tools_schema.append(schema)
+                except Exception as e:
+                    print(f"Warning: Failed to generate schema for tool '{tool_name}': {e}")
+                    continue
+            
+            self._tools_schema = tools_schema
         
-        return tools_schema
+        return list(self._tools_schema)
     
     def list_tools(self) -> List[str]:
         """
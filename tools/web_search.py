@@ -76,6 +76,9 @@ class WebSearchTool(BaseTool):
         
         # 最大结果数
         self.max_results = getattr(config, 'web_search_max_results', 8)
+        
+        # 格式化结果的字符预算（0表示不限制）
+        self.max_chars = getattr(config, 'web_search_max_chars', 0)
     
     def execute(self, user_input: str, context: Dict[str, Any] = None) -> str:
         """
@@ -92,8 +95,9 @@ class WebSearchTool(BaseTool):
         if not query:
             return "Error: Empty search query"
         
-        # 从context获取max_results，如果没有则使用默认值
+        # 从context获取max_results和max_chars，如果没有则使用默认值
         max_results = context.get("max_results", self.max_results) if context else self.max_results
+        max_chars = context.get("max_chars", self.max_chars) if context else self.max_chars
         
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -127,7 +131,7 @@ class WebSearchTool(BaseTool):
             if not web_pages:
                 return f"No results found for query: {query}"
                 
-            return self._format_results(query, web_pages)
+            return self._format_results(query, web_pages, max_chars)
             
         except requests.exceptions.Timeout:
             return "Error: Search request timeout. Please try again later."
@@ -136,36 +140,63 @@ class WebSearchTool(BaseTool):
         except Exception as e:
             return f"Search failed: {str(e)}"
     
-    def _format_results(self, query: str, results: List[Dict[str, Any]]) -> str:
+    @staticmethod
+    def _format_one(index: int, item: Dict[str, Any]) -> str:
+        """
+        格式化单条搜索结果
+        
+        Args:
+            index: 结果序号（从1开始）
+            item: 搜索结果
+            
+        Returns:
+            格式化的结果字符串
+        """
+        title = item.get("name", "No Title")
+        url = item.get("url", "No URL")
+        # 优先使用 summary (长摘要)，如果没有则使用 snippet (短摘要)
+        content = item.get("summary") or item.get("snippet") or "No content available."
+        
+        # 发布时间 (如果有)
+        date_published = item.get("datePublished", "")
+        time_info = f" (Time: {date_published})" if date_published else ""
+        
+        # 明确标注 Source，方便 LLM 引用；最后一行为分隔符
+        return (
+            f"Result {index}:\n"
+            f"Title: {title}{time_info}\n"
+            f"Source: {url}\n"
+            f"Content: {content}\n"
+            f"{'-' * 30}"
+        )
+    
+    def _format_results(self, query: str, results: List[Dict[str, Any]], max_chars: int = 0) -> str:
         """
         将 JSON 数据格式化为 LLM 和人类都易读的文本
         
         Args:
             query: 搜索查询
             results: 搜索结果列表
+            max_chars: 最大字符数（超出时丢弃排序靠后的结果，至少保留一条；0表示不限制）
             
         Returns:
             格式化的结果字符串
         """
-        parts = [f"Search results for '{query}':\n"]
+        header = f"Search results for '{query}':\n"
+        pieces = [header]
         
+        # 逐条格式化并扣减剩余预算（每条另加一个换行符），超出预算时停止，
+        # 排在后面的结果不再格式化；最终只做一次join
+        remaining = max_chars - len(header)
         for i, item in enumerate(results, 1):
-            title = item.get("name", "No Title")
-            url = item.get("url", "No URL")
-            # 优先使用 summary (长摘要)，如果没有则使用 snippet (短摘要)
-            content = item.get("summary") or item.get("snippet") or "No content available."
-            
-            # 发布时间 (如果有)
-            date_published = item.get("datePublished", "")
-            time_info = f" (Time: {date_published})" if date_published else ""
-            
-            parts.append(f"Result {i}:")
-            parts.append(f"Title: {title}{time_info}")
-            parts.append(f"Source: {url}")  # 明确标注 Source，方便 LLM 引用
-            parts.append(f"Content: {content}")
-            parts.append("-" * 30)  # 分隔符
+            piece = self._format_one(i, item)
+            if max_chars > 0:
+                remaining -= len(piece) + 1
+                if remaining < 0 and len(pieces) > 1:
+                    break
+            pieces.append(piece)
         
-        return "\n".join(parts)
+        return "\n".join(pieces)
     
     def to_schema(self) -> Dict[str, Any]:
         """
@@ -9,7 +9,8 @@ def retry_with_backoff(
     initial_delay: float = 1.0,
     backoff_factor: float = 2.0,
     exceptions: tuple = (Exception,),
-    on_retry: Optional[Callable[[Exception, int], None]] = None
+    on_retry: Optional[Callable[[Exception, int], None]] = None,
+    non_retryable: tuple = ()
 ):
     """
     带指数退避的重试装饰器
@@ -20,6 +21,7 @@ def retry_with_backoff(
         backoff_factor: 退避因子
         exceptions: 需要重试的异常类型
         on_retry: 重试时的回调函数（可选）
+        non_retryable: 不重试、直接抛出的异常类型（如鉴权失败、请求参数错误等永久性错误）
     
     Returns:
         装饰器函数
@@ -36,6 +38,10 @@ def retry_with_backoff(
                 except exceptions as e:
                     last_exception = e
                     
+                    # 永久性错误重试也不会成功，直接抛出，避免浪费退避时间和配额
+                    if non_retryable and isinstance(e, non_retryable):
+                        raise
+                    
                     if attempt < max_retries:
                         if on_retry:
                             on_retry(e, attempt + 1)
@@ -56,7 +62,8 @@ def retry_with_backoff(
 def retry_on_timeout(
     max_retries: int = 3,
     timeout: float = 30.0,
-    exceptions: tuple = (TimeoutError, ConnectionError, Exception)
+    exceptions: tuple = (TimeoutError, ConnectionError, Exception),
+    non_retryable: tuple = ()
 ):
     """
     针对超时错误的重试装饰器
@@ -65,6 +72,7 @@ def retry_on_timeout(
         max_retries: 最大重试次数
         timeout: 超时时间（秒）
         exceptions: 需要重试的异常类型
+        non_retryable: 不重试、直接抛出的异常类型
     
     Returns:
         装饰器函数
@@ -73,6 +81,7 @@ def retry_on_timeout(
         max_retries=max_retries,
         initial_delay=2.0,
         backoff_factor=1.5,
-        exceptions=exceptions
+        exceptions=exceptions,
+        non_retryable=non_retryable
     )
 